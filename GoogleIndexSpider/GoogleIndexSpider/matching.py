@@ -0,0 +1,177 @@
+import re
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlsplit, urlunsplit
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+# A plain http(s) URL: no port, credentials or characters urlsplit treats specially
+_PLAIN_URL = re.compile(
+    r'((?i:https?)://)?([^/?#@:\[\]\\%\x00-\x20\x7f]+)((?:/[^?#\x00-\x20\x7f]*)?)'
+    r'(?:\?([^#\x00-\x20\x7f]*))?(?:#[^\x00-\x20\x7f]*)?'
+)
+_NETLOC_END = re.compile(r'[/?]')
+# Characters urlsplit drops from anywhere in a URL
+_URL_WHITESPACE = re.compile(r'[\t\r\n]')
+
+
+def canonical_url(url: str) -> str:
+    """Comparison key for a target or result URL.
+
+    Mirrors ``normalize_url`` in the API's urlnorm module (the spider runs
+    without it on its path): http and https, host case, default ports,
+    fragments and trailing slashes don't make two URLs different.
+    """
+    url = url.strip()
+    # Fast path for the plain URLs that make up nearly every target and
+    # result; anything else goes through urlsplit below
+    plain = _PLAIN_URL.fullmatch(url)
+    if plain and (plain.group(1) or '://' not in url):
+        _, host, path, query = plain.groups()
+        canonical = f"https://{host.lower().rstrip('.')}{path.rstrip('/')}"
+        return f"{canonical}?{query}" if query else canonical
+
+    if '://' not in url:
+        url = 'https://' + url
+
+    try:
+        parts = urlsplit(url)
+        port = parts.port
+    except ValueError:
+        return url
+
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').rstrip('.')
+    if ':' in host:
+        host = f"[{host}]"
+    if scheme in DEFAULT_PORTS:
+        if port is not None and port != DEFAULT_PORTS[scheme]:
+            host = f"{host}:{port}"
+        scheme = 'https'
+    elif port is not None:
+        host = f"{host}:{port}"
+
+    return urlunsplit((scheme, host, parts.path.rstrip('/'), parts.query, ''))
+
+
+def _host_and_segment(url: str) -> Tuple[str, str]:
+    canonical = canonical_url(url)
+    parts = urlsplit(canonical)
+    segment = parts.path.lstrip('/').split('/', 1)[0]
+    return parts.netloc, segment
+
+
+def group_targets(targets: Iterable[Tuple[int, str]], min_group: int,
+                  max_group: int) -> Tuple[List[Tuple[str, List[Tuple[int, str]]]], List[Tuple[int, str]]]:
+    """Split targets into site: query groups and targets to check one by one.
+
+    Targets are grouped by host. A host with more targets than one query
+    can cover (``max_group``) is split further by its first path segment.
+    Groups smaller than ``min_group`` aren't worth a broad query, so their
+    targets are returned as singles. Each group is (prefix, targets), where
+    prefix is ``host`` or ``host/segment``.
+    """
+    by_host: Dict[str, List[Tuple[int, str, str]]] = OrderedDict()
+    for idx, url in targets:
+        host, segment = _host_and_segment(url)
+        by_host.setdefault(host, []).append((idx, url, segment))
+
+    groups = []
+    singles = []
+    for host, members in by_host.items():
+        if len(members) <= max_group:
+            candidates = [(host, members)]
+        else:
+            by_segment: Dict[str, List[Tuple[int, str, str]]] = OrderedDict()
+            for member in members:
+                by_segment.setdefault(member[2], []).append(member)
+            candidates = [
+                (f"{host}/{segment}" if segment else host, segment_members)
+                for segment, segment_members in by_segment.items()
+            ]
+
+        for prefix, group in candidates:
+            pairs = [(idx, url) for idx, url, _ in group]
+            if host and len(pairs) >= min_group:
+                groups.append((prefix, pairs))
+            else:
+                singles.extend(pairs)
+
+    return groups, singles
+
+
+def _canonical_host(canonical: str) -> str:
+    rest = canonical.partition('://')[2]
+    end = _NETLOC_END.search(rest)
+    return rest[:end.start()] if end else rest
+
+
+class TargetMatcher:
+    """Resolves SERP results against a set of targets with hash lookups.
+
+    Every target's canonical URL and host are computed once, up front. A
+    result then costs one canonicalization plus a dict lookup per distinct
+    target URL length, however many targets share the SERP, and every
+    target it answers is resolved in the same pass.
+
+    A result counts for a target when it is the target's URL or a page
+    under it. With ``hosts`` matching on, as for a single URL's own query,
+    any result on the target's host counts when nothing closer does.
+    """
+
+    def __init__(self, targets: Iterable[Tuple[int, str]]):
+        self.by_url: Dict[str, List[int]] = {}
+        self.by_host: Dict[str, List[int]] = {}
+        for idx, url in targets:
+            canonical = canonical_url(url)
+            self.by_url.setdefault(canonical, []).append(idx)
+            self.by_host.setdefault(_canonical_host(canonical), []).append(idx)
+        self.size = sum(len(indexes) for indexes in self.by_url.values())
+        self.lengths = sorted({len(canonical) for canonical in self.by_url}, reverse=True)
+
+        # With a single target, as for a per-URL query, a result can only be
+        # it or a page under it if the raw result URL contains its path, so
+        # most results never need canonicalizing
+        self.path = None
+        if len(self.by_url) == 1:
+            canonical = next(iter(self.by_url))
+            rest = canonical.partition('://')[2]
+            self.path = rest[len(_canonical_host(canonical)):].partition('?')[0]
+
+    def match(self, results: Iterable[dict], hosts: bool = True) -> Dict[int, str]:
+        """Map each matched target index to the first result URL that answers it"""
+        matched: Dict[int, str] = {}
+        host_matched: Dict[int, str] = {}
+        by_url = self.by_url
+        for result in results:
+            link: Optional[str] = result.get('url')
+            if not link:
+                continue
+            if self.path and self.path not in link and not _URL_WHITESPACE.search(link):
+                if not hosts or len(host_matched) == self.size:
+                    continue
+            canonical = canonical_url(link)
+            # A page under a target is on the target's host, so results on
+            # other hosts are ruled out with a single lookup
+            on_host = self.by_host.get(_canonical_host(canonical))
+            if not on_host:
+                continue
+            # Targets the result is, or is a page under: the prefixes of its
+            # URL that end on a path boundary and are as long as some target
+            size = len(canonical)
+            for length in self.lengths:
+                if length > size or (length < size and canonical[length] not in '/?'):
+                    continue
+                for idx in by_url.get(canonical[:length], ()):
+                    if idx not in matched:
+                        matched[idx] = link
+            if len(matched) == self.size:
+                break
+            if hosts:
+                for idx in on_host:
+                    if idx not in host_matched:
+                        host_matched[idx] = link
+
+        for idx, link in host_matched.items():
+            matched.setdefault(idx, link)
+        return matched
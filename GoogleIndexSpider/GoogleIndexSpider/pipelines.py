@@ -1,13 +1,59 @@
-# Define your item pipelines here
-#
-# Don't forget to add your pipeline to the ITEM_PIPELINES setting
-# See: https://docs.scrapy.org/en/latest/topics/item-pipeline.html
-
-
-# useful for handling different item types with a single interface
-from itemadapter import ItemAdapter
-
-
-class GoogleindexspiderPipeline:
-    def process_item(self, item, spider):
-        return item
+# Define your item pipelines here
+#
+# Don't forget to add your pipeline to the ITEM_PIPELINES setting
+# See: https://docs.scrapy.org/en/latest/topics/item-pipeline.html
+
+
+import json
+import sys
+
+# useful for handling different item types with a single interface
+from itemadapter import ItemAdapter
+from scrapy.exceptions import NotConfigured
+
+
+class GoogleindexspiderPipeline:
+    def process_item(self, item, spider):
+        return item
+
+
+class StreamItemsPipeline:
+    """Writes each item to stdout as a JSON line as soon as it is scraped.
+
+    Enabled with the STREAM_ITEMS setting, so the API process can read
+    results while a `scrapy crawl` subprocess is still running instead of
+    waiting for a feed file to be complete.
+    """
+
+    def __init__(self, stream, stats=None):
+        self.stream = stream
+        self.stats = stats
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        if not crawler.settings.getbool("STREAM_ITEMS"):
+            raise NotConfigured
+        return cls(sys.stdout, crawler.stats)
+
+    def open_spider(self, spider):
+        # Tells the API process the crawler is up, so it can time startup
+        self.stream.write(json.dumps({"_opened": True}) + "\n")
+        self.stream.flush()
+
+    def process_item(self, item, spider):
+        self.stream.write(json.dumps(ItemAdapter(item).asdict(), ensure_ascii=False) + "\n")
+        self.stream.flush()
+        return item
+
+    def close_spider(self, spider):
+        # A last line with the crawl's numeric stats, including the Zyte API
+        # client's counters such as the 429s it retried internally, so the
+        # API process can adapt its concurrency and export them as metrics
+        if self.stats is None:
+            return
+        numeric_stats = {
+            key: value for key, value in self.stats.get_stats().items()
+            if isinstance(value, (int, float)) and not isinstance(value, bool)
+        }
+        self.stream.write(json.dumps({"_stats": numeric_stats}) + "\n")
+        self.stream.flush()
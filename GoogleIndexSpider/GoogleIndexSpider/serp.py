@@ -0,0 +1,100 @@
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+from urllib.parse import quote
+
+from GoogleIndexSpider.matching import TargetMatcher
+
+# Zyte API parameters of every SERP query
+SERP_META = {
+    "serp": True,
+    "serpOptions": {"extractFrom": "httpResponseBody"},
+    "geolocation": "US"
+}
+
+
+def checked_at() -> str:
+    return datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+
+def check_query(original_url: str) -> Tuple[str, str]:
+    """The keyword (the URL with a scheme) and search URL of a single URL's site: query"""
+    site = original_url
+    if not site.startswith(('http://', 'https://')):
+        site = 'https://' + site
+    return site, f"https://www.google.com/search?q=site:{quote(site, safe='')}"
+
+
+def site_query(prefix: str, page: int, per_page: int) -> str:
+    """Search URL of one page of a site: query listing a host or path prefix"""
+    search_url = f"https://www.google.com/search?q=site:{quote(prefix, safe='')}&num={per_page}"
+    if page:
+        search_url += f"&start={page * per_page}"
+    return search_url
+
+
+def organic_results(api_response: dict) -> List[dict]:
+    """The organic results of a Zyte API SERP response.
+
+    A response without SERP data says nothing about the URL, so it raises
+    ValueError, to be reported as an error and retried rather than as Not
+    Indexed.
+    """
+    serp_data = api_response.get("serp")
+    if not isinstance(serp_data, dict):
+        raise ValueError("Zyte API response has no SERP data")
+    return serp_data.get("organicResults") or []
+
+
+def check_item(idx: int, original_url: str, search_url: str, results: List[dict],
+               matcher: TargetMatcher, latency: Optional[float] = None) -> dict:
+    """Result of a single URL's own query"""
+    result_url = matcher.match(results).get(idx)
+    return {
+        "index": idx,
+        "url": original_url,
+        "indexed": result_url is not None,
+        "search_link": search_url,
+        "result_url": result_url,
+        "total_results": len(results),
+        "checked_at": checked_at(),
+        "download_latency": latency
+    }
+
+
+def site_items(matcher: TargetMatcher, pending: Dict[int, str], search_url: str, results: List[dict],
+               latency: Optional[float] = None) -> Iterator[dict]:
+    """Results of the targets of a site: query group that this page lists,
+    each taken out of ``pending`` as it is resolved"""
+    current_time = checked_at()
+    # Only a listed page (or one under it) answers a target here: a broad
+    # query lists plenty of other pages on the same host
+    for idx, result_link in matcher.match(results, hosts=False).items():
+        original_url = pending.pop(idx, None)
+        if original_url is None:
+            continue
+        yield {
+            "index": idx,
+            "url": original_url,
+            "indexed": True,
+            "search_link": search_url,
+            "result_url": result_link,
+            "total_results": len(results),
+            "checked_at": current_time,
+            "download_latency": latency,
+            "coalesced": True
+        }
+
+
+def error_item(idx: int, original_url: str, search_url: str, error: BaseException,
+               latency: Optional[float] = None) -> dict:
+    """Result of a check that failed, to be retried"""
+    return {
+        "index": idx,
+        "url": original_url,
+        "indexed": False,
+        "search_link": search_url,
+        "error": str(error),
+        "error_type": type(error).__name__,
+        "checked_at": checked_at(),
+        "download_latency": latency
+    }
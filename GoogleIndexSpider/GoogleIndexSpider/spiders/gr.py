@@ -1,134 +1,248 @@
-import scrapy
-from urllib.parse import quote
-from scrapy import Request
-import logging
-from datetime import datetime
-
-logger = logging.getLogger(__name__)
-
-class GrSpider(scrapy.Spider):
-    name = "gr"
-    allowed_domains = ["google.com"]
- 
-    def __init__(self, urls=None, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        if not urls:
-            raise ValueError("You must pass -a urls=url1,url2,...")
-        
-        if ',' in urls:
-            self.targets = [url.strip() for url in urls.split(",") if url.strip()]
-        else:
-            self.targets = [url.strip() for url in urls.split("\n") if url.strip()]
-        
-        logger.info(f"Spider initialized with {len(self.targets)} URLs")
-
-    def start_requests(self):
-        """Generate requests for each URL to check"""
-        for idx, site in enumerate(self.targets):
-            if not site.startswith(('http://', 'https://')):
-                site = 'https://' + site
-            
-            q = quote(site, safe="")
-            search_url = f"https://www.google.com/search?q=site:{q}"
-
-            yield Request(
-                url=search_url,
-                callback=self.parse,
-                meta={
-                    "zyte_api_automap": {
-                        "serp": True,
-                        "serpOptions": {"extractFrom": "httpResponseBody"},
-                        "geolocation": "US"
-                    },
-                    "index": idx,
-                    "keyword": site,
-                    "original_url": self.targets[idx]  
-                },
-                dont_filter=True,
-                errback=self.handle_error
-            )
-
-    def parse(self, response):
-        """Parse Google search results to determine if URL is indexed"""
-        idx = response.meta["index"]
-        site = response.meta["keyword"]
-        original_url = response.meta["original_url"]
-        
-        try:
-            serp_data = response.raw_api_response.get("serp", {})
-            organic_results = serp_data.get("organicResults", [])
-            
-            indexed = False
-            result_url = None
-            
-            for result in organic_results:
-                result_link = result.get("url", "")
-                if result_link and (original_url in result_link or site in result_link):
-                    indexed = True
-                    result_url = result_link
-                    break
-            
-            if not indexed and organic_results:
-                for result in organic_results:
-                    result_link = result.get("url", "")
-                    if result_link:
-                        from urllib.parse import urlparse
-                        try:
-                            original_domain = urlparse(original_url).netloc
-                            result_domain = urlparse(result_link).netloc
-                            if original_domain == result_domain:
-                                indexed = True
-                                result_url = result_link
-                                break
-                        except:
-                            pass
-            
-            logger.info(f"URL {idx + 1}/{len(self.targets)}: {original_url} - {'Indexed' if indexed else 'Not Indexed'}")
-            
-            current_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            
-            yield {
-                "index": idx,
-                "url": original_url,
-                "indexed": indexed,
-                "search_link": response.url,
-                "result_url": result_url,
-                "total_results": len(organic_results),
-                "checked_at": current_time
-            }
-            
-        except Exception as e:
-            logger.error(f"Error parsing response for {original_url}: {str(e)}")
-            current_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            
-            yield {
-                "index": idx,
-                "url": original_url,
-                "indexed": False,
-                "search_link": response.url,
-                "error": str(e),
-                "checked_at": current_time
-            }
-
-    def handle_error(self, failure):
-        """Handle request errors"""
-        request = failure.request
-        idx = request.meta.get("index", 0)
-        original_url = request.meta.get("original_url", "")
-        
-        logger.error(f"Request failed for {original_url}: {failure.value}")
-        current_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        
-        yield {
-            "index": idx,
-            "url": original_url,
-            "indexed": False,
-            "search_link": request.url,
-            "error": str(failure.value),
-            "checked_at": current_time
-        }
-
-    def closed(self, reason):
-        """Called when spider closes"""
-        logger.info(f"Spider closed: {reason}")
-        logger.info(f"Total URLs processed: {len(self.targets)}")
\ No newline at end of file
+import io
+import itertools
+import math
+import sys
+import scrapy
+from scrapy import Request, signals
+from scrapy.exceptions import DontCloseSpider, IgnoreRequest
+import logging
+
+from GoogleIndexSpider.matching import TargetMatcher, group_targets
+from GoogleIndexSpider.serp import (
+    SERP_META, check_item, check_query, error_item, organic_results, site_items, site_query
+)
+
+logger = logging.getLogger(__name__)
+
+
+class SiteQueryGroup:
+    """Targets that share one site: query and are resolved from its result pages"""
+
+    def __init__(self, prefix, targets, pages, meta):
+        self.prefix = prefix
+        self.pending = dict(targets)
+        self.matcher = TargetMatcher(targets)
+        self.pages_left = pages
+        self.meta = meta
+
+
+class GrSpider(scrapy.Spider):
+    name = "gr"
+    allowed_domains = ["google.com"]
+ 
+    def __init__(self, urls=None, urls_file=None, service=False, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.service = str(service).lower() in ('1', 'true', 'yes')
+        self.targets = []
+        self.urls_file = urls_file
+        self.requested = 0
+        if self.service:
+            # Long-lived mode used by the in-process engine: requests are
+            # pushed in batch by batch through make_check_request()
+            logger.info("Spider initialized in service mode")
+            return
+
+        if urls_file:
+            # Read lazily in start_requests, one URL per line; "-" is stdin
+            logger.info(f"Spider will read URLs from {'stdin' if urls_file == '-' else urls_file}")
+            return
+
+        if not urls:
+            raise ValueError("You must pass -a urls=url1,url2,... or -a urls_file=path")
+        
+        if ',' in urls:
+            self.targets = [url.strip() for url in urls.split(",") if url.strip()]
+        else:
+            self.targets = [url.strip() for url in urls.split("\n") if url.strip()]
+        
+        logger.info(f"Spider initialized with {len(self.targets)} URLs")
+
+    @classmethod
+    def from_crawler(cls, crawler, *args, **kwargs):
+        spider = super().from_crawler(crawler, *args, **kwargs)
+        if spider.service:
+            crawler.signals.connect(spider.spider_idle, signal=signals.spider_idle)
+        return spider
+
+    def spider_idle(self):
+        """Keep a service-mode spider open while it waits for the next batch"""
+        raise DontCloseSpider
+
+    def iter_targets(self):
+        """Yield (index, url) pairs without holding the whole list in memory.
+
+        With urls_file the index is the line number, so blank lines don't
+        shift the numbering the caller uses to match results back up.
+        """
+        if not self.urls_file:
+            yield from enumerate(self.targets)
+            return
+
+        if self.urls_file == '-':
+            lines = io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8')
+        else:
+            lines = open(self.urls_file, 'r', encoding='utf-8')
+        with lines:
+            for idx, line in enumerate(lines):
+                url = line.strip()
+                if url:
+                    yield idx, url
+
+    def start_requests(self):
+        """Generate requests for each URL to check"""
+        def counted():
+            for target in self.iter_targets():
+                self.requested += 1
+                yield target
+
+        targets = counted()
+        if self.settings.getint("COALESCE_MIN_GROUP", 0) <= 0:
+            yield from self.make_requests(targets)
+            return
+
+        # Grouping by site needs the targets up front, so they are read and
+        # grouped a bounded slice at a time
+        size = max(1, self.settings.getint("COALESCE_SLICE", 10000))
+        while True:
+            targets_slice = list(itertools.islice(targets, size))
+            if not targets_slice:
+                break
+            yield from self.make_requests(targets_slice)
+
+    def make_requests(self, targets, **meta):
+        """Requests checking ``targets``, an iterable of (index, url) pairs.
+
+        With COALESCE_MIN_GROUP set, targets that share a host (or a path
+        prefix on a big host) are first looked up with one broad site: query
+        per group; only the ones it doesn't list get a query of their own.
+        A ``priority`` in ``meta`` becomes the Scrapy priority of all of them.
+        """
+        min_group = self.settings.getint("COALESCE_MIN_GROUP", 0)
+        if min_group <= 0:
+            for idx, url in targets:
+                yield self.make_check_request(idx, url, **meta)
+            return
+
+        per_page = self.settings.getint("COALESCE_RESULTS_PER_PAGE", 100)
+        max_pages = max(1, self.settings.getint("COALESCE_MAX_PAGES", 1))
+        groups, singles = group_targets(targets, min_group, per_page * max_pages)
+
+        for prefix, members in groups:
+            pages = min(max_pages, math.ceil(len(members) / per_page))
+            group = SiteQueryGroup(prefix, members, pages, meta)
+            for page in range(pages):
+                yield self.make_site_request(group, page, per_page)
+
+        for idx, url in singles:
+            yield self.make_check_request(idx, url, **meta)
+
+    def make_site_request(self, group, page, per_page):
+        """Build the Zyte SERP request listing one page of a site: query"""
+        return Request(
+            url=site_query(group.prefix, page, per_page),
+            callback=self.parse_site,
+            meta={
+                "zyte_api_automap": SERP_META,
+                "site_group": group,
+                **group.meta
+            },
+            priority=group.meta.get("priority", 0),
+            dont_filter=True,
+            errback=self.handle_site_error
+        )
+
+    def make_check_request(self, idx, original_url, **meta):
+        """Build the Zyte SERP request checking a single URL"""
+        site, search_url = check_query(original_url)
+
+        return Request(
+            url=search_url,
+            callback=self.parse,
+            meta={
+                "zyte_api_automap": SERP_META,
+                "index": idx,
+                "keyword": site,
+                "original_url": original_url,
+                "matcher": TargetMatcher([(idx, original_url)]),
+                **meta
+            },
+            priority=meta.get("priority", 0),
+            dont_filter=True,
+            errback=self.handle_error
+        )
+
+    def parse(self, response):
+        """Parse Google search results to determine if URL is indexed"""
+        idx = response.meta["index"]
+        original_url = response.meta["original_url"]
+        total = response.meta.get("total", len(self.targets) if self.targets else "?")
+        latency = response.meta.get("download_latency")
+        
+        try:
+            item = check_item(idx, original_url, response.url, organic_results(response.raw_api_response),
+                              response.meta["matcher"], latency)
+            logger.info(f"URL {idx + 1}/{total}: {original_url} - {'Indexed' if item['indexed'] else 'Not Indexed'}")
+            yield item
+            
+        except Exception as e:
+            logger.error(f"Error parsing response for {original_url}: {str(e)}")
+            yield error_item(idx, original_url, response.url, e, latency)
+
+    def parse_site(self, response):
+        """Resolve every target of a site: query group listed on this result page"""
+        group = response.meta["site_group"]
+        self.crawler.stats.inc_value("coalesce/site_queries")
+
+        # Whatever the page fails to resolve stays pending and is checked
+        # one by one, so every target still gets an item
+        latency = response.meta.get("download_latency")
+        items = []
+        try:
+            results = organic_results(response.raw_api_response)
+            for item in site_items(group.matcher, group.pending, response.url, results, latency):
+                items.append(item)
+        except Exception as e:
+            logger.warning(f"Site query for {group.prefix} failed, checking its URLs one by one: {str(e)}")
+
+        for item in items:
+            self.crawler.stats.inc_value("coalesce/resolved")
+            yield item
+
+        yield from self.finish_site_page(group)
+
+    def handle_site_error(self, failure):
+        group = failure.request.meta["site_group"]
+        if failure.check(IgnoreRequest):
+            # Dropped on purpose, e.g. because its job was cancelled
+            group.pending = {}
+            return
+        logger.warning(f"Site query for {group.prefix} failed, checking its URLs one by one: {failure.value}")
+        yield from self.finish_site_page(group)
+
+    def finish_site_page(self, group):
+        """Once every page of a group is in, check what it didn't list one by one"""
+        group.pages_left -= 1
+        if group.pages_left > 0:
+            return
+        for idx, original_url in group.pending.items():
+            self.crawler.stats.inc_value("coalesce/fallback")
+            yield self.make_check_request(idx, original_url, **group.meta)
+        group.pending = {}
+
+    def handle_error(self, failure):
+        """Handle request errors"""
+        request = failure.request
+        idx = request.meta.get("index", 0)
+        original_url = request.meta.get("original_url", "")
+        
+        if failure.check(IgnoreRequest):
+            logger.debug(f"Request dropped for {original_url}: {failure.value}")
+        else:
+            logger.error(f"Request failed for {original_url}: {failure.value}")
+        
+        yield error_item(idx, original_url, request.url, failure.value, request.meta.get("download_latency"))
+
+    def closed(self, reason):
+        """Called when spider closes"""
+        logger.info(f"Spider closed: {reason}")
+        logger.info(f"Total URLs processed: {self.requested}")
\ No newline at end of file
@@ -0,0 +1,144 @@
+"""Microbenchmark for GrSpider's SERP parsing.
+
+Builds realistic Zyte API SERP responses in memory and times the spider's
+callbacks on them, without any network:
+
+* ``single``: one target per response, as for a per-URL site: query.
+  About half the targets are listed, somewhere among the ten results.
+* ``site``: one coalesced site: query page of 100 results shared by a group
+  of targets, most of which it lists.
+
+Usage: python benchmarks/bench_parse.py [--items 20000] [--group 100] [--repeat 3]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'GoogleIndexSpider'))
+os.environ.setdefault('SCRAPY_SETTINGS_MODULE', 'GoogleIndexSpider.settings')
+
+from scrapy.utils.project import get_project_settings  # noqa: E402
+from scrapy.utils.test import get_crawler  # noqa: E402
+from scrapy_zyte_api.responses import ZyteAPIResponse  # noqa: E402
+
+from GoogleIndexSpider.spiders.gr import GrSpider, SiteQueryGroup  # noqa: E402
+
+WORDS = ('index', 'checker', 'google', 'search', 'result', 'page', 'product', 'guide', 'review', 'news')
+
+
+def organic_result(url, rank, rng):
+    text = ' '.join(rng.choice(WORDS) for _ in range(30))
+    return {
+        'name': text[:60].title(),
+        'url': url,
+        'description': text,
+        'rank': rank,
+        'displayedUrlText': url.split('://', 1)[-1].replace('/', ' › ')
+    }
+
+
+def serp_response(request, results):
+    api_response = {
+        'url': request.url,
+        'serp': {
+            'url': request.url,
+            'pageNumber': 1,
+            'organicResults': results,
+            'metadata': {'dateDownloaded': '2024-01-01T00:00:00Z', 'totalOrganicResults': 1000, 'searchedKeywords': 'site:'}
+        }
+    }
+    return ZyteAPIResponse.from_api_response(api_response, request=request)
+
+
+def make_spider():
+    settings = get_project_settings().copy_to_dict()
+    # Nothing is downloaded, so whichever reactor is installed will do
+    settings.pop('TWISTED_REACTOR', None)
+    crawler = get_crawler(GrSpider, settings)
+    return GrSpider.from_crawler(crawler, service=True)
+
+
+def single_responses(spider, count, rng):
+    responses = []
+    for idx in range(count):
+        url = f"https://shop{idx % 500}.example.com/category/item-{idx}"
+        request = spider.make_check_request(idx, url)
+        results = [
+            organic_result(f"https://shop{idx % 500}.example.com/related/{idx}-{n}", n, rng)
+            for n in range(10)
+        ]
+        if rng.random() < 0.5:
+            results[rng.randrange(10)]['url'] = url + '/'
+        responses.append(serp_response(request, results))
+    return responses
+
+
+def site_responses(spider, count, group_size, rng):
+    responses = []
+    for start in range(0, count, group_size):
+        host = f"shop{start // group_size}.example.com"
+        targets = [(idx, f"https://{host}/p/{idx}") for idx in range(start, min(count, start + group_size))]
+        group = SiteQueryGroup(host, targets, pages=1, meta={})
+        request = spider.make_site_request(group, 0, group_size)
+        listed = [url for _, url in targets if rng.random() < 0.8]
+        listed += [f"https://{host}/other/{n}" for n in range(group_size - len(listed))]
+        rng.shuffle(listed)
+        results = [organic_result(url, rank, rng) for rank, url in enumerate(listed)]
+        responses.append((group, serp_response(request, results)))
+    return responses
+
+
+def run_single(spider, responses):
+    items = 0
+    for response in responses:
+        for _ in spider.parse(response):
+            items += 1
+    return items
+
+
+def run_site(spider, groups):
+    items = 0
+    for group, response in groups:
+        # Fresh state per run: a group resolves each target once
+        group.pending = {idx: url for idx, url in group.pending_all}
+        group.pages_left = 1
+        for output in spider.parse_site(response):
+            if isinstance(output, dict):
+                items += 1
+    return items
+
+
+def timed(label, func, repeat):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        items = func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    print(f"{label:<8} {items:>8} items  {best:8.3f}s  {items / best:>12,.0f} items/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--items', type=int, default=20000, help='targets per scenario')
+    parser.add_argument('--group', type=int, default=100, help='targets (and results) per coalesced SERP')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per scenario, best is reported')
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    spider = make_spider()
+
+    responses = single_responses(spider, args.items, rng)
+    timed('single', lambda: run_single(spider, responses), args.repeat)
+
+    groups = site_responses(spider, args.items, args.group, rng)
+    for group, _ in groups:
+        group.pending_all = list(group.pending.items())
+    timed('site', lambda: run_site(spider, groups), args.repeat)
+
+
+if __name__ == '__main__':
+    main()
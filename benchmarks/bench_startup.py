@@ -0,0 +1,140 @@
+"""Cold start benchmark: how soon a fresh instance can serve and finish a job.
+
+For each engine, starts a fresh API process (the way an autoscaler brings
+up a new instance) pointed at benchmarks/mock_zyte.py, --repeat times, and
+prints medians of:
+
+* import: ``import main`` alone, in its own interpreter
+* ready: process spawn until /api answers, which is after every startup
+  hook has run, the crawler's included
+* first job: a --urls URL job from submission until it completes
+* report: downloading that job's report in --format, built on demand
+* peak RSS of the process (VmHWM, Linux only)
+
+``api`` runs the API without an embedded worker, as in front of worker
+processes; it isn't given a job.
+
+Usage: python benchmarks/bench_startup.py [--engine api,inprocess,subprocess,direct]
+           [--repeat 5] [--urls 10] [--format xlsx] [--latency 0.1] [--json results.json]
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from e2e import ROOT, generate_urls, http, http_json, peak_rss_mb, print_table, stop, wait_until_up
+
+ENGINES = ('api', 'inprocess', 'subprocess', 'direct')
+
+
+def time_import():
+    code = "import time; started = time.perf_counter(); import main; print(time.perf_counter() - started)"
+    output = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True, check=True)
+    return float(output.stdout.strip().splitlines()[-1])
+
+
+def start_once(args, engine, mock_url):
+    results_dir = tempfile.mkdtemp(prefix='startup-results-')
+    env = dict(os.environ)
+    env.update({
+        'ZYTE_API_URL': f"{mock_url}/v1/",
+        'ZYTE_API_KEY': env.get('ZYTE_API_KEY') or 'benchmark',
+        'RESULTS_DIR': results_dir,
+        'RESULT_CACHE_ENABLED': '0',
+        'CRAWL_ENGINE': 'inprocess' if engine == 'api' else engine,
+        'EMBEDDED_WORKER': '0' if engine == 'api' else '1',
+    })
+    env.update(dict(item.split('=', 1) for item in args.env))
+
+    api_url = f"http://127.0.0.1:{args.api_port}"
+    started = time.perf_counter()
+    api = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'main:app', '--host', '127.0.0.1',
+         '--port', str(args.api_port), '--log-level', 'warning'],
+        cwd=ROOT, env=env, stderr=subprocess.DEVNULL
+    )
+    try:
+        wait_until_up(f"{api_url}/api", api)
+        sample = {'ready_s': time.perf_counter() - started}
+        if engine != 'api':
+            submitted = time.perf_counter()
+            job_id = http_json('POST', f"{api_url}/check-urls", {'urls': generate_urls(args.urls, 1)})['job_id']
+            while True:
+                status = http_json('GET', f"{api_url}/job-status/{job_id}")
+                if status['status'] in ('completed', 'failed', 'cancelled'):
+                    break
+                time.sleep(args.poll)
+            if status['status'] != 'completed':
+                raise RuntimeError(f"Job {job_id} ended {status['status']}: {status.get('error')}")
+            done = time.perf_counter()
+            http('GET', f"{api_url}/download-results/{job_id}?format={args.format}")
+            sample['first_job_s'] = done - submitted
+            sample['report_s'] = time.perf_counter() - done
+        sample['peak_rss_mb'] = peak_rss_mb(api.pid)
+        return sample
+    finally:
+        stop(api)
+        shutil.rmtree(results_dir, ignore_errors=True)
+
+
+def median(samples, key):
+    values = [sample[key] for sample in samples if sample.get(key) is not None]
+    return round(statistics.median(values), 3) if values else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--engine', default=','.join(ENGINES), help='comma separated: ' + ', '.join(ENGINES))
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--urls', type=int, default=10, help='URLs in the first job')
+    parser.add_argument('--format', default='xlsx', choices=('xlsx', 'csv', 'jsonl', 'parquet'))
+    parser.add_argument('--latency', type=float, default=0.1, help='mock Zyte API latency in seconds')
+    parser.add_argument('--env', action='append', default=[], help='NAME=VALUE for the API process')
+    parser.add_argument('--api-port', type=int, default=8998)
+    parser.add_argument('--mock-port', type=int, default=8999)
+    parser.add_argument('--poll', type=float, default=0.05, help='seconds between job status polls')
+    parser.add_argument('--json', help='also write the results to this file')
+    args = parser.parse_args()
+    engines = args.engine.split(',')
+    for engine in engines:
+        if engine not in ENGINES:
+            parser.error(f"unknown engine: {engine}")
+
+    imports = [time_import() for _ in range(args.repeat)]
+
+    mock_url = f"http://127.0.0.1:{args.mock_port}"
+    mock = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, 'benchmarks', 'mock_zyte.py'),
+         '--port', str(args.mock_port), '--latency', str(args.latency), '--jitter', '0'],
+        cwd=ROOT
+    )
+    rows = []
+    try:
+        wait_until_up(f"{mock_url}/stats", mock)
+        for engine in engines:
+            print(f"Starting {engine} {args.repeat} times...", file=sys.stderr)
+            samples = [start_once(args, engine, mock_url) for _ in range(args.repeat)]
+            rows.append({
+                'engine': engine,
+                'import_s': round(statistics.median(imports), 3),
+                'ready_s': median(samples, 'ready_s'),
+                'first_job_s': median(samples, 'first_job_s'),
+                'report_s': median(samples, 'report_s'),
+                'peak_rss_mb': median(samples, 'peak_rss_mb')
+            })
+    finally:
+        stop(mock)
+
+    print_table(rows)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,226 @@
+"""End-to-end throughput benchmark against the mock Zyte API.
+
+For each size, starts benchmarks/mock_zyte.py and a fresh API process
+pointed at it, submits that many URLs to /check-urls, follows the job to
+completion and downloads the report, then prints:
+
+* URLs/s over the whole run (submit to report downloaded)
+* time per stage: submit (/check-urls), first result, crawl (until the job
+  completes), report (building and downloading it)
+* peak RSS of the API process and its workers, summed (VmHWM, Linux only)
+* what the mock saw: API requests, site: queries, 429s
+
+URLs are generated host by host, as a sitemap lists them, over --hosts
+sites. Every run uses its own results directory and the result cache is
+off, so nothing carries over between sizes.
+
+With --workers N the API runs without an embedded worker and N worker.py
+processes run the job; --jobs splits each size over that many jobs, so
+several workers have something to do. --engine takes a comma separated
+list, e.g. inprocess,direct, to compare engines on the same sizes.
+
+Usage: python benchmarks/e2e.py [--sizes 1000,10000,100000] [--engine inprocess]
+           [--workers 0] [--jobs 1] [--batch-size 100] [--format xlsx] [--latency 0.5]
+           [--mock-arg=--error-rate=0.01] [--env NAME=VALUE] [--json results.json]
+"""
+import argparse
+import json
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def http(method, url, payload=None, timeout=600):
+    data = json.dumps(payload).encode('utf-8') if payload is not None else None
+    request = urllib.request.Request(url, data=data, method=method, headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return response.read()
+
+
+def http_json(method, url, payload=None):
+    return json.loads(http(method, url, payload))
+
+
+def wait_until_up(url, process, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{url} exited with {process.returncode} before it came up")
+        try:
+            http('GET', url, timeout=2)
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up within {timeout}s")
+
+
+def stop(process):
+    if process.poll() is None:
+        process.send_signal(signal.SIGINT)
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+
+def peak_rss_mb(pid):
+    """High-water mark of the process's resident memory, in MB"""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+
+def generate_urls(count, hosts):
+    per_host = -(-count // hosts)
+    return [f"https://site{i // per_host}.example.com/page/{i % per_host}" for i in range(count)]
+
+
+def run_size(args, engine, size, mock_url):
+    results_dir = tempfile.mkdtemp(prefix='e2e-results-')
+    env = dict(os.environ)
+    env.update({
+        'ZYTE_API_URL': f"{mock_url}/v1/",
+        'ZYTE_API_KEY': env.get('ZYTE_API_KEY') or 'benchmark',
+        'RESULTS_DIR': results_dir,
+        'RESULT_CACHE_ENABLED': '0',
+        'CRAWL_ENGINE': engine,
+        'EMBEDDED_WORKER': '0' if args.workers else '1',
+    })
+    env.update(dict(item.split('=', 1) for item in args.env))
+
+    api_url = f"http://127.0.0.1:{args.api_port}"
+    api = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'main:app', '--host', '127.0.0.1',
+         '--port', str(args.api_port), '--log-level', 'warning'],
+        cwd=ROOT, env=env
+    )
+    workers = [
+        subprocess.Popen([sys.executable, 'worker.py'], cwd=ROOT, env=env)
+        for _ in range(args.workers)
+    ]
+    try:
+        wait_until_up(f"{api_url}/api", api)
+        http('POST', f"{mock_url}/stats/reset", {})
+        urls = generate_urls(size, args.hosts)
+        per_job = -(-size // args.jobs)
+
+        started = time.perf_counter()
+        job_ids = [
+            http_json('POST', f"{api_url}/check-urls", {'urls': urls[i:i + per_job], 'batch_size': args.batch_size})['job_id']
+            for i in range(0, size, per_job)
+        ]
+        submitted = time.perf_counter()
+
+        first_result = None
+        pending = list(job_ids)
+        statuses = []
+        while pending:
+            status = http_json('GET', f"{api_url}/job-status/{pending[0]}")
+            if first_result is None and status.get('progress'):
+                first_result = time.perf_counter()
+            if status['status'] in ('completed', 'failed'):
+                if status['status'] != 'completed':
+                    raise RuntimeError(f"Job {pending[0]} failed: {status.get('error')}")
+                statuses.append(status)
+                pending.pop(0)
+                continue
+            time.sleep(args.poll)
+        crawled = time.perf_counter()
+
+        report_bytes = 0
+        for job_id in job_ids:
+            report_bytes += len(http('GET', f"{api_url}/download-results/{job_id}?format={args.format}"))
+        finished = time.perf_counter()
+
+        mock = http_json('GET', f"{mock_url}/stats")
+        rss = [peak_rss_mb(process.pid) for process in [api, *workers]]
+        return {
+            'engine': engine,
+            'urls': size,
+            'urls_per_s': round(size / (finished - started), 1),
+            'submit_s': round(submitted - started, 3),
+            'first_result_s': round((first_result or crawled) - started, 3),
+            'crawl_s': round(crawled - submitted, 3),
+            'report_s': round(finished - crawled, 3),
+            'report_bytes': report_bytes,
+            'peak_rss_mb': round(sum(rss), 1) if None not in rss else None,
+            'api_requests': mock['requests'],
+            'site_queries': mock['site_queries'],
+            'throttled': mock['throttled'],
+            'unknown': sum(status.get('unknown', 0) for status in statuses),
+            'retries': sum(status.get('retries', 0) for status in statuses)
+        }
+    finally:
+        for process in workers:
+            stop(process)
+        stop(api)
+        shutil.rmtree(results_dir, ignore_errors=True)
+
+
+def print_table(rows):
+    columns = list(rows[0])
+    widths = {column: max(len(column), *(len(str(row[column])) for row in rows)) for column in columns}
+    print('  '.join(column.rjust(widths[column]) for column in columns))
+    for row in rows:
+        print('  '.join(str(row[column]).rjust(widths[column]) for column in columns))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='1000,10000,100000', help='comma separated URL counts')
+    parser.add_argument('--engine', default='inprocess', help='comma separated engines: inprocess, subprocess, direct')
+    parser.add_argument('--workers', type=int, default=0, help='worker processes (0: the API runs jobs itself)')
+    parser.add_argument('--jobs', type=int, default=1, help='jobs each size is split into')
+    parser.add_argument('--batch-size', type=int, default=100)
+    parser.add_argument('--hosts', type=int, default=100, help='sites the URLs are spread over')
+    parser.add_argument('--format', default='xlsx', choices=('xlsx', 'csv', 'jsonl', 'parquet'))
+    parser.add_argument('--latency', type=float, default=0.5, help='mock Zyte API latency in seconds')
+    parser.add_argument('--mock-arg', action='append', default=[], help='extra mock_zyte.py argument, e.g. --mock-arg=--rps=50')
+    parser.add_argument('--env', action='append', default=[], help='NAME=VALUE for the API process, e.g. --env COALESCE_MIN_GROUP=0')
+    parser.add_argument('--api-port', type=int, default=8998)
+    parser.add_argument('--mock-port', type=int, default=8999)
+    parser.add_argument('--poll', type=float, default=0.2, help='seconds between job status polls')
+    parser.add_argument('--json', help='also write the results to this file')
+    args = parser.parse_args()
+    engines = args.engine.split(',')
+    for engine in engines:
+        if engine not in ('inprocess', 'subprocess', 'direct'):
+            parser.error(f"unknown engine: {engine}")
+
+    mock_url = f"http://127.0.0.1:{args.mock_port}"
+    mock = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, 'benchmarks', 'mock_zyte.py'),
+         '--port', str(args.mock_port), '--latency', str(args.latency), *args.mock_arg],
+        cwd=ROOT
+    )
+    rows = []
+    try:
+        wait_until_up(f"{mock_url}/stats", mock)
+        for engine in engines:
+            for size in (int(size) for size in args.sizes.split(',')):
+                print(f"Running {size} URLs ({engine}, {args.workers or 'embedded'} workers)...", file=sys.stderr)
+                rows.append(run_size(args, engine, size, mock_url))
+    finally:
+        stop(mock)
+
+    print_table(rows)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,184 @@
+"""Local stand-in for the Zyte API's SERP extraction.
+
+Serves POST /v1/extract like Zyte API does for ``{"url": ..., "serp": true}``
+requests, with configurable latency, errors and rate limiting, so the
+crawler can be measured without spending API credit. Point the app at it
+with ``ZYTE_API_URL=http://127.0.0.1:8999/v1/`` (any ZYTE_API_KEY will do).
+
+Whether a URL is indexed is decided by a hash of its normalized form, so a
+URL gets the same answer from its own site: query, from a coalesced
+site:host query and from run to run. A site:host query lists the host's
+``/page/<n>`` URLs in order, as the e2e benchmark generates them.
+
+GET /stats returns request counters; POST /stats/reset clears them.
+
+Usage: python benchmarks/mock_zyte.py [--port 8999] [--latency 0.5] [--jitter 0.2]
+           [--indexed 0.7] [--error-rate 0] [--bad-serp 0] [--max-concurrency 0] [--rps 0]
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import random
+import sys
+import time
+import zlib
+from urllib.parse import parse_qs, urlsplit
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from urlnorm import normalize_url  # noqa: E402
+
+MAX_LISTED_PAGES = 10_000
+
+
+class MockZyte:
+    def __init__(self, args):
+        self.args = args
+        self.inflight = 0
+        self.tokens = float(args.rps)
+        self.refilled_at = time.monotonic()
+        self.stats = {}
+        self.reset()
+
+    def reset(self):
+        self.stats = {
+            "requests": 0,
+            "site_queries": 0,
+            "throttled": 0,
+            "errors": 0,
+            "bad_serp": 0,
+            "peak_concurrency": 0,
+            "started_at": time.time()
+        }
+
+    def indexed(self, url: str) -> bool:
+        key = normalize_url(url).encode('utf-8')
+        return zlib.crc32(key) % 1000 < self.args.indexed * 1000
+
+    def throttled(self) -> bool:
+        if self.args.max_concurrency and self.inflight >= self.args.max_concurrency:
+            return True
+        if self.args.rps:
+            now = time.monotonic()
+            self.tokens = min(self.args.rps, self.tokens + (now - self.refilled_at) * self.args.rps)
+            self.refilled_at = now
+            if self.tokens < 1:
+                return True
+            self.tokens -= 1
+        return False
+
+    def organic_results(self, search_url: str):
+        query = parse_qs(urlsplit(search_url).query)
+        target = query.get("q", [""])[0]
+        if target.startswith("site:"):
+            target = target[len("site:"):]
+
+        if "num" not in query:
+            # A single URL's own query: it is listed first if it is indexed,
+            # followed by unrelated pages on other sites
+            results = [{"url": target, "name": "Result"}] if self.indexed(target) else []
+            results += [
+                {"url": f"https://unrelated{n}.example.org/{zlib.crc32(target.encode())}", "name": "Other"}
+                for n in range(self.args.results - len(results))
+            ]
+            return results
+
+        # A coalesced site: query listing a whole host or path prefix
+        self.stats["site_queries"] += 1
+        num = int(query["num"][0])
+        start = int(query.get("start", ["0"])[0])
+        prefix = target.split("://", 1)[-1].rstrip("/")
+        host = prefix.split("/", 1)[0]
+        listed = (f"https://{host}/page/{n}" for n in range(MAX_LISTED_PAGES))
+        listed = (url for url in listed if url.startswith(f"https://{prefix}/") and self.indexed(url))
+        return [{"url": url, "name": "Result", "rank": start + rank + 1}
+                for rank, url in enumerate(itertools.islice(listed, start, start + num))]
+
+    async def extract(self, request: Request):
+        body = await request.json()
+        self.stats["requests"] += 1
+
+        if self.throttled():
+            self.stats["throttled"] += 1
+            return JSONResponse(status_code=429, content={
+                "type": "/limits/over-user-limit",
+                "title": "User has too many parallel requests",
+                "status": 429
+            })
+
+        self.inflight += 1
+        self.stats["peak_concurrency"] = max(self.stats["peak_concurrency"], self.inflight)
+        try:
+            delay = self.args.latency + random.uniform(-self.args.jitter, self.args.jitter)
+            await asyncio.sleep(max(0.0, delay))
+        finally:
+            self.inflight -= 1
+
+        if random.random() < self.args.error_rate:
+            self.stats["errors"] += 1
+            return JSONResponse(status_code=self.args.error_status, content={
+                "type": "/download/temporary-error",
+                "title": "Temporary Downloading Error",
+                "status": self.args.error_status
+            })
+
+        if random.random() < self.args.bad_serp:
+            self.stats["bad_serp"] += 1
+            return {"url": body["url"], "statusCode": 200}
+
+        return {
+            "url": body["url"],
+            "statusCode": 200,
+            "serp": {
+                "url": body["url"],
+                "pageNumber": 1,
+                "organicResults": self.organic_results(body["url"])
+            }
+        }
+
+
+def create_app(args) -> FastAPI:
+    mock = MockZyte(args)
+    app = FastAPI(title="Mock Zyte API")
+    app.add_api_route("/v1/extract", mock.extract, methods=["POST"])
+
+    @app.get("/stats")
+    async def stats():
+        return {**mock.stats, "inflight": mock.inflight}
+
+    @app.post("/stats/reset")
+    async def reset_stats():
+        mock.reset()
+        return {"reset": True}
+
+    return app
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8999)
+    parser.add_argument('--latency', type=float, default=0.5, help='mean seconds per request')
+    parser.add_argument('--jitter', type=float, default=0.2, help='latency varies by up to this many seconds')
+    parser.add_argument('--indexed', type=float, default=0.7, help='share of URLs reported as indexed')
+    parser.add_argument('--results', type=int, default=10, help='organic results per per-URL SERP')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='share of requests failing with --error-status')
+    parser.add_argument('--error-status', type=int, default=520, help='HTTP status of failed requests')
+    parser.add_argument('--bad-serp', type=float, default=0.0, help='share of 200 responses without SERP data')
+    parser.add_argument('--max-concurrency', type=int, default=0, help='429 above this many requests in flight (0: no limit)')
+    parser.add_argument('--rps', type=float, default=0.0, help='429 above this many requests per second (0: no limit)')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    uvicorn.run(create_app(args), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == '__main__':
+    main()
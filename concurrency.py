@@ -0,0 +1,128 @@
+import asyncio
+import collections
+import logging
+import statistics
+import time
+from typing import Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class AdaptiveConcurrency:
+    """AIMD controller for the number of Zyte API requests in flight.
+
+    Every finished request is recorded with its latency and whether it
+    failed or was throttled. Once per ``interval`` the window is judged:
+    any throttling, an error rate above ``error_threshold`` or a median
+    latency above ``latency_target`` cuts the limit multiplicatively;
+    otherwise, if work was queued behind the limit, it grows by
+    ``increase_step``. Listeners are told about every new limit so the
+    crawl machinery can be resized to it.
+    """
+
+    def __init__(self, initial: int, minimum: int, maximum: int, latency_target: float = 15.0,
+                 error_threshold: float = 0.05, increase_step: int = 2, decrease_factor: float = 0.7,
+                 interval: float = 5.0, min_samples: int = 5):
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.limit = min(max(initial, self.minimum), self.maximum)
+        self.latency_target = latency_target
+        self.error_threshold = error_threshold
+        self.increase_step = increase_step
+        self.decrease_factor = decrease_factor
+        self.interval = interval
+        self.min_samples = min_samples
+
+        self._latencies: List[float] = []
+        self._requests = 0
+        self._errors = 0
+        self._throttled = 0
+        self._listeners: List[Callable[[int], None]] = []
+        self._saturated: Callable[[], bool] = lambda: True
+        self._history = collections.deque(maxlen=20)
+        self._last = {"latency_p50": None, "error_rate": 0.0, "throttled": 0, "requests": 0}
+        self.last_change: Optional[str] = None
+        self.adjusted_at: Optional[float] = None
+
+    def add_listener(self, listener: Callable[[int], None]):
+        self._listeners.append(listener)
+        listener(self.limit)
+
+    def set_saturation_probe(self, probe: Callable[[], bool]):
+        """``probe`` tells whether work is waiting on the limit; the limit only grows when it is"""
+        self._saturated = probe
+
+    def record(self, latency: Optional[float] = None, error: bool = False, throttled: bool = False):
+        self._requests += 1
+        if latency is not None:
+            self._latencies.append(latency)
+        if error:
+            self._errors += 1
+        if throttled:
+            self._throttled += 1
+
+    def record_throttled(self, count: int):
+        """Throttling that was retried away before it could show up as an error"""
+        if count > 0:
+            self._throttled += count
+
+    def adjust(self) -> int:
+        requests, errors, throttled = self._requests, self._errors, self._throttled
+        latency = statistics.median(self._latencies) if self._latencies else None
+        self._latencies = []
+        self._requests = self._errors = self._throttled = 0
+
+        error_rate = errors / requests if requests else 0.0
+        self._last = {
+            "latency_p50": round(latency, 3) if latency is not None else None,
+            "error_rate": round(error_rate, 3),
+            "throttled": throttled,
+            "requests": requests
+        }
+
+        previous = self.limit
+        if throttled or (requests >= self.min_samples and error_rate > self.error_threshold):
+            reason = "throttled" if throttled else "errors"
+            self.limit = max(self.minimum, int(self.limit * self.decrease_factor))
+        elif requests >= self.min_samples and latency is not None and latency > self.latency_target:
+            reason = "latency"
+            self.limit = max(self.minimum, int(self.limit * self.decrease_factor))
+        elif requests >= self.min_samples and self._saturated():
+            reason = "increase"
+            self.limit = min(self.maximum, self.limit + self.increase_step)
+        else:
+            return self.limit
+
+        if self.limit != previous:
+            self.last_change = reason
+            self.adjusted_at = time.time()
+            self._history.append((round(self.adjusted_at, 1), self.limit, reason))
+            logger.info(f"Concurrency {previous} -> {self.limit} ({reason}, {self._last})")
+            for listener in self._listeners:
+                try:
+                    listener(self.limit)
+                except Exception as e:
+                    logger.error(f"Concurrency listener failed: {e}")
+        return self.limit
+
+    async def run(self, sample: Optional[Callable[[], None]] = None):
+        """Adjust every ``interval`` seconds; ``sample`` is called first to pull in external counters"""
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                if sample is not None:
+                    sample()
+                self.adjust()
+            except Exception as e:
+                logger.error(f"Concurrency adjustment failed: {e}")
+
+    def snapshot(self) -> dict:
+        return {
+            "limit": self.limit,
+            "min": self.minimum,
+            "max": self.maximum,
+            "last_change": self.last_change,
+            "adjusted_at": self.adjusted_at,
+            "window": dict(self._last),
+            "history": list(self._history)
+        }
@@ -0,0 +1,243 @@
+import asyncio
+import logging
+import os
+import sys
+import uuid
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class _Batch:
+    def __init__(self, expected: int, future: asyncio.Future, on_item: Callable[[dict], None]):
+        self.expected = expected
+        self.future = future
+        self.on_item = on_item
+        self.count = 0
+        # Requests of the batch that are queued or being downloaded
+        self.requests = 0
+
+
+class DropAbandonedRequests:
+    """Downloader middleware that drops requests of batches nobody is waiting
+    for any more, such as those of a cancelled job, before they cost a Zyte
+    API call. The spider's errback still runs, but its item is discarded."""
+
+    def __init__(self, batches: Dict[str, _Batch]):
+        self.batches = batches
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(crawler.index_checker_batches)
+
+    def process_request(self, request, spider):
+        batch_id = request.meta.get("batch_id")
+        if batch_id is not None and batch_id not in self.batches:
+            from scrapy.exceptions import IgnoreRequest
+            raise IgnoreRequest(f"Batch {batch_id} was abandoned")
+
+
+class InProcessCrawlEngine:
+    """Runs GrSpider inside the API's asyncio loop.
+
+    A single crawler is started in service mode and kept open for the
+    lifetime of the process, so every batch of every job shares the same
+    Scrapy engine and Zyte API connection pool instead of paying for a new
+    ``scrapy crawl`` interpreter each time.
+
+    A batch with nothing queued or downloading that gets no item for
+    ``idle_timeout`` seconds ends with the items it has, so an item lost
+    to a spider error can't hold its job forever.
+    """
+
+    def __init__(self, spider_path: str, log_level: str = "ERROR", settings: Optional[dict] = None,
+                 idle_timeout: Optional[float] = None):
+        self.spider_path = spider_path
+        self.log_level = log_level
+        self.settings_overrides = settings or {}
+        self.idle_timeout = idle_timeout or None
+        self.crawler = None
+        self.spider = None
+        self._batches: Dict[str, _Batch] = {}
+        self._crawl_done = None
+
+    @property
+    def running(self) -> bool:
+        return self.spider is not None
+
+    async def start(self):
+        if self.spider_path not in sys.path:
+            sys.path.insert(0, self.spider_path)
+        os.environ.setdefault("SCRAPY_SETTINGS_MODULE", "GoogleIndexSpider.settings")
+
+        for name in ("scrapy", "scrapy_zyte_api", "zyte_api", "twisted", "GoogleIndexSpider"):
+            logging.getLogger(name).setLevel(self.log_level)
+
+        # The reactor has to be installed on the already running uvicorn
+        # loop before anything imports twisted.internet.reactor
+        from scrapy.utils.project import get_project_settings
+        from scrapy.utils.reactor import install_reactor, is_asyncio_reactor_installed
+
+        settings = get_project_settings()
+        settings.setdict(self.settings_overrides, priority="cmdline")
+        middlewares = settings.getdict("DOWNLOADER_MIDDLEWARES")
+        middlewares[DropAbandonedRequests] = 50
+        settings.set("DOWNLOADER_MIDDLEWARES", middlewares, priority="cmdline")
+        install_reactor(settings["TWISTED_REACTOR"])
+        if not is_asyncio_reactor_installed():
+            raise RuntimeError("A non-asyncio Twisted reactor is already installed")
+
+        from twisted.internet import reactor
+        if not reactor.running:
+            reactor.startRunning(installSignalHandlers=False)
+
+        from scrapy import signals
+        from scrapy.crawler import CrawlerRunner
+        from scrapy.utils.defer import deferred_to_future
+
+        runner = CrawlerRunner(settings)
+        self.crawler = runner.create_crawler("gr")
+        self.crawler.index_checker_batches = self._batches
+        self.crawler.signals.connect(self._item_scraped, signal=signals.item_scraped)
+        self.crawler.signals.connect(self._request_scheduled, signal=signals.request_scheduled)
+        self.crawler.signals.connect(self._request_done, signal=signals.request_left_downloader)
+        self.crawler.signals.connect(self._request_done, signal=signals.request_dropped)
+        self.crawler.signals.connect(self._spider_closed, signal=signals.spider_closed)
+
+        opened = asyncio.get_running_loop().create_future()
+
+        def spider_opened(spider):
+            if not opened.done():
+                opened.set_result(spider)
+
+        self.crawler.signals.connect(spider_opened, signal=signals.spider_opened, weak=False)
+
+        self._crawl_done = deferred_to_future(runner.crawl(self.crawler, service=True))
+        done, _ = await asyncio.wait({opened, self._crawl_done}, return_when=asyncio.FIRST_COMPLETED)
+        if opened not in done:
+            # The crawl finished (or failed) before the spider ever opened
+            self._crawl_done.result()
+            raise RuntimeError("In-process crawler closed during startup")
+
+        self.spider = opened.result()
+        logger.info("In-process crawl engine started")
+
+    async def stop(self):
+        if not self.running:
+            return
+        from scrapy.utils.defer import deferred_to_future
+
+        await deferred_to_future(self.crawler.stop())
+        logger.info("In-process crawl engine stopped")
+
+    async def crawl(self, urls: List[str], on_item: Callable[[dict], None], priority: int = 0) -> int:
+        """Crawl ``urls``, passing each item to ``on_item`` as it is scraped.
+
+        Requests of a higher ``priority`` leave the scheduler ahead of those
+        already queued. If the caller is cancelled, requests of the batch
+        that have not been sent yet are dropped.
+        """
+        if not self.running:
+            raise RuntimeError("In-process crawl engine is not running")
+        if not urls:
+            return 0
+
+        batch_id = uuid.uuid4().hex
+        batch = _Batch(len(urls), asyncio.get_running_loop().create_future(), on_item)
+        self._batches[batch_id] = batch
+
+        try:
+            requests = self.spider.make_requests(enumerate(urls), batch_id=batch_id, total=len(urls), priority=priority)
+            for request in requests:
+                self.crawler.engine.crawl(request)
+
+            while True:
+                count = batch.count
+                try:
+                    return await asyncio.wait_for(asyncio.shield(batch.future), self.idle_timeout)
+                except asyncio.TimeoutError:
+                    # A batch whose requests wait behind other batches' is
+                    # slow, not stuck
+                    if batch.count == count and batch.requests <= 0:
+                        logger.warning(f"No item for {self.idle_timeout:g}s, ending batch {batch_id} "
+                                       f"with {batch.count} of {batch.expected}")
+                        return batch.count
+        finally:
+            self._batches.pop(batch_id, None)
+
+    def set_concurrency(self, limit: int):
+        """Resize the shared downloader to ``limit`` requests in flight.
+
+        Every check goes to the same Google slot, so the slot's concurrency
+        is the limit that matters; the downloader total follows it so the
+        engine stops pulling requests from the scheduler at the same point.
+        """
+        if not self.running or self.crawler.engine is None:
+            return
+        downloader = self.crawler.engine.downloader
+        downloader.total_concurrency = limit
+        downloader.domain_concurrency = limit
+        for slot in downloader.slots.values():
+            slot.concurrency = limit
+
+    def backlog(self) -> int:
+        """Requests waiting for a download slot, in the scheduler or a slot queue"""
+        if not self.running or self.crawler.engine is None:
+            return 0
+        engine = self.crawler.engine
+        queued = len(engine.slot.scheduler) if engine.slot is not None else 0
+        return queued + sum(len(slot.queue) for slot in engine.downloader.slots.values())
+
+    def stat(self, key: str, default=0):
+        return self.crawler.stats.get_value(key, default) if self.crawler is not None else default
+
+    def stats(self) -> dict:
+        return self.crawler.stats.get_stats() if self.crawler is not None else {}
+
+    def _item_scraped(self, item, response, spider):
+        # Errback output is reported with the Failure in place of the response
+        request = getattr(response, "request", None)
+        batch = self._batches.get(request.meta.get("batch_id")) if request is not None else None
+        if batch is None or batch.future.done():
+            return
+
+        batch.count += 1
+        try:
+            batch.on_item(dict(item))
+        except Exception as e:
+            logger.error(f"Error handling scraped item: {e}")
+        if batch.count >= batch.expected:
+            batch.future.set_result(batch.count)
+
+    def _request_scheduled(self, request, spider):
+        batch = self._batches.get(request.meta.get("batch_id"))
+        if batch is not None:
+            batch.requests += 1
+
+    def _request_done(self, request, spider):
+        batch = self._batches.get(request.meta.get("batch_id"))
+        if batch is not None:
+            batch.requests -= 1
+
+    def _spider_closed(self, spider, reason):
+        logger.warning(f"In-process spider closed: {reason}")
+        self.spider = None
+        for batch in self._batches.values():
+            if not batch.future.done():
+                batch.future.set_exception(RuntimeError(f"Crawler closed: {reason}"))
+
+
+async def start_engine(spider_path: Optional[str], log_level: str = "ERROR", settings: Optional[dict] = None,
+                       idle_timeout: Optional[float] = None) -> Optional[InProcessCrawlEngine]:
+    """Start the in-process engine, returning None when it is unavailable"""
+    if not spider_path:
+        logger.warning("Spider project not found, using subprocess crawls")
+        return None
+
+    engine = InProcessCrawlEngine(spider_path, log_level=log_level, settings=settings, idle_timeout=idle_timeout)
+    try:
+        await engine.start()
+    except Exception as e:
+        logger.error(f"Could not start in-process crawl engine, falling back to subprocess crawls: {e}")
+        return None
+    return engine
@@ -0,0 +1,208 @@
+import asyncio
+import collections
+import importlib
+import logging
+import math
+import os
+import sys
+import time
+from typing import Callable, List, Optional, Tuple
+
+from scheduler import CrawlBudget
+
+logger = logging.getLogger(__name__)
+
+# Idle connections to the Zyte API are kept open this long for the next check
+KEEPALIVE_TIMEOUT = 60
+
+
+class DirectZyteEngine:
+    """Checks URLs by calling the Zyte API straight from the asyncio loop.
+
+    All GrSpider does for a check is wrap one Zyte API request, so this
+    engine leaves Scrapy out: every check is a POST on one pooled aiohttp
+    session that keeps its connections alive, retried by the Zyte client's
+    own retry policy as scrapy-zyte-api does. Queries, coalescing and the
+    result items come from the spider project's serp and matching modules,
+    so results are the same as with the Scrapy engines. The API key, API
+    URL and coalescing settings are read from the project's settings module.
+
+    Requests wait for one of ``concurrency`` slots, highest priority first.
+    """
+
+    def __init__(self, spider_path: str, concurrency: int, max_connections: int):
+        self.spider_path = spider_path
+        self.concurrency = concurrency
+        self.max_connections = max(max_connections, concurrency)
+        self.client = None
+        self.session = None
+        self._slots = CrawlBudget(concurrency)
+        self._stats = collections.Counter()
+
+    @property
+    def running(self) -> bool:
+        return self.session is not None
+
+    async def start(self):
+        if self.spider_path not in sys.path:
+            sys.path.insert(0, self.spider_path)
+        settings = importlib.import_module(os.environ.get("SCRAPY_SETTINGS_MODULE", "GoogleIndexSpider.settings"))
+        self.min_group = getattr(settings, "COALESCE_MIN_GROUP", 0)
+        self.per_page = getattr(settings, "COALESCE_RESULTS_PER_PAGE", 100)
+        self.max_pages = max(1, getattr(settings, "COALESCE_MAX_PAGES", 1))
+
+        import aiohttp
+        from zyte_api import AsyncZyteAPI
+
+        kwargs = {}
+        if getattr(settings, "ZYTE_API_KEY", None):
+            kwargs["api_key"] = settings.ZYTE_API_KEY
+        if getattr(settings, "ZYTE_API_URL", None):
+            kwargs["api_url"] = settings.ZYTE_API_URL
+        self.client = AsyncZyteAPI(n_conn=self.max_connections, **kwargs)
+        # The client's default session closes every connection after its
+        # response; this one keeps them for the next check
+        self.session = self.client.session(
+            connector=aiohttp.TCPConnector(limit=self.max_connections, keepalive_timeout=KEEPALIVE_TIMEOUT)
+        )
+        logger.info("Direct Zyte API engine started")
+
+    async def stop(self):
+        if not self.running:
+            return
+        session, self.session = self.session, None
+        await session.close()
+        logger.info("Direct Zyte API engine stopped")
+
+    async def crawl(self, urls: List[str], on_item: Callable[[dict], None], priority: int = 0) -> int:
+        """Check ``urls``, passing each item to ``on_item`` as soon as it is in.
+
+        Items are numbered by position in ``urls``, as GrSpider numbers
+        them. Cancelling the caller aborts the requests still in flight.
+        """
+        if not self.running:
+            raise RuntimeError("Direct Zyte API engine is not running")
+        if not urls:
+            return 0
+
+        from GoogleIndexSpider.matching import group_targets
+
+        count = 0
+
+        def emit(item: dict):
+            nonlocal count
+            count += 1
+            try:
+                on_item(item)
+            except Exception as e:
+                logger.error(f"Error handling checked item: {e}")
+
+        targets = list(enumerate(urls))
+        groups, singles = [], targets
+        if self.min_group > 0:
+            groups, singles = group_targets(targets, self.min_group, self.per_page * self.max_pages)
+
+        await asyncio.gather(
+            *(self._check_site(prefix, members, priority, emit) for prefix, members in groups),
+            *(self._check(idx, url, priority, emit) for idx, url in singles)
+        )
+        return count
+
+    async def _get(self, search_url: str, priority: int) -> Tuple[dict, float]:
+        """The Zyte API response to a SERP query and its latency, retries included"""
+        from GoogleIndexSpider.serp import SERP_META
+
+        async with self._slots.slot(priority):
+            self._stats["direct/requests"] += 1
+            started = time.perf_counter()
+            response = await self.session.get({"url": search_url, **SERP_META})
+            return response, time.perf_counter() - started
+
+    async def _check(self, idx: int, original_url: str, priority: int, emit: Callable[[dict], None]):
+        from GoogleIndexSpider.matching import TargetMatcher
+        from GoogleIndexSpider.serp import check_item, check_query, error_item, organic_results
+
+        _, search_url = check_query(original_url)
+        try:
+            response, latency = await self._get(search_url, priority)
+        except Exception as e:
+            logger.error(f"Request failed for {original_url}: {e}")
+            emit(error_item(idx, original_url, search_url, e))
+            return
+
+        try:
+            results = organic_results(response)
+            emit(check_item(idx, original_url, response.get("url") or search_url, results,
+                            TargetMatcher([(idx, original_url)]), latency))
+        except Exception as e:
+            logger.error(f"Error parsing response for {original_url}: {e}")
+            emit(error_item(idx, original_url, search_url, e, latency))
+
+    async def _check_site(self, prefix: str, members: List[Tuple[int, str]], priority: int,
+                          emit: Callable[[dict], None]):
+        """Resolve a group with site: queries, then check what they didn't list one by one"""
+        from GoogleIndexSpider.matching import TargetMatcher
+        from GoogleIndexSpider.serp import organic_results, site_items, site_query
+
+        matcher = TargetMatcher(members)
+        pending = dict(members)
+
+        async def page(number: int):
+            search_url = site_query(prefix, number, self.per_page)
+            try:
+                response, latency = await self._get(search_url, priority)
+                results = organic_results(response)
+                items = list(site_items(matcher, pending, response.get("url") or search_url, results, latency))
+            except Exception as e:
+                logger.warning(f"Site query for {prefix} failed, checking its URLs one by one: {e}")
+                return
+            self._stats["coalesce/site_queries"] += 1
+            for item in items:
+                self._stats["coalesce/resolved"] += 1
+                emit(item)
+
+        pages = min(self.max_pages, math.ceil(len(members) / self.per_page))
+        await asyncio.gather(*(page(number) for number in range(pages)))
+
+        self._stats["coalesce/fallback"] += len(pending)
+        await asyncio.gather(*(self._check(idx, url, priority, emit) for idx, url in pending.items()))
+
+    def set_concurrency(self, limit: int):
+        """Allow ``limit`` requests in flight; above the pool size they queue for a connection"""
+        self._slots.resize(limit)
+
+    def backlog(self) -> int:
+        """Checks waiting for a request slot"""
+        return self._slots.waiting
+
+    def stat(self, key: str, default=0):
+        return self.stats().get(key, default)
+
+    def stats(self) -> dict:
+        stats = dict(self._stats)
+        if self.client is not None:
+            agg = self.client.agg_stats
+            stats.update({
+                "zyte-api/attempts": agg.n_attempts,
+                "zyte-api/success": agg.n_success,
+                "zyte-api/errors": agg.n_errors,
+                "zyte-api/fatal_errors": agg.n_fatal_errors,
+                "zyte-api/429": agg.n_429
+            })
+        return stats
+
+
+async def start_direct_engine(spider_path: Optional[str], concurrency: int,
+                              max_connections: int) -> Optional[DirectZyteEngine]:
+    """Start the direct engine, returning None when it is unavailable"""
+    if not spider_path:
+        logger.warning("Spider project not found, direct Zyte API engine unavailable")
+        return None
+
+    engine = DirectZyteEngine(spider_path, concurrency, max_connections)
+    try:
+        await engine.start()
+    except Exception as e:
+        logger.error(f"Could not start direct Zyte API engine, using Scrapy: {e}")
+        return None
+    return engine
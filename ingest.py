@@ -0,0 +1,355 @@
+import asyncio
+import csv
+import gzip
+import io
+import ipaddress
+import json
+import logging
+import os
+import socket
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import xml.etree.ElementTree as ET
+from typing import AsyncIterator, BinaryIO, Iterable, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+URL_COLUMN_NAMES = ('url', 'urls', 'link', 'links', 'loc', 'address', 'page')
+SITEMAP_FETCH_TIMEOUT = 30
+INPUT_STALL_TIMEOUT = 300
+
+
+class InputSpool:
+    """Append-only file of a job's input URLs, one per line.
+
+    The parser appends to it while the job reads it with ``iter_chunks``,
+    so crawling can start long before a large upload has been parsed. The
+    file is also what a job is resumed from after a restart.
+
+    The job usually runs in another process, which opens the file with
+    ``open``: closing the spool writes a small done marker next to it,
+    and that is how the reader knows the input is complete.
+    """
+
+    def __init__(self, path: str, finished: bool = False):
+        self.path = path
+        self.rows = 0
+        self.finished = finished
+        self.error: Optional[str] = None
+        # Seconds the writer took to fill the spool, once it is finished
+        self.seconds: Optional[float] = None
+        self._file = None
+        self._started = time.perf_counter()
+
+        if not finished:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._file = open(path, 'wb')
+
+    @property
+    def marker_path(self) -> str:
+        return self.path + '.done'
+
+    @classmethod
+    def open(cls, path: str) -> "InputSpool":
+        """Open a job's input for reading, whether or not its writer has finished"""
+        if not os.path.exists(path):
+            raise FileNotFoundError(path)
+        spool = cls(path, finished=True)
+        spool.finished = spool._read_marker()
+        return spool
+
+    def _read_marker(self) -> bool:
+        try:
+            with open(self.marker_path, 'r', encoding='utf-8') as f:
+                marker = json.load(f)
+        except (OSError, ValueError):
+            return False
+        self.rows = marker.get('rows', 0)
+        self.error = marker.get('error')
+        self.seconds = marker.get('seconds')
+        return True
+
+    def add_many(self, urls: Iterable[str]):
+        lines = [url.replace('\r', ' ').replace('\n', ' ').strip() for url in urls]
+        lines = [line for line in lines if line]
+        if not lines:
+            return
+        self._file.write(('\n'.join(lines) + '\n').encode('utf-8'))
+        self._file.flush()
+        self.rows += len(lines)
+
+    def close(self):
+        if self._file is None:
+            return
+        self._file.close()
+        self._file = None
+        self.seconds = round(time.perf_counter() - self._started, 4)
+        with open(self.marker_path, 'w', encoding='utf-8') as f:
+            json.dump({'rows': self.rows, 'error': self.error, 'seconds': self.seconds}, f)
+        self.finished = True
+
+    def abort(self, error: str):
+        self.error = error
+        self.close()
+
+    def remove(self):
+        for path in (self.path, self.marker_path):
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+
+    async def iter_chunks(self, chunk_size: int = 1000, poll_interval: float = 0.2,
+                          stall_timeout: float = INPUT_STALL_TIMEOUT) -> AsyncIterator[List[str]]:
+        """Yield lists of URLs as they are appended, until the writer closes the spool.
+
+        Gives up if the file stops growing for ``stall_timeout`` seconds
+        without being closed, e.g. because the process parsing an upload
+        died.
+        """
+        with open(self.path, 'rb') as f:
+            buffered = b''
+            idle = 0.0
+            while True:
+                # Read the finished flag before reading, so nothing written
+                # just before close() can be missed
+                if not self.finished and self._file is None:
+                    self.finished = self._read_marker()
+                finished = self.finished
+                data = await asyncio.to_thread(f.read, 256 * 1024)
+                if data:
+                    idle = 0.0
+                    buffered += data
+                    *lines, buffered = buffered.split(b'\n')
+                    for i in range(0, len(lines), chunk_size):
+                        chunk = [line.decode('utf-8') for line in lines[i:i + chunk_size] if line]
+                        if chunk:
+                            yield chunk
+                    continue
+                if finished:
+                    break
+                if idle >= stall_timeout:
+                    raise ValueError("The input stopped growing before it was complete")
+                await asyncio.sleep(poll_interval)
+                idle += poll_interval
+
+            if self.error:
+                raise ValueError(self.error)
+            if buffered.strip():
+                yield [buffered.decode('utf-8')]
+
+
+def fill_spool(spool: InputSpool, urls: Iterable[str], chunk_size: int = 1000):
+    """Write parsed URLs into the spool in chunks, then close it"""
+    try:
+        chunk = []
+        for url in urls:
+            chunk.append(url)
+            if len(chunk) >= chunk_size:
+                spool.add_many(chunk)
+                chunk = []
+        spool.add_many(chunk)
+    except Exception as e:
+        logger.error(f"Failed to parse uploaded URLs: {str(e)}")
+        spool.abort(f"Could not parse upload: {e}")
+        return
+    spool.close()
+
+
+def detect_format(filename: str, head: bytes) -> str:
+    """Guess the upload format from its first bytes, falling back to the file name"""
+    name = (filename or '').lower()
+    if name.endswith('.gz'):
+        name = name[:-3]
+    stripped = head.lstrip(b'\xef\xbb\xbf \t\r\n')
+
+    if head.startswith(b'\x1f\x8b'):
+        return 'gzip'
+    if head.startswith(b'PK\x03\x04'):
+        return 'xlsx'
+    if stripped.startswith(b'<') or name.endswith('.xml'):
+        return 'sitemap'
+    if name.endswith('.csv'):
+        return 'csv'
+    return 'txt'
+
+
+def iter_upload_urls(source: BinaryIO, filename: str = '') -> Iterator[str]:
+    """Yield the URLs in an uploaded TXT, CSV, XLSX or sitemap file, as it is read"""
+    fmt = detect_format(filename, _peek(source))
+    if fmt == 'gzip':
+        with gzip.GzipFile(fileobj=source, mode='rb') as unzipped:
+            inner = filename[:-3] if filename.lower().endswith('.gz') else filename
+            if detect_format(inner, _peek(unzipped)) == 'xlsx':
+                raise ValueError("Gzipped XLSX files are not supported")
+            yield from iter_upload_urls(unzipped, inner)
+        return
+
+    logger.info(f"Parsing upload {filename or '<unnamed>'} as {fmt}")
+    if fmt == 'xlsx':
+        yield from iter_xlsx_urls(source)
+    elif fmt == 'sitemap':
+        yield from iter_sitemap_urls(source)
+    elif fmt == 'csv':
+        yield from iter_csv_urls(source)
+    else:
+        yield from iter_text_urls(source)
+
+
+def _peek(source: BinaryIO, size: int = 512) -> bytes:
+    if hasattr(source, 'peek'):
+        return source.peek(size)[:size]
+    position = source.tell()
+    head = source.read(size)
+    source.seek(position)
+    return head
+
+
+def iter_text_urls(source: BinaryIO) -> Iterator[str]:
+    for line in io.TextIOWrapper(source, encoding='utf-8-sig', errors='replace'):
+        url = line.strip()
+        if url and not url.startswith('#'):
+            yield url
+
+
+def iter_csv_urls(source: BinaryIO) -> Iterator[str]:
+    text = io.TextIOWrapper(source, encoding='utf-8-sig', errors='replace', newline='')
+    yield from _iter_table_urls(csv.reader(text))
+
+
+def iter_xlsx_urls(source: BinaryIO) -> Iterator[str]:
+    """URLs from the first sheet, read row by row in openpyxl's read-only mode"""
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(source, read_only=True, data_only=True)
+    try:
+        yield from _iter_table_urls(workbook.worksheets[0].iter_rows(values_only=True))
+    finally:
+        workbook.close()
+
+
+def _looks_like_url(value: str) -> bool:
+    return '.' in value and ' ' not in value
+
+
+def _iter_table_urls(rows: Iterable[Iterable]) -> Iterator[str]:
+    """The URL column of a table: the one with a URL-like header, otherwise the first"""
+    column = None
+    for row in rows:
+        cells = ['' if cell is None else str(cell).strip() for cell in row]
+        if column is None:
+            names = [cell.lower() for cell in cells]
+            for name in URL_COLUMN_NAMES:
+                if name in names:
+                    column = names.index(name)
+                    break
+            if column is not None:
+                continue
+            column = 0
+            if cells and not _looks_like_url(cells[0]):
+                # A header we don't recognise
+                continue
+
+        if column < len(cells) and cells[column]:
+            yield cells[column]
+
+
+def _local_name(tag: str) -> str:
+    return tag.rsplit('}', 1)[-1]
+
+
+def iter_sitemap_urls(source: BinaryIO, depth: int = 0, max_depth: int = 3) -> Iterator[str]:
+    """Page URLs in a sitemap, following sitemap index entries to child sitemaps.
+
+    Parsed with iterparse and cleared element by element, so memory stays
+    flat however many entries the sitemap has.
+    """
+    context = ET.iterparse(source, events=('start', 'end'))
+    root = None
+    for event, elem in context:
+        if event == 'start':
+            if root is None:
+                root = elem
+            continue
+
+        name = _local_name(elem.tag)
+        if name not in ('url', 'sitemap'):
+            continue
+
+        loc = None
+        for child in elem:
+            if _local_name(child.tag) == 'loc' and child.text:
+                loc = child.text.strip()
+                break
+        root.clear()
+
+        if not loc:
+            continue
+        if name == 'url':
+            yield loc
+        elif depth < max_depth:
+            yield from fetch_sitemap_urls(loc, depth + 1, max_depth)
+        else:
+            logger.warning(f"Skipping nested sitemap {loc}: too deep")
+
+
+def check_sitemap_url(url: str):
+    """Raise ValueError unless ``url`` is an http(s) URL on a public host.
+
+    Child sitemaps come from the uploaded file, so without this an upload
+    could have the server read local files or call internal services.
+    """
+    parts = urllib.parse.urlsplit(url)
+    if parts.scheme not in ('http', 'https') or not parts.hostname:
+        raise ValueError("only http and https sitemaps are fetched")
+    try:
+        addresses = socket.getaddrinfo(parts.hostname, parts.port or None, proto=socket.IPPROTO_TCP)
+    except socket.gaierror as e:
+        raise ValueError(f"cannot resolve {parts.hostname}: {e}")
+    for *_, sockaddr in addresses:
+        address = ipaddress.ip_address(sockaddr[0].split('%', 1)[0])
+        if (address.is_private or address.is_loopback or address.is_link_local or address.is_reserved
+                or address.is_multicast or address.is_unspecified):
+            raise ValueError(f"{parts.hostname} is not a public address")
+
+
+class _SitemapRedirectHandler(urllib.request.HTTPRedirectHandler):
+    """Follows a redirect only to a URL a child sitemap could have had"""
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        try:
+            check_sitemap_url(newurl)
+        except ValueError as e:
+            raise urllib.error.HTTPError(newurl, code, f"redirect refused: {e}", headers, fp)
+        return super().redirect_request(req, fp, code, msg, headers, newurl)
+
+
+_sitemap_opener = urllib.request.build_opener(_SitemapRedirectHandler)
+
+
+def fetch_sitemap_urls(url: str, depth: int = 1, max_depth: int = 3) -> Iterator[str]:
+    """Download a child sitemap of a sitemap index and yield its page URLs.
+
+    A child that can't be fetched or read is logged and skipped, keeping
+    the URLs the rest of the index lists.
+    """
+    logger.info(f"Fetching child sitemap {url}")
+    try:
+        check_sitemap_url(url)
+        response = _sitemap_opener.open(url, timeout=SITEMAP_FETCH_TIMEOUT)
+    except Exception as e:
+        logger.error(f"Could not fetch sitemap {url}: {str(e)}")
+        return
+
+    try:
+        with response:
+            stream = io.BufferedReader(response)
+            if stream.peek(2)[:2] == b'\x1f\x8b':
+                stream = gzip.GzipFile(fileobj=stream, mode='rb')
+            yield from iter_sitemap_urls(stream, depth, max_depth)
+    except (ET.ParseError, OSError, EOFError) as e:
+        logger.error(f"Could not read sitemap {url}, skipping the rest of it: {str(e)}")
@@ -0,0 +1,226 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+
+class ClaimedJob(NamedTuple):
+    job_id: str
+    # How many times the job has been handed to a worker, this time included,
+    # not counting the times a worker handed it back with release()
+    attempts: int
+
+
+class JobQueue:
+    """Durable queue of the jobs waiting for a worker process.
+
+    Jobs are handed out highest priority first, then oldest first. A
+    worker claims a job with a lease and renews it while the job runs.
+    A job whose lease runs out, because its worker crashed or was killed,
+    goes back to the queue and is resumed from its checkpoint by the next
+    worker to claim it. Finished jobs are removed from the queue.
+    """
+
+    def enqueue(self, job_id: str, priority: int = 0):
+        """Add a job; a job that is already queued or running is left as it is"""
+        raise NotImplementedError
+
+    def claim(self, worker_id: str, lease: float, min_priority: Optional[int] = None) -> Optional[ClaimedJob]:
+        """Hand the next job nobody holds a live lease on to ``worker_id``,
+        only considering jobs of at least ``min_priority`` if it is given"""
+        raise NotImplementedError
+
+    def renew(self, worker_id: str, job_ids: Iterable[str], lease: float) -> List[str]:
+        """Extend the leases ``worker_id`` holds, returning the jobs it no longer holds"""
+        raise NotImplementedError
+
+    def release(self, worker_id: str, job_id: str):
+        """Put a job back without waiting for its lease to run out; a job
+        handed back this way doesn't count as an interrupted attempt"""
+        raise NotImplementedError
+
+    def withdraw(self, job_id: str) -> bool:
+        """Remove a job nobody holds a live lease on; False if a worker has it"""
+        raise NotImplementedError
+
+    def finish(self, worker_id: str, job_id: str):
+        """Remove a finished job, if ``worker_id`` still holds it"""
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, int]:
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class MemoryJobQueue(JobQueue):
+    """Process-local queue, for a single process with an embedded worker"""
+
+    def __init__(self):
+        # job_id -> [enqueued_at, attempts, worker_id, lease_until, priority]
+        self._jobs: Dict[str, list] = {}
+
+    def enqueue(self, job_id: str, priority: int = 0):
+        self._jobs.setdefault(job_id, [time.time(), 0, None, None, priority])
+
+    def claim(self, worker_id: str, lease: float, min_priority: Optional[int] = None) -> Optional[ClaimedJob]:
+        now = time.time()
+        free = [
+            (-entry[4], entry[0], job_id) for job_id, entry in self._jobs.items()
+            if (not entry[3] or entry[3] < now) and (min_priority is None or entry[4] >= min_priority)
+        ]
+        if not free:
+            return None
+        *_, job_id = min(free)
+        entry = self._jobs[job_id]
+        entry[1] += 1
+        entry[2:4] = [worker_id, now + lease]
+        return ClaimedJob(job_id, entry[1])
+
+    def renew(self, worker_id: str, job_ids: Iterable[str], lease: float) -> List[str]:
+        lost = []
+        for job_id in job_ids:
+            entry = self._jobs.get(job_id)
+            if entry is None or entry[2] != worker_id:
+                lost.append(job_id)
+            else:
+                entry[3] = time.time() + lease
+        return lost
+
+    def release(self, worker_id: str, job_id: str):
+        entry = self._jobs.get(job_id)
+        if entry is not None and entry[2] == worker_id:
+            entry[1] = max(entry[1] - 1, 0)
+            entry[2:4] = [None, None]
+
+    def withdraw(self, job_id: str) -> bool:
+        entry = self._jobs.get(job_id)
+        if entry is None or (entry[3] and entry[3] >= time.time()):
+            return False
+        del self._jobs[job_id]
+        return True
+
+    def finish(self, worker_id: str, job_id: str):
+        entry = self._jobs.get(job_id)
+        if entry is not None and entry[2] == worker_id:
+            del self._jobs[job_id]
+
+    def stats(self) -> Dict[str, int]:
+        now = time.time()
+        leased = sum(1 for entry in self._jobs.values() if entry[3] and entry[3] >= now)
+        return {"queued": len(self._jobs) - leased, "leased": leased}
+
+
+class SQLiteJobQueue(JobQueue):
+    """Queue shared by every process that opens the same file, on one host
+    or on a filesystem several hosts can lock"""
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS job_queue (
+                job_id TEXT PRIMARY KEY,
+                enqueued_at REAL NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                worker_id TEXT,
+                lease_until REAL,
+                priority INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(job_queue)")]
+        if "priority" not in columns:
+            self._conn.execute("ALTER TABLE job_queue ADD COLUMN priority INTEGER NOT NULL DEFAULT 0")
+        self._conn.execute("DROP INDEX IF EXISTS job_queue_order")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS job_queue_priority ON job_queue (priority, enqueued_at)")
+
+    def enqueue(self, job_id: str, priority: int = 0):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO job_queue (job_id, enqueued_at, priority) VALUES (?, ?, ?)",
+                (job_id, time.time(), priority)
+            )
+
+    def claim(self, worker_id: str, lease: float, min_priority: Optional[int] = None) -> Optional[ClaimedJob]:
+        now = time.time()
+        with self._lock:
+            # BEGIN IMMEDIATE so two workers can't both see the job as free
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT job_id, attempts FROM job_queue WHERE (lease_until IS NULL OR lease_until < ?) "
+                    "AND priority >= ? ORDER BY priority DESC, enqueued_at LIMIT 1",
+                    (now, min_priority if min_priority is not None else -2 ** 63)
+                ).fetchone()
+                if row is not None:
+                    self._conn.execute(
+                        "UPDATE job_queue SET attempts = attempts + 1, worker_id = ?, lease_until = ? WHERE job_id = ?",
+                        (worker_id, now + lease, row[0])
+                    )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return ClaimedJob(row[0], row[1] + 1) if row is not None else None
+
+    def renew(self, worker_id: str, job_ids: Iterable[str], lease: float) -> List[str]:
+        lease_until = time.time() + lease
+        lost = []
+        with self._lock:
+            for job_id in job_ids:
+                cursor = self._conn.execute(
+                    "UPDATE job_queue SET lease_until = ? WHERE job_id = ? AND worker_id = ?",
+                    (lease_until, job_id, worker_id)
+                )
+                if cursor.rowcount != 1:
+                    lost.append(job_id)
+        return lost
+
+    def release(self, worker_id: str, job_id: str):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE job_queue SET attempts = MAX(attempts - 1, 0), worker_id = NULL, lease_until = NULL "
+                "WHERE job_id = ? AND worker_id = ?",
+                (job_id, worker_id)
+            )
+
+    def withdraw(self, job_id: str) -> bool:
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM job_queue WHERE job_id = ? AND (lease_until IS NULL OR lease_until < ?)",
+                (job_id, time.time())
+            )
+        return cursor.rowcount == 1
+
+    def finish(self, worker_id: str, job_id: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM job_queue WHERE job_id = ? AND worker_id = ?", (job_id, worker_id))
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            total, leased = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(lease_until >= ?), 0) FROM job_queue", (time.time(),)
+            ).fetchone()
+        return {"queued": total - leased, "leased": leased}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def create_job_queue(url: str) -> JobQueue:
+    """Build a queue from a URL such as ``sqlite:///results/jobs.sqlite3`` or ``memory://``"""
+    if url.startswith("memory:"):
+        return MemoryJobQueue()
+    if url.startswith("sqlite:///"):
+        return SQLiteJobQueue(url[len("sqlite:///"):])
+    raise ValueError(f"Unsupported job queue URL: {url}")
@@ -0,0 +1,273 @@
+import itertools
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+FINISHED_STATUSES = ("completed", "failed", "cancelled")
+
+
+class JobStore:
+    """Where job records live, so any API worker can answer for any job.
+
+    A job record is the dict returned by /job-status. Implementations only
+    need to keep it keyed by job_id and be able to find finished jobs by
+    age for eviction.
+    """
+
+    def create(self, job_id: str, job: dict):
+        raise NotImplementedError
+
+    def get(self, job_id: str) -> Optional[dict]:
+        raise NotImplementedError
+
+    def update(self, job_id: str, **fields):
+        raise NotImplementedError
+
+    def list_jobs(self, status: Optional[str] = None) -> List[dict]:
+        raise NotImplementedError
+
+    def evict_finished(self, older_than: float) -> List[str]:
+        """Delete jobs finished more than ``older_than`` seconds ago, returning their ids"""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class MemoryJobStore(JobStore):
+    """Process-local store; jobs are lost on restart and not shared between workers"""
+
+    def __init__(self):
+        self._jobs: Dict[str, dict] = {}
+        self._finished_at: Dict[str, float] = {}
+
+    def create(self, job_id: str, job: dict):
+        self._jobs[job_id] = dict(job)
+
+    def get(self, job_id: str) -> Optional[dict]:
+        job = self._jobs.get(job_id)
+        return dict(job) if job is not None else None
+
+    def update(self, job_id: str, **fields):
+        job = self._jobs.get(job_id)
+        if job is None:
+            return
+        job.update(fields)
+        if job.get("status") in FINISHED_STATUSES:
+            self._finished_at.setdefault(job_id, time.time())
+
+    def list_jobs(self, status: Optional[str] = None) -> List[dict]:
+        return [
+            {"job_id": job_id, **job}
+            for job_id, job in self._jobs.items()
+            if status is None or job.get("status") == status
+        ]
+
+    def evict_finished(self, older_than: float) -> List[str]:
+        cutoff = time.time() - older_than
+        evicted = [job_id for job_id, finished in self._finished_at.items() if finished < cutoff]
+        for job_id in evicted:
+            self._jobs.pop(job_id, None)
+            self._finished_at.pop(job_id, None)
+        return evicted
+
+
+class SQLiteJobStore(JobStore):
+    """Embedded store shared by every process that opens the same file"""
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                job_id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                data TEXT NOT NULL,
+                updated_at REAL NOT NULL,
+                finished_at REAL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, finished_at)")
+
+    def create(self, job_id: str, job: dict):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (job_id, status, data, updated_at) VALUES (?, ?, ?, ?)",
+                (job_id, job["status"], json.dumps(job), now)
+            )
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT data FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def update(self, job_id: str, **fields):
+        now = time.time()
+        with self._lock:
+            # BEGIN IMMEDIATE takes the write lock up front, so concurrent
+            # read-modify-write updates from other processes can't interleave
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute("SELECT data FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+                if row is None:
+                    self._conn.execute("COMMIT")
+                    return
+                job = json.loads(row[0])
+                job.update(fields)
+                finished_at = now if job["status"] in FINISHED_STATUSES else None
+                self._conn.execute(
+                    "UPDATE jobs SET status = ?, data = ?, updated_at = ?, "
+                    "finished_at = COALESCE(finished_at, ?) WHERE job_id = ?",
+                    (job["status"], json.dumps(job), now, finished_at, job_id)
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def list_jobs(self, status: Optional[str] = None) -> List[dict]:
+        with self._lock:
+            if status is None:
+                rows = self._conn.execute("SELECT job_id, data FROM jobs").fetchall()
+            else:
+                rows = self._conn.execute("SELECT job_id, data FROM jobs WHERE status = ?", (status,)).fetchall()
+        return [{"job_id": job_id, **json.loads(data)} for job_id, data in rows]
+
+    def evict_finished(self, older_than: float) -> List[str]:
+        cutoff = time.time() - older_than
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT job_id FROM jobs WHERE finished_at IS NOT NULL AND finished_at < ?", (cutoff,)
+            ).fetchall()
+            evicted = [row[0] for row in rows]
+            if evicted:
+                self._conn.executemany("DELETE FROM jobs WHERE job_id = ?", [(job_id,) for job_id in evicted])
+        return evicted
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class JobCheckpoint:
+    """Results a job has collected so far, keyed by normalized URL.
+
+    Written once per finished batch so that a job interrupted by a restart
+    or crash only has to re-crawl the URLs that have no result yet. It also
+    takes the results a ResultIndex moves out of memory, failed ones
+    included; those are marked and dropped when the job is resumed, so
+    they are tried again.
+    """
+
+    def __init__(self, path: str, resume: bool = False):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, data TEXT NOT NULL, failed INTEGER NOT NULL DEFAULT 0)"
+        )
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(results)")]
+        if "failed" not in columns:
+            self._conn.execute("ALTER TABLE results ADD COLUMN failed INTEGER NOT NULL DEFAULT 0")
+        if resume:
+            self._conn.execute("DELETE FROM results WHERE failed = 1")
+        self._conn.commit()
+
+    def save(self, results: Dict[str, dict]):
+        if not results:
+            return
+        rows = [(key, json.dumps(result), 1 if result.get("error") else 0) for key, result in results.items()]
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO results (key, data, failed) VALUES (?, ?, ?)", rows)
+            self._conn.commit()
+
+    def get(self, key: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT data FROM results WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def close(self, remove: bool = False):
+        with self._lock:
+            self._conn.close()
+        if remove:
+            for suffix in ("", "-wal", "-shm"):
+                try:
+                    os.unlink(self.path + suffix)
+                except OSError:
+                    pass
+
+
+class ResultIndex:
+    """A running job's results by normalized URL, with only the newest in memory.
+
+    Once more than ``memory_limit`` results are held, the oldest half is
+    written to the job's checkpoint and dropped from memory; looking one of
+    those up reads it back from there. A job's memory use stays the same
+    however many distinct URLs it has. Every key is set once.
+    """
+
+    def __init__(self, checkpoint: JobCheckpoint, memory_limit: int):
+        self.checkpoint = checkpoint
+        self.memory_limit = max(2, memory_limit)
+        self._recent: "OrderedDict[str, dict]" = OrderedDict()
+        self._size = checkpoint.count()
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key) is not None
+
+    def __getitem__(self, key: str) -> dict:
+        result = self.get(key)
+        if result is None:
+            raise KeyError(key)
+        return result
+
+    def get(self, key: str, default: Optional[dict] = None) -> Optional[dict]:
+        result = self._recent.get(key)
+        if result is None:
+            result = self.checkpoint.get(key)
+        return result if result is not None else default
+
+    def __setitem__(self, key: str, result: dict):
+        if key not in self._recent:
+            self._size += 1
+        self._recent[key] = result
+        if len(self._recent) > self.memory_limit:
+            # One write for half the limit's worth, on the caller's thread,
+            # so a lookup can never miss a result that is being moved
+            spilled = dict(itertools.islice(self._recent.items(), len(self._recent) - self.memory_limit // 2))
+            self.checkpoint.save(spilled)
+            for spilled_key in spilled:
+                del self._recent[spilled_key]
+
+
+def create_job_store(url: str) -> JobStore:
+    """Build a store from a URL such as ``sqlite:///results/jobs.sqlite3`` or ``memory://``"""
+    if url.startswith("memory:"):
+        return MemoryJobStore()
+    if url.startswith("sqlite:///"):
+        return SQLiteJobStore(url[len("sqlite:///"):])
+    raise ValueError(f"Unsupported job store URL: {url}")
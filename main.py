@@ -1,979 +1,2353 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException, BackgroundTasks
-from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, HTMLResponse
-from pydantic import BaseModel
-from typing import List, Optional
-import pandas as pd
-import asyncio
-import uuid
-import os
-import json
-import tempfile
-import subprocess
-import sys
-from datetime import datetime
-import logging
-import io
-
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
-
-app = FastAPI(title="Google Index Checker", version="1.0.0")
-
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-job_status = {}
-
-class URLBatch(BaseModel):
-    urls: List[str]
-    batch_size: Optional[int] = 100
-
-@app.get("/", response_class=HTMLResponse)
-async def serve_frontend():
-    html_content = """
-<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>Google Index Checker Pro</title>
-    <link href="https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700&display=swap" rel="stylesheet">
-    <link href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/css/all.min.css" rel="stylesheet">
-    <style>
-        :root {
-            --primary-color: #2563eb;
-            --primary-dark: #1d4ed8;
-            --secondary-color: #64748b;
-            --success-color: #059669;
-            --warning-color: #d97706;
-            --error-color: #dc2626;
-            --background: #f8fafc;
-            --card-background: #ffffff;
-            --border-color: #e2e8f0;
-            --text-primary: #1e293b;
-            --text-secondary: #64748b;
-            --shadow: 0 10px 25px -3px rgba(0, 0, 0, 0.1), 0 4px 6px -2px rgba(0, 0, 0, 0.05);
-            --shadow-lg: 0 20px 25px -5px rgba(0, 0, 0, 0.1), 0 10px 10px -5px rgba(0, 0, 0, 0.04);
-        }
-
-        * {
-            margin: 0;
-            padding: 0;
-            box-sizing: border-box;
-        }
-
-        body {
-            font-family: 'Inter', -apple-system, BlinkMacSystemFont, sans-serif;
-            background: var(--background);
-            color: var(--text-primary);
-            line-height: 1.6;
-            min-height: 100vh;
-        }
-
-        .container {
-            max-width: 1200px;
-            margin: 0 auto;
-            padding: 2rem;
-        }
-
-        .header {
-            text-align: center;
-            margin-bottom: 3rem;
-        }
-
-        .header h1 {
-            font-size: 3rem;
-            font-weight: 700;
-            color: var(--primary-color);
-            margin-bottom: 0.5rem;
-            letter-spacing: -0.025em;
-        }
-
-        .header p {
-            font-size: 1.25rem;
-            color: var(--text-secondary);
-            font-weight: 400;
-        }
-
-        .main-card {
-            background: var(--card-background);
-            border-radius: 16px;
-            box-shadow: var(--shadow-lg);
-            overflow: hidden;
-            border: 1px solid var(--border-color);
-        }
-
-        .card-header {
-            background: linear-gradient(135deg, var(--primary-color) 0%, var(--primary-dark) 100%);
-            padding: 2rem;
-            color: white;
-        }
-
-        .card-header h2 {
-            font-size: 1.5rem;
-            font-weight: 600;
-            margin-bottom: 0.5rem;
-            display: flex;
-            align-items: center;
-            gap: 0.75rem;
-        }
-
-        .card-header p {
-            opacity: 0.9;
-            font-weight: 400;
-        }
-
-        .card-body {
-            padding: 2rem;
-        }
-
-        .form-group {
-            margin-bottom: 2rem;
-        }
-
-        .form-label {
-            display: block;
-            font-weight: 600;
-            color: var(--text-primary);
-            margin-bottom: 0.75rem;
-            font-size: 0.95rem;
-        }
-
-        .form-textarea {
-            width: 100%;
-            min-height: 200px;
-            padding: 1rem;
-            border: 2px solid var(--border-color);
-            border-radius: 12px;
-            font-size: 0.95rem;
-            font-family: 'SF Mono', Monaco, 'Cascadia Code', monospace;
-            resize: vertical;
-            transition: all 0.2s ease;
-            background: #fafbfc;
-        }
-
-        .form-textarea:focus {
-            outline: none;
-            border-color: var(--primary-color);
-            box-shadow: 0 0 0 3px rgba(37, 99, 235, 0.1);
-            background: white;
-        }
-
-        .form-textarea::placeholder {
-            color: var(--text-secondary);
-            font-family: 'Inter', sans-serif;
-        }
-
-        .settings-grid {
-            display: grid;
-            grid-template-columns: 1fr 200px;
-            gap: 1.5rem;
-            align-items: end;
-            margin-top: 1.5rem;
-        }
-
-        .batch-input {
-            padding: 0.75rem 1rem;
-            border: 2px solid var(--border-color);
-            border-radius: 8px;
-            font-size: 0.95rem;
-            text-align: center;
-            transition: all 0.2s ease;
-            background: white;
-        }
-
-        .batch-input:focus {
-            outline: none;
-            border-color: var(--primary-color);
-            box-shadow: 0 0 0 3px rgba(37, 99, 235, 0.1);
-        }
-
-        .submit-btn {
-            background: linear-gradient(135deg, var(--primary-color) 0%, var(--primary-dark) 100%);
-            color: white;
-            border: none;
-            padding: 1rem 2rem;
-            font-size: 1rem;
-            font-weight: 600;
-            border-radius: 12px;
-            cursor: pointer;
-            transition: all 0.2s ease;
-            width: 100%;
-            display: flex;
-            align-items: center;
-            justify-content: center;
-            gap: 0.75rem;
-            box-shadow: var(--shadow);
-        }
-
-        .submit-btn:hover:not(:disabled) {
-            transform: translateY(-1px);
-            box-shadow: 0 15px 30px -5px rgba(37, 99, 235, 0.3);
-        }
-
-        .submit-btn:active {
-            transform: translateY(0);
-        }
-
-        .submit-btn:disabled {
-            background: var(--text-secondary);
-            cursor: not-allowed;
-            transform: none;
-            box-shadow: none;
-        }
-
-        .info-card {
-            background: #f1f5f9;
-            border: 1px solid #cbd5e1;
-            border-radius: 12px;
-            padding: 1.5rem;
-            margin-top: 1.5rem;
-        }
-
-        .info-card h4 {
-            color: var(--primary-color);
-            font-weight: 600;
-            margin-bottom: 1rem;
-            display: flex;
-            align-items: center;
-            gap: 0.5rem;
-        }
-
-        .info-list {
-            list-style: none;
-            space-y: 0.5rem;
-        }
-
-        .info-list li {
-            display: flex;
-            align-items: center;
-            gap: 0.75rem;
-            color: var(--text-secondary);
-            margin-bottom: 0.5rem;
-        }
-
-        .info-list li i {
-            color: var(--success-color);
-            width: 16px;
-        }
-
-        .status-section {
-            margin-top: 2rem;
-            background: var(--card-background);
-            border-radius: 16px;
-            box-shadow: var(--shadow);
-            border: 1px solid var(--border-color);
-            overflow: hidden;
-            display: none;
-        }
-
-        .status-section.show {
-            display: block;
-        }
-
-        .status-header {
-            background: #f8fafc;
-            padding: 1.5rem 2rem;
-            border-bottom: 1px solid var(--border-color);
-        }
-
-        .status-header h3 {
-            font-weight: 600;
-            color: var(--text-primary);
-            display: flex;
-            align-items: center;
-            gap: 0.75rem;
-        }
-
-        .status-body {
-            padding: 2rem;
-        }
-
-        .status-message {
-            padding: 1rem 1.5rem;
-            border-radius: 12px;
-            margin-bottom: 1.5rem;
-            font-weight: 500;
-            display: flex;
-            align-items: center;
-            gap: 0.75rem;
-        }
-
-        .status-pending {
-            background: #fef3c7;
-            color: #92400e;
-            border: 1px solid #fcd34d;
-        }
-
-        .status-running {
-            background: #dbeafe;
-            color: #1e40af;
-            border: 1px solid #93c5fd;
-        }
-
-        .status-completed {
-            background: #d1fae5;
-            color: #065f46;
-            border: 1px solid #6ee7b7;
-        }
-
-        .status-error {
-            background: #fee2e2;
-            color: #991b1b;
-            border: 1px solid #fca5a5;
-        }
-
-        .progress-container {
-            margin-bottom: 1.5rem;
-        }
-
-        .progress-bar {
-            width: 100%;
-            height: 12px;
-            background: #e5e7eb;
-            border-radius: 6px;
-            overflow: hidden;
-            box-shadow: inset 0 1px 3px rgba(0, 0, 0, 0.1);
-        }
-
-        .progress-fill {
-            height: 100%;
-            background: linear-gradient(90deg, var(--primary-color), var(--primary-dark));
-            width: 0%;
-            transition: width 0.3s ease;
-            border-radius: 6px;
-        }
-
-        .progress-text {
-            text-align: center;
-            margin-top: 0.75rem;
-            font-weight: 600;
-            color: var(--text-primary);
-        }
-
-        .download-btn {
-            background: var(--success-color);
-            color: white;
-            border: none;
-            padding: 0.875rem 1.5rem;
-            font-size: 0.95rem;
-            font-weight: 600;
-            border-radius: 10px;
-            cursor: pointer;
-            text-decoration: none;
-            display: inline-flex;
-            align-items: center;
-            gap: 0.5rem;
-            transition: all 0.2s ease;
-            box-shadow: var(--shadow);
-        }
-
-        .download-btn:hover {
-            background: #047857;
-            transform: translateY(-1px);
-        }
-
-        .stats-grid {
-            display: grid;
-            grid-template-columns: repeat(auto-fit, minmax(200px, 1fr));
-            gap: 1rem;
-            margin-top: 1rem;
-        }
-
-        .stat-card {
-            background: white;
-            border: 1px solid var(--border-color);
-            border-radius: 8px;
-            padding: 1rem;
-            text-align: center;
-        }
-
-        .stat-value {
-            font-size: 1.5rem;
-            font-weight: 700;
-            color: var(--primary-color);
-        }
-
-        .stat-label {
-            font-size: 0.875rem;
-            color: var(--text-secondary);
-            margin-top: 0.25rem;
-        }
-
-        @media (max-width: 768px) {
-            .container {
-                padding: 1rem;
-            }
-
-            .header h1 {
-                font-size: 2rem;
-            }
-
-            .settings-grid {
-                grid-template-columns: 1fr;
-            }
-
-            .card-body {
-                padding: 1.5rem;
-            }
-        }
-    </style>
-</head>
-<body>
-    <div class="container">
-        <div class="header">
-            <h1><i class="fas fa-search"></i> Index Analyzer Pro</h1>
-            <p>Professional Google indexing analysis with comprehensive reporting</p>
-        </div>
-
-        <div class="main-card">
-            <div class="card-header">
-                <h2><i class="fas fa-link"></i> URL Analysis</h2>
-                <p>Submit your URLs for comprehensive Google indexing verification</p>
-            </div>
-            
-            <div class="card-body">
-                <div class="form-group">
-                    <label for="urls-textarea" class="form-label">
-                        <i class="fas fa-list"></i> URL List
-                    </label>
-                    <textarea 
-                        id="urls-textarea" 
-                        class="form-textarea"
-                        placeholder="https://example.com/page1
-https://example.com/page2
-https://example.com/page3
-
-Enter your URLs here, one per line
-Supports bulk processing of thousands of URLs"></textarea>
-                </div>
-
-                <div class="settings-grid">
-                    <div class="info-card">
-                        <h4><i class="fas fa-info-circle"></i> Processing Guidelines</h4>
-                        <ul class="info-list">
-                            <li><i class="fas fa-check"></i> One URL per line</li>
-                            <li><i class="fas fa-check"></i> Must include http:// or https://</li>
-                            <li><i class="fas fa-check"></i> Supports bulk processing</li>
-                            <li><i class="fas fa-check"></i> Results exported to Excel</li>
-                        </ul>
-                    </div>
-                    
-                    <div class="form-group">
-                        <label class="form-label">
-                            <i class="fas fa-cogs"></i> Batch Size
-                        </label>
-                        <input type="number" id="batch-size" class="batch-input" value="100" min="1" max="500">
-                    </div>
-                </div>
-
-                <button class="submit-btn" id="submit-btn" onclick="startChecking()">
-                    <i class="fas fa-rocket"></i>
-                    <span>Start Analysis</span>
-                </button>
-            </div>
-        </div>
-        
-        <div class="status-section" id="status-section">
-            <div class="status-header">
-                <h3><i class="fas fa-chart-line"></i> Analysis Progress</h3>
-            </div>
-            <div class="status-body">
-                <div id="status-message" class="status-message"></div>
-                
-                <div class="progress-container">
-                    <div class="progress-bar">
-                        <div class="progress-fill" id="progress-fill"></div>
-                    </div>
-                    <div class="progress-text" id="progress-text">0 / 0 URLs processed</div>
-                </div>
-
-                <div class="stats-grid" id="stats-grid" style="display: none;">
-                    <div class="stat-card">
-                        <div class="stat-value" id="total-urls">0</div>
-                        <div class="stat-label">Total URLs</div>
-                    </div>
-                    <div class="stat-card">
-                        <div class="stat-value" id="processed-urls">0</div>
-                        <div class="stat-label">Processed</div>
-                    </div>
-                    <div class="stat-card">
-                        <div class="stat-value" id="completion-rate">0%</div>
-                        <div class="stat-label">Completion</div>
-                    </div>
-                </div>
-                
-                <a id="download-btn" class="download-btn" style="display: none;">
-                    <i class="fas fa-download"></i>
-                    Download Excel Report
-                </a>
-            </div>
-        </div>
-    </div>
-
-    <script>
-        let currentJobId = null;
-        let statusInterval = null;
-
-        async function startChecking() {
-            const urlsText = document.getElementById('urls-textarea').value.trim();
-            if (!urlsText) {
-                alert('Please enter URLs to analyze');
-                return;
-            }
-            
-            const urls = urlsText.split('\\n').map(url => url.trim()).filter(url => url && url.startsWith('http'));
-            if (urls.length === 0) {
-                alert('Please enter valid URLs starting with http:// or https://');
-                return;
-            }
-
-            const batchSize = parseInt(document.getElementById('batch-size').value) || 100;
-            
-            try {
-                const submitBtn = document.getElementById('submit-btn');
-                const submitIcon = submitBtn.querySelector('i');
-                const submitText = submitBtn.querySelector('span');
-                
-                submitBtn.disabled = true;
-                submitIcon.className = 'fas fa-spinner fa-spin';
-                submitText.textContent = 'Initializing...';
-                
-                document.getElementById('status-section').classList.add('show');
-                document.getElementById('stats-grid').style.display = 'grid';
-                document.getElementById('total-urls').textContent = urls.length;
-                
-                const response = await fetch('/check-urls', {
-                    method: 'POST',
-                    headers: { 'Content-Type': 'application/json' },
-                    body: JSON.stringify({ urls: urls, batch_size: batchSize })
-                });
-                
-                if (!response.ok) throw new Error(`HTTP error! status: ${response.status}`);
-                
-                const result = await response.json();
-                currentJobId = result.job_id;
-                startStatusPolling();
-                
-            } catch (error) {
-                console.error('Error starting analysis:', error);
-                showStatus('error', `<i class="fas fa-exclamation-triangle"></i> Error: ${error.message}`);
-                resetSubmitButton();
-            }
-        }
-
-        function startStatusPolling() {
-            if (statusInterval) clearInterval(statusInterval);
-            
-            statusInterval = setInterval(async () => {
-                if (!currentJobId) return;
-                
-                try {
-                    const response = await fetch(`/job-status/${currentJobId}`);
-                    if (!response.ok) throw new Error(`HTTP error! status: ${response.status}`);
-                    
-                    const status = await response.json();
-                    updateStatus(status);
-                    
-                    if (status.status === 'completed' || status.status === 'failed') {
-                        clearInterval(statusInterval);
-                        statusInterval = null;
-                        resetSubmitButton();
-                    }
-                } catch (error) {
-                    console.error('Error fetching status:', error);
-                    clearInterval(statusInterval);
-                    statusInterval = null;
-                    resetSubmitButton();
-                }
-            }, 2000);
-        }
-
-        function updateStatus(status) {
-            const progress = Math.round((status.progress / status.total) * 100);
-            
-            document.getElementById('progress-fill').style.width = `${progress}%`;
-            document.getElementById('progress-text').textContent = 
-                `${status.progress} / ${status.total} URLs processed`;
-            
-            document.getElementById('processed-urls').textContent = status.progress;
-            document.getElementById('completion-rate').textContent = `${progress}%`;
-            
-            let statusText = '';
-            let statusIcon = '';
-            
-            switch (status.status) {
-                case 'pending':
-                    statusText = 'Analysis queued and waiting to start';
-                    statusIcon = '<i class="fas fa-clock"></i>';
-                    break;
-                case 'running':
-                    statusText = 'Processing URLs and checking index status';
-                    statusIcon = '<i class="fas fa-cog fa-spin"></i>';
-                    break;
-                case 'completed':
-                    statusText = 'Analysis completed successfully! Download your report below.';
-                    statusIcon = '<i class="fas fa-check-circle"></i>';
-                    document.getElementById('download-btn').style.display = 'inline-flex';
-                    document.getElementById('download-btn').href = `/download-results/${currentJobId}`;
-                    break;
-                case 'failed':
-                    statusText = `Analysis failed: ${status.error || 'Unknown error occurred'}`;
-                    statusIcon = '<i class="fas fa-times-circle"></i>';
-                    break;
-            }
-            
-            showStatus(status.status, `${statusIcon} ${statusText}`);
-        }
-
-        function showStatus(type, message) {
-            const statusMessage = document.getElementById('status-message');
-            statusMessage.className = `status-message status-${type}`;
-            statusMessage.innerHTML = message;
-        }
-
-        function resetSubmitButton() {
-            const submitBtn = document.getElementById('submit-btn');
-            const submitIcon = submitBtn.querySelector('i');
-            const submitText = submitBtn.querySelector('span');
-            
-            submitBtn.disabled = false;
-            submitIcon.className = 'fas fa-rocket';
-            submitText.textContent = 'Start Analysis';
-        }
-    </script>
-</body>
-</html>
-    """
-    return HTMLResponse(content=html_content)
-
-@app.get("/api")
-async def api_info():
-    return {"message": "Google Index Checker API", "status": "running"}
-
-@app.post("/check-urls")
-async def check_urls(url_batch: URLBatch, background_tasks: BackgroundTasks):
-    job_id = str(uuid.uuid4())
-    
-    job_status[job_id] = {
-        "status": "pending",
-        "progress": 0,
-        "total": len(url_batch.urls),
-        "results_file": None,
-        "error": None,
-        "created_at": datetime.now()
-    }
-    
-    background_tasks.add_task(process_urls_batch, job_id, url_batch.urls, url_batch.batch_size)
-    
-    return {"job_id": job_id, "message": "URL checking started"}
-
-@app.get("/job-status/{job_id}")
-async def get_job_status(job_id: str):
-    if job_id not in job_status:
-        raise HTTPException(status_code=404, detail="Job not found")
-    
-    return job_status[job_id]
-
-@app.get("/download-results/{job_id}")
-async def download_results(job_id: str):
-    if job_id not in job_status:
-        raise HTTPException(status_code=404, detail="Job not found")
-    
-    job = job_status[job_id]
-    if job["status"] != "completed" or not job["results_file"]:
-        raise HTTPException(status_code=400, detail="Results not ready")
-    
-    if not os.path.exists(job["results_file"]):
-        raise HTTPException(status_code=404, detail="Results file not found")
-    
-    return FileResponse(
-        job["results_file"],
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        filename=f"google_index_results_{job_id}.xlsx"
-    )
-
-async def run_scrapy_spider(urls: List[str]) -> List[dict]:
-    try:
-        with tempfile.NamedTemporaryFile(mode='w+', suffix='.json', delete=False) as temp_file:
-            temp_output = temp_file.name
-        
-        urls_string = ','.join(urls)
-        
-        current_dir = os.getcwd()
-        possible_paths = [
-            os.path.join(current_dir, 'GoogleIndexSpider'),
-            os.path.join(current_dir, 'google-index-checker', 'GoogleIndexSpider'),
-            os.path.join(os.path.dirname(current_dir), 'GoogleIndexSpider'),
-            '/app/GoogleIndexSpider',
-            './GoogleIndexSpider',
-            'GoogleIndexSpider',
-            os.path.join(os.path.dirname(__file__), 'GoogleIndexSpider'),
-        ]
-        
-        spider_path = None
-        for path in possible_paths:
-            logger.info(f"Checking path: {path}")
-            if os.path.exists(path):
-                scrapy_cfg = os.path.join(path, 'scrapy.cfg')
-                logger.info(f"Path exists, checking for scrapy.cfg: {scrapy_cfg}")
-                if os.path.exists(scrapy_cfg):
-                    spider_path = path
-                    logger.info(f"Found valid spider path: {spider_path}")
-                    break
-                else:
-                    logger.info(f"scrapy.cfg not found in {path}")
-            else:
-                logger.info(f"Path does not exist: {path}")
-        
-        if not spider_path:
-            logger.error(f"Could not find GoogleIndexSpider directory.")
-            logger.error(f"Current directory: {current_dir}")
-            logger.error(f"__file__ location: {os.path.dirname(__file__) if '__file__' in globals() else 'Not available'}")
-            logger.error(f"Checked paths: {possible_paths}")
-            
-            try:
-                contents = os.listdir(current_dir)
-                logger.error(f"Current directory contents: {contents}")
-            except Exception as e:
-                logger.error(f"Could not list directory contents: {e}")
-            
-            if 'google-index-checker' in current_dir:
-                project_spider_path = os.path.join(current_dir, 'GoogleIndexSpider')
-            else:
-                project_spider_path = os.path.join(current_dir, 'google-index-checker', 'GoogleIndexSpider')
-            
-            logger.error(f"Expected spider path: {project_spider_path}")
-            return []
-        
-        cmd = [
-            sys.executable, '-m', 'scrapy', 'crawl', 'gr',
-            '-a', f'urls={urls_string}',
-            '-o', temp_output,
-            '-s', 'LOG_LEVEL=ERROR'
-        ]
-        
-        logger.info(f"Running Scrapy for {len(urls)} URLs...")
-        logger.info(f"Using spider path: {spider_path}")
-        logger.info(f"Command: {' '.join(cmd)}")
-        logger.info(f"Output file: {temp_output}")
-        
-        process = await asyncio.create_subprocess_exec(
-            *cmd,
-            cwd=spider_path,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
-        )
-        
-        stdout, stderr = await process.communicate()
-        
-        logger.info(f"Scrapy return code: {process.returncode}")
-        if stdout:
-            logger.info(f"Scrapy stdout: {stdout.decode()[:500]}...")
-        if stderr:
-            logger.info(f"Scrapy stderr: {stderr.decode()[:500]}...")
-        
-        if process.returncode != 0:
-            logger.error(f"Scrapy process failed with return code {process.returncode}")
-            logger.error(f"Full stderr: {stderr.decode()}")
-            return []
-        
-        results = []
-        if os.path.exists(temp_output):
-            try:
-                with open(temp_output, 'r', encoding='utf-8') as f:
-                    content = f.read().strip()
-                    logger.info(f"Raw file content length: {len(content)}")
-                    if content:
-                        logger.info(f"Content preview: {content[:200]}...")
-                    
-                    if content:
-                        if content.startswith('['):
-                            results = json.loads(content)
-                            logger.info(f"Parsed as JSON array: {len(results)} items")
-                        else:
-                            lines = [line.strip() for line in content.split('\n') if line.strip()]
-                            logger.info(f"Processing {len(lines)} JSON lines")
-                            
-                            for line_num, line in enumerate(lines):
-                                try:
-                                    item = json.loads(line)
-                                    results.append(item)
-                                except json.JSONDecodeError as e:
-                                    logger.error(f"Error parsing line {line_num}: {e}")
-                    else:
-                        logger.warning("Output file is empty")
-                        
-            except json.JSONDecodeError as e:
-                logger.error(f"Error parsing JSON results: {e}")
-                results = []
-            except Exception as e:
-                logger.error(f"Unexpected error reading results file: {e}")
-                results = []
-            finally:
-                try:
-                    if os.path.exists(temp_output):
-                        os.unlink(temp_output)
-                except Exception as e:
-                    logger.warning(f"Could not clean up temp file: {e}")
-        else:
-            logger.error(f"Output file does not exist: {temp_output}")
-        
-        logger.info(f"Scrapy completed with {len(results)} results")
-        if results:
-            logger.info(f"Sample result: {results[0]}")
-        
-        return results
-        
-    except Exception as e:
-        logger.error(f"Error running Scrapy spider: {str(e)}")
-        import traceback
-        logger.error(f"Full traceback: {traceback.format_exc()}")
-        return []
-
-async def process_urls_batch(job_id: str, urls: List[str], batch_size: int):
-    try:
-        job_status[job_id]["status"] = "running"
-        logger.info(f"Starting job {job_id} with {len(urls)} URLs")
-        
-        all_results = []
-        total_urls = len(urls)
-        
-        for i in range(0, total_urls, batch_size):
-            batch_urls = urls[i:i + batch_size]
-            batch_num = i // batch_size + 1
-            total_batches = (total_urls + batch_size - 1) // batch_size
-            
-            logger.info(f"Processing batch {batch_num}/{total_batches}")
-            
-            try:
-                batch_results = await run_scrapy_spider(batch_urls)
-                all_results.extend(batch_results)
-                job_status[job_id]["progress"] = min(i + batch_size, total_urls)
-                
-            except Exception as e:
-                logger.error(f"Error processing batch {batch_num}: {str(e)}")
-                continue
-        
-        excel_file = await create_excel_report(job_id, all_results)
-        
-        job_status[job_id].update({
-            "status": "completed",
-            "progress": total_urls,
-            "results_file": excel_file
-        })
-        
-        logger.info(f"Job {job_id} completed with {len(all_results)} results")
-        
-    except Exception as e:
-        logger.error(f"Job {job_id} failed: {str(e)}")
-        job_status[job_id].update({
-            "status": "failed",
-            "error": str(e)
-        })
-
-async def create_excel_report(job_id: str, results: List[dict]) -> str:
-    try:
-        logger.info(f"Creating Excel report with {len(results)} results")
-        logger.info(f"Sample result: {results[0] if results else 'No results'}")
-        
-        if not results:
-            df = pd.DataFrame(columns=['index', 'url', 'indexed', 'status', 'search_link', 'checked_at'])
-        else:
-            df = pd.DataFrame(results)
-            logger.info(f"DataFrame columns: {df.columns.tolist()}")
-            logger.info(f"DataFrame shape: {df.shape}")
-        
-        if len(df) > 0 and 'indexed' in df.columns:
-            df['status'] = df['indexed'].apply(lambda x: 'Indexed' if x else 'Not Indexed')
-        else:
-            df['status'] = 'Unknown'
-        
-        if 'checked_at' not in df.columns or df['checked_at'].isna().all():
-            df['checked_at'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        
-        desired_columns = ['index', 'url', 'indexed', 'status', 'search_link', 'result_url', 'total_results', 'checked_at', 'error']
-        available_columns = [col for col in desired_columns if col in df.columns]
-        df = df[available_columns]
-        
-        os.makedirs('results', exist_ok=True)
-        excel_file = f'results/google_index_results_{job_id}.xlsx'
-        
-        with pd.ExcelWriter(excel_file, engine='xlsxwriter') as writer:
-            df.to_excel(writer, sheet_name='Index Results', index=False)
-            
-            workbook = writer.book
-            worksheet = writer.sheets['Index Results']
-            
-            header_format = workbook.add_format({
-                'bold': True,
-                'text_wrap': True,
-                'valign': 'top',
-                'fg_color': '#D7E4BC',
-                'border': 1
-            })
-            
-            indexed_format = workbook.add_format({
-                'bg_color': '#C6EFCE',
-                'font_color': '#006100'
-            })
-            
-            not_indexed_format = workbook.add_format({
-                'bg_color': '#FFC7CE',
-                'font_color': '#9C0006'
-            })
-            
-            for col_num, value in enumerate(df.columns.values):
-                worksheet.write(0, col_num, value, header_format)
-            
-            if 'status' in df.columns and len(df) > 0:
-                status_col = df.columns.get_loc('status')
-                
-                worksheet.conditional_format(1, status_col, len(df), status_col, {
-                    'type': 'text',
-                    'criteria': 'containing',
-                    'value': 'Indexed',
-                    'format': indexed_format
-                })
-                
-                worksheet.conditional_format(1, status_col, len(df), status_col, {
-                    'type': 'text',
-                    'criteria': 'containing',
-                    'value': 'Not Indexed',
-                    'format': not_indexed_format
-                })
-            
-            for i, col in enumerate(df.columns):
-                if len(df) > 0:
-                    max_length = max(
-                        df[col].astype(str).str.len().max() if not df[col].isna().all() else 0,
-                        len(col)
-                    ) + 2
-                else:
-                    max_length = len(col) + 2
-                
-                worksheet.set_column(i, i, min(max_length, 50))
-        
-        logger.info(f"Excel report created successfully: {excel_file}")
-        logger.info(f"Final DataFrame info - Rows: {len(df)}, Columns: {len(df.columns)}")
-        
-        return excel_file
-        
-    except Exception as e:
-        logger.error(f"Error creating Excel report: {str(e)}")
-        raise Exception(f"Failed to create Excel report: {str(e)}")
-
-if __name__ == "__main__":
-    import uvicorn
-    print(" Starting Google Index Checker API...")
-    print(" API will be available on port 8877")
-    print(" Frontend will be available at the root URL")
-    print("-" * 60)
-    
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, BackgroundTasks, Request
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import FileResponse, HTMLResponse, Response, StreamingResponse
+from starlette.concurrency import iterate_in_threadpool
+from pydantic import BaseModel
+from typing import Callable, Dict, List, Optional
+import asyncio
+import collections
+import random
+import uuid
+import os
+import json
+import subprocess
+import sys
+from datetime import datetime
+import glob
+import logging
+import io
+import socket
+import time
+
+from concurrency import AdaptiveConcurrency
+from crawler_engine import InProcessCrawlEngine, start_engine
+from direct_engine import DirectZyteEngine, start_direct_engine
+from reports import ResultSpool, SpoolTail, result_status, stream_csv, stream_jsonl, write_parquet, write_xlsx
+from ingest import InputSpool, fill_spool, iter_upload_urls
+from job_queue import ClaimedJob, JobQueue, create_job_queue
+from job_store import FINISHED_STATUSES, JobCheckpoint, JobStore, ResultIndex, create_job_store
+import metrics
+from profiling import JobProfiler, StageTimings
+from result_cache import ResultCache
+from scheduler import CrawlBudget
+from urlnorm import normalize_url
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+app = FastAPI(title="Google Index Checker", version="1.0.0")
+
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+RESULTS_DIR = os.getenv("RESULTS_DIR", "results")
+
+# Job records live in a JobStore shared by every process; jobs running in
+# this process keep their live state in active_jobs and flush it to the
+# store at most every JOB_FLUSH_INTERVAL seconds
+JOB_STORE_URL = os.getenv("JOB_STORE_URL", f"sqlite:///{RESULTS_DIR}/jobs.sqlite3")
+JOB_FLUSH_INTERVAL = float(os.getenv("JOB_FLUSH_INTERVAL", "1"))
+# Finished jobs and their result files are removed after JOB_TTL seconds
+JOB_TTL = int(os.getenv("JOB_TTL", str(7 * 86400)))
+JOB_EVICT_INTERVAL = int(os.getenv("JOB_EVICT_INTERVAL", "3600"))
+# A running job keeps this many of its results in memory; the rest are on
+# disk in its checkpoint, so memory doesn't grow with the job's URL count
+JOB_RESULTS_IN_MEMORY = int(os.getenv("JOB_RESULTS_IN_MEMORY", "10000"))
+# Input rows read but not yet written out, because a row before them is
+# still waiting for its result, are held in memory up to this many; past
+# it the job stops reading input until rows are written
+JOB_PENDING_ROWS = int(os.getenv("JOB_PENDING_ROWS", "50000"))
+# Workers renew a lease on the jobs they run; a job whose lease is older
+# than this goes back to the queue and is resumed from its checkpoint
+JOB_LEASE_TIMEOUT = int(os.getenv("JOB_LEASE_TIMEOUT", "30"))
+
+# Submitted jobs go on a durable queue that worker processes (worker.py)
+# pull from; by default it is a table next to the job records. The API
+# runs an embedded worker as well unless EMBEDDED_WORKER=0, which leaves it
+# stateless: it takes submissions and answers from the job store and the
+# results directory, which every worker has to share
+JOB_QUEUE_URL = os.getenv("JOB_QUEUE_URL", JOB_STORE_URL)
+EMBEDDED_WORKER = os.getenv("EMBEDDED_WORKER", "1") not in ("0", "false", "no")
+WORKER_MAX_JOBS = int(os.getenv("WORKER_MAX_JOBS", "4"))
+# Jobs with a positive priority may run on a worker that already has
+# WORKER_MAX_JOBS jobs, up to this many more
+WORKER_PRIORITY_JOBS = int(os.getenv("WORKER_PRIORITY_JOBS", "4"))
+WORKER_POLL_INTERVAL = float(os.getenv("WORKER_POLL_INTERVAL", "1"))
+# How often a worker looks for cancel and profiling requests made through
+# another process
+JOB_CANCEL_POLL_INTERVAL = float(os.getenv("JOB_CANCEL_POLL_INTERVAL", "1"))
+# A job handed out this many times without finishing is failed instead of
+# being allowed to take down another worker
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+WORKER_ID = f"{socket.gethostname()}-{os.getpid()}"
+
+job_store: Optional[JobStore] = None
+job_queue: Optional[JobQueue] = None
+active_jobs = {}
+_job_flushed = {}
+
+# Whether this process runs jobs; worker.py turns it on for itself
+worker_enabled = EMBEDDED_WORKER
+_worker_loop: Optional[asyncio.Task] = None
+_worker_tasks: Dict[str, asyncio.Task] = {}
+# Running jobs whose lease another worker took over; they are stopped
+# without touching the job's record or queue entry
+_lost_jobs: set = set()
+# The crawl of each running job, cancelled to stop the job early
+_job_crawls: Dict[str, asyncio.Future] = {}
+_queue_wakeup: Optional[asyncio.Event] = None
+
+# Per-job subscriber queues of the /job-events streams
+job_subscribers = {}
+_progress_published = {}
+JOB_EVENT_QUEUE_SIZE = 1000
+PROGRESS_EVENT_INTERVAL = 0.25
+TERMINAL_EVENTS = ("completed", "failed", "cancelled")
+
+# "inprocess" runs the spider inside this process's event loop and reuses
+# one crawler across batches; "subprocess" spawns `scrapy crawl` per batch;
+# "direct" sends each check to the Zyte API itself, without Scrapy. A job
+# can ask for another engine than the worker's default; "inprocess" then
+# falls back to subprocesses if the worker didn't start the crawler
+CRAWL_ENGINES = ("inprocess", "subprocess", "direct")
+CRAWL_ENGINE = os.getenv("CRAWL_ENGINE", "inprocess").lower()
+SCRAPY_LOG_LEVEL = os.getenv("SCRAPY_LOG_LEVEL", "ERROR")
+# An in-process batch that gets no item for this many seconds is given up
+# on; the URLs it is missing are retried as if they had failed
+CRAWL_IDLE_TIMEOUT = float(os.getenv("CRAWL_IDLE_TIMEOUT", "300"))
+
+crawl_engine: Optional[InProcessCrawlEngine] = None
+direct_engine: Optional[DirectZyteEngine] = None
+_direct_engine_lock = asyncio.Lock()
+_direct_engine_tried = False
+
+# The Scrapy project (scrapy.cfg and the GoogleIndexSpider package), found
+# once when a worker starts; a worker without it refuses to start. Looked up
+# next to this file, then in the working directory, unless SPIDER_PATH is set
+SPIDER_PATH = os.getenv("SPIDER_PATH")
+spider_path: Optional[str] = None
+
+# Batches of a single job run side by side up to MAX_PARALLEL_BATCHES_PER_JOB,
+# while CRAWL_BATCH_BUDGET caps the batches crawling at once across all jobs
+# of a worker process
+MAX_PARALLEL_BATCHES_PER_JOB = int(os.getenv("MAX_PARALLEL_BATCHES_PER_JOB", "4"))
+CRAWL_BATCH_BUDGET = int(os.getenv("CRAWL_BATCH_BUDGET", "8"))
+SCRAPY_CONCURRENT_REQUESTS = int(os.getenv("CONCURRENT_REQUESTS", "16"))
+SCRAPY_CONCURRENT_REQUESTS_PER_DOMAIN = int(os.getenv("CONCURRENT_REQUESTS_PER_DOMAIN", "8"))
+
+# Every check goes to the same Google download slot, so this is what one
+# batch can really have in flight
+REQUESTS_PER_BATCH = max(1, min(SCRAPY_CONCURRENT_REQUESTS, SCRAPY_CONCURRENT_REQUESTS_PER_DOMAIN))
+
+# Jobs run highest priority first. A job without an explicit priority gets
+# INTERACTIVE_PRIORITY if it has fewer than INTERACTIVE_MAX_URLS URLs, 0
+# otherwise. Jobs with a positive priority jump the job queue, may use
+# PRIORITY_HEADROOM batches beyond the budget and have their requests sent
+# ahead of queued ones. Between jobs of equal priority the budget is shared
+# fairly per API client (FAIR_SHARE_BY=client: the X-Client-Id header,
+# else the caller's address) or per job (FAIR_SHARE_BY=job)
+INTERACTIVE_MAX_URLS = int(os.getenv("INTERACTIVE_MAX_URLS", "100"))
+INTERACTIVE_PRIORITY = int(os.getenv("INTERACTIVE_PRIORITY", "10"))
+PRIORITY_HEADROOM = int(os.getenv("PRIORITY_HEADROOM", "2"))
+FAIR_SHARE_BY = os.getenv("FAIR_SHARE_BY", "client").lower()
+
+crawl_budget = CrawlBudget(CRAWL_BATCH_BUDGET, headroom=PRIORITY_HEADROOM)
+
+# AIMD control of the Zyte API requests in flight across a worker's jobs. The limit
+# grows while responses stay fast and clean and is cut on throttling, errors
+# or slow responses; the crawl budget and downloader are resized to follow it
+ADAPTIVE_CONCURRENCY = os.getenv("ADAPTIVE_CONCURRENCY", "1") not in ("0", "false", "no")
+ADAPTIVE_MIN_CONCURRENCY = int(os.getenv("ADAPTIVE_MIN_CONCURRENCY", "2"))
+ADAPTIVE_MAX_CONCURRENCY = int(os.getenv("ADAPTIVE_MAX_CONCURRENCY", str(REQUESTS_PER_BATCH * CRAWL_BATCH_BUDGET)))
+ADAPTIVE_LATENCY_TARGET = float(os.getenv("ADAPTIVE_LATENCY_TARGET", "15"))
+ADAPTIVE_ERROR_THRESHOLD = float(os.getenv("ADAPTIVE_ERROR_THRESHOLD", "0.05"))
+ADAPTIVE_INTERVAL = float(os.getenv("ADAPTIVE_INTERVAL", "5"))
+
+concurrency_controller: Optional[AdaptiveConcurrency] = None
+
+# URLs whose check fails are retried up to RETRY_MAX_ATTEMPTS times with
+# exponential backoff. A job may spend RETRY_JOB_BUDGET_RATIO of its distinct
+# URLs (at least RETRY_JOB_BUDGET_MIN) on retries, so an outage can't make a
+# job resend everything; URLs still failing are reported as Unknown
+RETRY_MAX_ATTEMPTS = int(os.getenv("RETRY_MAX_ATTEMPTS", "3"))
+RETRY_BACKOFF = float(os.getenv("RETRY_BACKOFF", "2"))
+RETRY_BACKOFF_MAX = float(os.getenv("RETRY_BACKOFF_MAX", "60"))
+RETRY_JOB_BUDGET_RATIO = float(os.getenv("RETRY_JOB_BUDGET_RATIO", "0.25"))
+RETRY_JOB_BUDGET_MIN = int(os.getenv("RETRY_JOB_BUDGET_MIN", "50"))
+_zyte_throttled_seen = 0
+# Scrapy stats of finished subprocess crawls, summed for /metrics
+_subprocess_scrapy_stats: Dict[str, float] = {}
+
+# Results younger than RESULT_CACHE_TTL seconds are served from disk instead
+# of being sent to the Zyte API again
+RESULT_CACHE_ENABLED = os.getenv("RESULT_CACHE_ENABLED", "1") not in ("0", "false", "no")
+RESULT_CACHE_PATH = os.getenv("RESULT_CACHE_PATH", f"{RESULTS_DIR}/index_cache.sqlite3")
+RESULT_CACHE_TTL = int(os.getenv("RESULT_CACHE_TTL", "86400"))
+RESULT_CACHE_MAX_ENTRIES = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "1000000"))
+
+result_cache: Optional[ResultCache] = None
+
+# Jobs submitted with "profile": true, or started from POST /job-profile,
+# run under cProfile and tracemalloc; the output is kept with the results
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "1") not in ("0", "false", "no")
+PROFILE_TOP_ENTRIES = int(os.getenv("PROFILE_TOP_ENTRIES", "40"))
+_job_profilers = {}
+
+
+class URLBatch(BaseModel):
+    urls: List[str]
+    batch_size: Optional[int] = 100
+    parallel_batches: Optional[int] = None
+    max_age: Optional[int] = None
+    force_refresh: Optional[bool] = False
+    profile: Optional[bool] = False
+    priority: Optional[int] = None
+    engine: Optional[str] = None
+
+@app.on_event("startup")
+async def startup_spider_project():
+    global spider_path
+    if not worker_enabled:
+        return
+    spider_path = resolve_spider_path()
+    logger.info(f"Spider project: {spider_path}")
+
+@app.on_event("startup")
+async def startup_crawl_engine():
+    global crawl_engine
+    if not worker_enabled:
+        return
+    if CRAWL_ENGINE == "inprocess":
+        # The shared crawler serves every batch of the budget at once, so
+        # give it the concurrency the same number of subprocesses would have.
+        # With adaptive concurrency this is only the ceiling of the Zyte
+        # client's connection pool; the controller sets the working limit
+        max_requests = SCRAPY_CONCURRENT_REQUESTS * CRAWL_BATCH_BUDGET
+        if ADAPTIVE_CONCURRENCY:
+            max_requests = max(max_requests, ADAPTIVE_MAX_CONCURRENCY)
+        with metrics.CRAWLER_STARTUP_SECONDS.labels("inprocess").time():
+            crawl_engine = await start_engine(spider_path, log_level=SCRAPY_LOG_LEVEL, settings={
+                "CONCURRENT_REQUESTS": max_requests,
+                "CONCURRENT_REQUESTS_PER_DOMAIN": SCRAPY_CONCURRENT_REQUESTS_PER_DOMAIN * CRAWL_BATCH_BUDGET,
+            }, idle_timeout=CRAWL_IDLE_TIMEOUT)
+    elif CRAWL_ENGINE == "direct":
+        await get_direct_engine()
+    if CRAWL_ENGINE == "direct" and direct_engine is not None:
+        logger.info("Crawl engine: direct")
+    else:
+        logger.info(f"Crawl engine: {'inprocess' if crawl_engine else 'subprocess'}")
+
+async def get_direct_engine() -> Optional[DirectZyteEngine]:
+    """The direct engine, started when the worker starts under
+    CRAWL_ENGINE=direct and otherwise the first time a job asks for it"""
+    global direct_engine, _direct_engine_tried
+    if _direct_engine_tried:
+        return direct_engine
+    async with _direct_engine_lock:
+        if not _direct_engine_tried:
+            _direct_engine_tried = True
+            max_connections = SCRAPY_CONCURRENT_REQUESTS * CRAWL_BATCH_BUDGET
+            if ADAPTIVE_CONCURRENCY:
+                max_connections = max(max_connections, ADAPTIVE_MAX_CONCURRENCY)
+            direct_engine = await start_direct_engine(spider_path, REQUESTS_PER_BATCH * CRAWL_BATCH_BUDGET, max_connections)
+            if direct_engine is not None and concurrency_controller is not None:
+                direct_engine.set_concurrency(concurrency_controller.limit)
+    return direct_engine
+
+@app.on_event("startup")
+async def startup_concurrency_controller():
+    global concurrency_controller
+    if not ADAPTIVE_CONCURRENCY or not worker_enabled:
+        return
+    concurrency_controller = AdaptiveConcurrency(
+        initial=ADAPTIVE_MAX_CONCURRENCY // 2,
+        minimum=ADAPTIVE_MIN_CONCURRENCY,
+        maximum=ADAPTIVE_MAX_CONCURRENCY,
+        latency_target=ADAPTIVE_LATENCY_TARGET,
+        error_threshold=ADAPTIVE_ERROR_THRESHOLD,
+        interval=ADAPTIVE_INTERVAL
+    )
+    concurrency_controller.set_saturation_probe(crawl_saturated)
+    concurrency_controller.add_listener(apply_concurrency_limit)
+    asyncio.create_task(concurrency_controller.run(sample_zyte_throttling))
+
+@app.on_event("startup")
+async def startup_job_store():
+    global job_store, job_queue
+    job_store = create_job_store(JOB_STORE_URL)
+    job_queue = create_job_queue(JOB_QUEUE_URL)
+    asyncio.create_task(evict_finished_jobs())
+
+@app.on_event("startup")
+async def startup_result_cache():
+    global result_cache
+    if RESULT_CACHE_ENABLED and worker_enabled:
+        result_cache = ResultCache(RESULT_CACHE_PATH, ttl=RESULT_CACHE_TTL, max_entries=RESULT_CACHE_MAX_ENTRIES)
+
+@app.on_event("startup")
+async def startup_metrics():
+    metrics.RUNNING_JOBS.set_function(lambda: len(active_jobs))
+    metrics.QUEUED_URLS.set_function(queued_urls)
+    metrics.QUEUED_JOBS.set_function(lambda: job_queue.stats()["queued"])
+    metrics.CONCURRENCY_LIMIT.set_function(current_concurrency_limit)
+    metrics.register_scrapy_stats(scrapy_stats_totals)
+
+@app.on_event("startup")
+async def startup_job_worker():
+    global _worker_loop
+    if not worker_enabled:
+        logger.info("No embedded worker: jobs are left to worker processes")
+        return
+    asyncio.create_task(renew_job_leases())
+    asyncio.create_task(watch_job_requests())
+    _worker_loop = asyncio.create_task(run_job_worker())
+
+@app.on_event("shutdown")
+async def shutdown_crawl_engine():
+    await stop_job_worker()
+    if crawl_engine is not None:
+        await crawl_engine.stop()
+    if direct_engine is not None:
+        await direct_engine.stop()
+    if result_cache is not None:
+        result_cache.close()
+    if job_queue is not None:
+        job_queue.close()
+    if job_store is not None:
+        job_store.close()
+
+@app.get("/", response_class=HTMLResponse)
+async def serve_frontend():
+    html_content = """
+<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>Google Index Checker Pro</title>
+    <link href="https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700&display=swap" rel="stylesheet">
+    <link href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/css/all.min.css" rel="stylesheet">
+    <style>
+        :root {
+            --primary-color: #2563eb;
+            --primary-dark: #1d4ed8;
+            --secondary-color: #64748b;
+            --success-color: #059669;
+            --warning-color: #d97706;
+            --error-color: #dc2626;
+            --background: #f8fafc;
+            --card-background: #ffffff;
+            --border-color: #e2e8f0;
+            --text-primary: #1e293b;
+            --text-secondary: #64748b;
+            --shadow: 0 10px 25px -3px rgba(0, 0, 0, 0.1), 0 4px 6px -2px rgba(0, 0, 0, 0.05);
+            --shadow-lg: 0 20px 25px -5px rgba(0, 0, 0, 0.1), 0 10px 10px -5px rgba(0, 0, 0, 0.04);
+        }
+
+        * {
+            margin: 0;
+            padding: 0;
+            box-sizing: border-box;
+        }
+
+        body {
+            font-family: 'Inter', -apple-system, BlinkMacSystemFont, sans-serif;
+            background: var(--background);
+            color: var(--text-primary);
+            line-height: 1.6;
+            min-height: 100vh;
+        }
+
+        .container {
+            max-width: 1200px;
+            margin: 0 auto;
+            padding: 2rem;
+        }
+
+        .header {
+            text-align: center;
+            margin-bottom: 3rem;
+        }
+
+        .header h1 {
+            font-size: 3rem;
+            font-weight: 700;
+            color: var(--primary-color);
+            margin-bottom: 0.5rem;
+            letter-spacing: -0.025em;
+        }
+
+        .header p {
+            font-size: 1.25rem;
+            color: var(--text-secondary);
+            font-weight: 400;
+        }
+
+        .main-card {
+            background: var(--card-background);
+            border-radius: 16px;
+            box-shadow: var(--shadow-lg);
+            overflow: hidden;
+            border: 1px solid var(--border-color);
+        }
+
+        .card-header {
+            background: linear-gradient(135deg, var(--primary-color) 0%, var(--primary-dark) 100%);
+            padding: 2rem;
+            color: white;
+        }
+
+        .card-header h2 {
+            font-size: 1.5rem;
+            font-weight: 600;
+            margin-bottom: 0.5rem;
+            display: flex;
+            align-items: center;
+            gap: 0.75rem;
+        }
+
+        .card-header p {
+            opacity: 0.9;
+            font-weight: 400;
+        }
+
+        .card-body {
+            padding: 2rem;
+        }
+
+        .form-group {
+            margin-bottom: 2rem;
+        }
+
+        .form-label {
+            display: block;
+            font-weight: 600;
+            color: var(--text-primary);
+            margin-bottom: 0.75rem;
+            font-size: 0.95rem;
+        }
+
+        .form-textarea {
+            width: 100%;
+            min-height: 200px;
+            padding: 1rem;
+            border: 2px solid var(--border-color);
+            border-radius: 12px;
+            font-size: 0.95rem;
+            font-family: 'SF Mono', Monaco, 'Cascadia Code', monospace;
+            resize: vertical;
+            transition: all 0.2s ease;
+            background: #fafbfc;
+        }
+
+        .form-textarea:focus {
+            outline: none;
+            border-color: var(--primary-color);
+            box-shadow: 0 0 0 3px rgba(37, 99, 235, 0.1);
+            background: white;
+        }
+
+        .form-textarea::placeholder {
+            color: var(--text-secondary);
+            font-family: 'Inter', sans-serif;
+        }
+
+        .settings-grid {
+            display: grid;
+            grid-template-columns: 1fr 200px;
+            gap: 1.5rem;
+            align-items: end;
+            margin-top: 1.5rem;
+        }
+
+        .batch-input {
+            padding: 0.75rem 1rem;
+            border: 2px solid var(--border-color);
+            border-radius: 8px;
+            font-size: 0.95rem;
+            text-align: center;
+            transition: all 0.2s ease;
+            background: white;
+        }
+
+        .batch-input:focus {
+            outline: none;
+            border-color: var(--primary-color);
+            box-shadow: 0 0 0 3px rgba(37, 99, 235, 0.1);
+        }
+
+        .submit-btn {
+            background: linear-gradient(135deg, var(--primary-color) 0%, var(--primary-dark) 100%);
+            color: white;
+            border: none;
+            padding: 1rem 2rem;
+            font-size: 1rem;
+            font-weight: 600;
+            border-radius: 12px;
+            cursor: pointer;
+            transition: all 0.2s ease;
+            width: 100%;
+            display: flex;
+            align-items: center;
+            justify-content: center;
+            gap: 0.75rem;
+            box-shadow: var(--shadow);
+        }
+
+        .submit-btn:hover:not(:disabled) {
+            transform: translateY(-1px);
+            box-shadow: 0 15px 30px -5px rgba(37, 99, 235, 0.3);
+        }
+
+        .submit-btn:active {
+            transform: translateY(0);
+        }
+
+        .submit-btn:disabled {
+            background: var(--text-secondary);
+            cursor: not-allowed;
+            transform: none;
+            box-shadow: none;
+        }
+
+        .info-card {
+            background: #f1f5f9;
+            border: 1px solid #cbd5e1;
+            border-radius: 12px;
+            padding: 1.5rem;
+            margin-top: 1.5rem;
+        }
+
+        .info-card h4 {
+            color: var(--primary-color);
+            font-weight: 600;
+            margin-bottom: 1rem;
+            display: flex;
+            align-items: center;
+            gap: 0.5rem;
+        }
+
+        .info-list {
+            list-style: none;
+            space-y: 0.5rem;
+        }
+
+        .info-list li {
+            display: flex;
+            align-items: center;
+            gap: 0.75rem;
+            color: var(--text-secondary);
+            margin-bottom: 0.5rem;
+        }
+
+        .info-list li i {
+            color: var(--success-color);
+            width: 16px;
+        }
+
+        .status-section {
+            margin-top: 2rem;
+            background: var(--card-background);
+            border-radius: 16px;
+            box-shadow: var(--shadow);
+            border: 1px solid var(--border-color);
+            overflow: hidden;
+            display: none;
+        }
+
+        .status-section.show {
+            display: block;
+        }
+
+        .status-header {
+            background: #f8fafc;
+            padding: 1.5rem 2rem;
+            border-bottom: 1px solid var(--border-color);
+        }
+
+        .status-header h3 {
+            font-weight: 600;
+            color: var(--text-primary);
+            display: flex;
+            align-items: center;
+            gap: 0.75rem;
+        }
+
+        .status-body {
+            padding: 2rem;
+        }
+
+        .status-message {
+            padding: 1rem 1.5rem;
+            border-radius: 12px;
+            margin-bottom: 1.5rem;
+            font-weight: 500;
+            display: flex;
+            align-items: center;
+            gap: 0.75rem;
+        }
+
+        .status-pending {
+            background: #fef3c7;
+            color: #92400e;
+            border: 1px solid #fcd34d;
+        }
+
+        .status-running {
+            background: #dbeafe;
+            color: #1e40af;
+            border: 1px solid #93c5fd;
+        }
+
+        .status-completed {
+            background: #d1fae5;
+            color: #065f46;
+            border: 1px solid #6ee7b7;
+        }
+
+        .status-error {
+            background: #fee2e2;
+            color: #991b1b;
+            border: 1px solid #fca5a5;
+        }
+
+        .status-cancelled {
+            background: #f1f5f9;
+            color: #334155;
+            border: 1px solid #cbd5e1;
+        }
+
+        .progress-container {
+            margin-bottom: 1.5rem;
+        }
+
+        .progress-bar {
+            width: 100%;
+            height: 12px;
+            background: #e5e7eb;
+            border-radius: 6px;
+            overflow: hidden;
+            box-shadow: inset 0 1px 3px rgba(0, 0, 0, 0.1);
+        }
+
+        .progress-fill {
+            height: 100%;
+            background: linear-gradient(90deg, var(--primary-color), var(--primary-dark));
+            width: 0%;
+            transition: width 0.3s ease;
+            border-radius: 6px;
+        }
+
+        .progress-text {
+            text-align: center;
+            margin-top: 0.75rem;
+            font-weight: 600;
+            color: var(--text-primary);
+        }
+
+        .download-btn {
+            background: var(--success-color);
+            color: white;
+            border: none;
+            padding: 0.875rem 1.5rem;
+            font-size: 0.95rem;
+            font-weight: 600;
+            border-radius: 10px;
+            cursor: pointer;
+            text-decoration: none;
+            display: inline-flex;
+            align-items: center;
+            gap: 0.5rem;
+            transition: all 0.2s ease;
+            box-shadow: var(--shadow);
+        }
+
+        .download-btn:hover {
+            background: #047857;
+            transform: translateY(-1px);
+        }
+
+        .cancel-btn {
+            background: white;
+            color: var(--error-color);
+            border: 2px solid #fca5a5;
+            padding: 0.75rem 1.5rem;
+            font-size: 0.95rem;
+            font-weight: 600;
+            border-radius: 10px;
+            cursor: pointer;
+            display: inline-flex;
+            align-items: center;
+            gap: 0.5rem;
+            transition: all 0.2s ease;
+        }
+
+        .cancel-btn:hover:not(:disabled) {
+            background: #fee2e2;
+        }
+
+        .cancel-btn:disabled {
+            color: var(--text-secondary);
+            border-color: var(--border-color);
+            cursor: not-allowed;
+        }
+
+        .download-formats {
+            margin-top: 0.75rem;
+            font-size: 0.875rem;
+            color: var(--text-secondary);
+        }
+
+        .download-formats a {
+            color: var(--primary-color);
+            font-weight: 500;
+            text-decoration: none;
+        }
+
+        .stats-grid {
+            display: grid;
+            grid-template-columns: repeat(auto-fit, minmax(200px, 1fr));
+            gap: 1rem;
+            margin-top: 1rem;
+        }
+
+        .stat-card {
+            background: white;
+            border: 1px solid var(--border-color);
+            border-radius: 8px;
+            padding: 1rem;
+            text-align: center;
+        }
+
+        .stat-value {
+            font-size: 1.5rem;
+            font-weight: 700;
+            color: var(--primary-color);
+        }
+
+        .stat-label {
+            font-size: 0.875rem;
+            color: var(--text-secondary);
+            margin-top: 0.25rem;
+        }
+
+        @media (max-width: 768px) {
+            .container {
+                padding: 1rem;
+            }
+
+            .header h1 {
+                font-size: 2rem;
+            }
+
+            .settings-grid {
+                grid-template-columns: 1fr;
+            }
+
+            .card-body {
+                padding: 1.5rem;
+            }
+        }
+    </style>
+</head>
+<body>
+    <div class="container">
+        <div class="header">
+            <h1><i class="fas fa-search"></i> Index Analyzer Pro</h1>
+            <p>Professional Google indexing analysis with comprehensive reporting</p>
+        </div>
+
+        <div class="main-card">
+            <div class="card-header">
+                <h2><i class="fas fa-link"></i> URL Analysis</h2>
+                <p>Submit your URLs for comprehensive Google indexing verification</p>
+            </div>
+            
+            <div class="card-body">
+                <div class="form-group">
+                    <label for="urls-textarea" class="form-label">
+                        <i class="fas fa-list"></i> URL List
+                    </label>
+                    <textarea 
+                        id="urls-textarea" 
+                        class="form-textarea"
+                        placeholder="https://example.com/page1
+https://example.com/page2
+https://example.com/page3
+
+Enter your URLs here, one per line
+Supports bulk processing of thousands of URLs"></textarea>
+                </div>
+
+                <div class="form-group">
+                    <label for="urls-file" class="form-label">
+                        <i class="fas fa-file-upload"></i> Or Upload a File
+                    </label>
+                    <input type="file" id="urls-file" class="batch-input" accept=".txt,.csv,.xlsx,.xml,.gz">
+                </div>
+
+                <div class="settings-grid">
+                    <div class="info-card">
+                        <h4><i class="fas fa-info-circle"></i> Processing Guidelines</h4>
+                        <ul class="info-list">
+                            <li><i class="fas fa-check"></i> One URL per line</li>
+                            <li><i class="fas fa-check"></i> Must include http:// or https://</li>
+                            <li><i class="fas fa-check"></i> Upload TXT, CSV, XLSX or sitemap.xml (.gz) files</li>
+                            <li><i class="fas fa-check"></i> Results exported to Excel</li>
+                        </ul>
+                    </div>
+                    
+                    <div class="form-group">
+                        <label class="form-label">
+                            <i class="fas fa-cogs"></i> Batch Size
+                        </label>
+                        <input type="number" id="batch-size" class="batch-input" value="100" min="1" max="500">
+                    </div>
+                </div>
+
+                <button class="submit-btn" id="submit-btn" onclick="startChecking()">
+                    <i class="fas fa-rocket"></i>
+                    <span>Start Analysis</span>
+                </button>
+            </div>
+        </div>
+        
+        <div class="status-section" id="status-section">
+            <div class="status-header">
+                <h3><i class="fas fa-chart-line"></i> Analysis Progress</h3>
+            </div>
+            <div class="status-body">
+                <div id="status-message" class="status-message"></div>
+                
+                <div class="progress-container">
+                    <div class="progress-bar">
+                        <div class="progress-fill" id="progress-fill"></div>
+                    </div>
+                    <div class="progress-text" id="progress-text">0 / 0 URLs processed</div>
+                </div>
+
+                <div class="stats-grid" id="stats-grid" style="display: none;">
+                    <div class="stat-card">
+                        <div class="stat-value" id="total-urls">0</div>
+                        <div class="stat-label">Total URLs</div>
+                    </div>
+                    <div class="stat-card">
+                        <div class="stat-value" id="processed-urls">0</div>
+                        <div class="stat-label">Processed</div>
+                    </div>
+                    <div class="stat-card">
+                        <div class="stat-value" id="completion-rate">0%</div>
+                        <div class="stat-label">Completion</div>
+                    </div>
+                    <div class="stat-card">
+                        <div class="stat-value" id="indexed-urls">0</div>
+                        <div class="stat-label">Indexed</div>
+                    </div>
+                </div>
+                
+                <button id="cancel-btn" class="cancel-btn" style="display: none;" onclick="cancelJob()">
+                    <i class="fas fa-stop-circle"></i>
+                    <span>Cancel Analysis</span>
+                </button>
+                
+                <a id="download-btn" class="download-btn" style="display: none;">
+                    <i class="fas fa-download"></i>
+                    Download Excel Report
+                </a>
+                <div id="download-formats" class="download-formats" style="display: none;">
+                    Also available as
+                    <a id="download-csv">CSV</a> &middot;
+                    <a id="download-jsonl">JSONL</a> &middot;
+                    <a id="download-parquet">Parquet</a>
+                </div>
+            </div>
+        </div>
+    </div>
+
+    <script>
+        let currentJobId = null;
+        let statusInterval = null;
+        let statusSource = null;
+        let indexedCount = 0;
+
+        async function startChecking() {
+            const fileInput = document.getElementById('urls-file');
+            const file = fileInput.files.length ? fileInput.files[0] : null;
+            const urlsText = document.getElementById('urls-textarea').value.trim();
+            if (!urlsText && !file) {
+                alert('Please enter URLs or choose a file to analyze');
+                return;
+            }
+            
+            const urls = file ? [] : urlsText.split('\\n').map(url => url.trim()).filter(url => url && url.startsWith('http'));
+            if (!file && urls.length === 0) {
+                alert('Please enter valid URLs starting with http:// or https://');
+                return;
+            }
+
+            const batchSize = parseInt(document.getElementById('batch-size').value) || 100;
+            
+            try {
+                const submitBtn = document.getElementById('submit-btn');
+                const submitIcon = submitBtn.querySelector('i');
+                const submitText = submitBtn.querySelector('span');
+                
+                submitBtn.disabled = true;
+                submitIcon.className = 'fas fa-spinner fa-spin';
+                submitText.textContent = 'Initializing...';
+                
+                document.getElementById('status-section').classList.add('show');
+                document.getElementById('stats-grid').style.display = 'grid';
+                document.getElementById('total-urls').textContent = urls.length;
+                indexedCount = 0;
+                document.getElementById('indexed-urls').textContent = indexedCount;
+                
+                let response;
+                if (file) {
+                    const formData = new FormData();
+                    formData.append('file', file);
+                    formData.append('batch_size', batchSize);
+                    response = await fetch('/upload-urls', { method: 'POST', body: formData });
+                } else {
+                    response = await fetch('/check-urls', {
+                        method: 'POST',
+                        headers: { 'Content-Type': 'application/json' },
+                        body: JSON.stringify({ urls: urls, batch_size: batchSize })
+                    });
+                }
+                
+                if (!response.ok) throw new Error(`HTTP error! status: ${response.status}`);
+                
+                const result = await response.json();
+                currentJobId = result.job_id;
+                const cancelBtn = document.getElementById('cancel-btn');
+                cancelBtn.disabled = false;
+                cancelBtn.querySelector('span').textContent = 'Cancel Analysis';
+                cancelBtn.style.display = 'inline-flex';
+                startStatusStream();
+                
+            } catch (error) {
+                console.error('Error starting analysis:', error);
+                showStatus('error', `<i class="fas fa-exclamation-triangle"></i> Error: ${error.message}`);
+                resetSubmitButton();
+            }
+        }
+
+        function startStatusStream() {
+            if (statusSource) statusSource.close();
+            if (!window.EventSource) {
+                startStatusPolling();
+                return;
+            }
+            
+            const source = new EventSource(`/job-events/${currentJobId}`);
+            statusSource = source;
+            
+            const onStatus = (event) => {
+                const status = JSON.parse(event.data);
+                updateStatus(status);
+                
+                if (isFinished(status)) {
+                    source.close();
+                    statusSource = null;
+                    resetSubmitButton();
+                }
+            };
+            
+            source.addEventListener('status', onStatus);
+            source.addEventListener('progress', onStatus);
+            source.addEventListener('completed', onStatus);
+            source.addEventListener('failed', onStatus);
+            source.addEventListener('cancelled', onStatus);
+            source.addEventListener('result', (event) => {
+                const result = JSON.parse(event.data);
+                if (result.indexed) {
+                    indexedCount += result.rows;
+                    document.getElementById('indexed-urls').textContent = indexedCount;
+                }
+            });
+            
+            source.onerror = () => {
+                // Fall back to polling if the stream can't be kept open
+                source.close();
+                statusSource = null;
+                startStatusPolling();
+            };
+        }
+
+        function startStatusPolling() {
+            if (statusInterval) clearInterval(statusInterval);
+            
+            statusInterval = setInterval(async () => {
+                if (!currentJobId) return;
+                
+                try {
+                    const response = await fetch(`/job-status/${currentJobId}`);
+                    if (!response.ok) throw new Error(`HTTP error! status: ${response.status}`);
+                    
+                    const status = await response.json();
+                    updateStatus(status);
+                    
+                    if (isFinished(status)) {
+                        clearInterval(statusInterval);
+                        statusInterval = null;
+                        resetSubmitButton();
+                    }
+                } catch (error) {
+                    console.error('Error fetching status:', error);
+                    clearInterval(statusInterval);
+                    statusInterval = null;
+                    resetSubmitButton();
+                }
+            }, 2000);
+        }
+
+        function isFinished(status) {
+            return ['completed', 'failed', 'cancelled'].includes(status.status);
+        }
+
+        async function cancelJob() {
+            if (!currentJobId || !confirm('Stop this analysis? Results collected so far are kept.')) return;
+            
+            const cancelBtn = document.getElementById('cancel-btn');
+            cancelBtn.disabled = true;
+            cancelBtn.querySelector('span').textContent = 'Cancelling...';
+            try {
+                const response = await fetch(`/jobs/${currentJobId}`, { method: 'DELETE' });
+                if (!response.ok && response.status !== 409) throw new Error(`HTTP error! status: ${response.status}`);
+            } catch (error) {
+                console.error('Error cancelling analysis:', error);
+                cancelBtn.disabled = false;
+                cancelBtn.querySelector('span').textContent = 'Cancel Analysis';
+            }
+        }
+
+        function showDownloads() {
+            document.getElementById('download-btn').style.display = 'inline-flex';
+            document.getElementById('download-btn').href = `/download-results/${currentJobId}`;
+            document.getElementById('download-formats').style.display = 'block';
+            for (const format of ['csv', 'jsonl', 'parquet']) {
+                document.getElementById(`download-${format}`).href = `/download-results/${currentJobId}?format=${format}`;
+            }
+        }
+
+        function updateStatus(status) {
+            const progress = status.total ? Math.round((status.progress / status.total) * 100) : 0;
+            
+            document.getElementById('total-urls').textContent = status.total;
+            document.getElementById('progress-fill').style.width = `${progress}%`;
+            document.getElementById('progress-text').textContent = 
+                `${status.progress} / ${status.total} URLs processed`;
+            
+            document.getElementById('processed-urls').textContent = status.progress;
+            document.getElementById('completion-rate').textContent = `${progress}%`;
+            
+            let statusText = '';
+            let statusIcon = '';
+            
+            const cancelBtn = document.getElementById('cancel-btn');
+            cancelBtn.style.display = isFinished(status) ? 'none' : 'inline-flex';
+            if (status.cancel_requested) {
+                cancelBtn.disabled = true;
+                cancelBtn.querySelector('span').textContent = 'Cancelling...';
+            }
+            
+            switch (status.status) {
+                case 'pending':
+                    statusText = 'Analysis queued and waiting to start';
+                    statusIcon = '<i class="fas fa-clock"></i>';
+                    break;
+                case 'running':
+                    statusText = 'Processing URLs and checking index status';
+                    statusIcon = '<i class="fas fa-cog fa-spin"></i>';
+                    break;
+                case 'completed':
+                    statusText = 'Analysis completed successfully! Download your report below.';
+                    if (status.unknown) {
+                        statusText += ` ${status.unknown} URLs could not be checked and are marked Unknown.`;
+                    }
+                    statusIcon = '<i class="fas fa-check-circle"></i>';
+                    showDownloads();
+                    break;
+                case 'cancelled':
+                    statusText = 'Analysis cancelled.';
+                    statusIcon = '<i class="fas fa-stop-circle"></i>';
+                    if (status.row_count) {
+                        statusText += ` The report has the ${status.row_count} URLs checked before it stopped.`;
+                        showDownloads();
+                    }
+                    break;
+                case 'failed':
+                    statusText = `Analysis failed: ${status.error || 'Unknown error occurred'}`;
+                    statusIcon = '<i class="fas fa-times-circle"></i>';
+                    break;
+            }
+            
+            showStatus(status.status, `${statusIcon} ${statusText}`);
+        }
+
+        function showStatus(type, message) {
+            const statusMessage = document.getElementById('status-message');
+            statusMessage.className = `status-message status-${type}`;
+            statusMessage.innerHTML = message;
+        }
+
+        function resetSubmitButton() {
+            const submitBtn = document.getElementById('submit-btn');
+            const submitIcon = submitBtn.querySelector('i');
+            const submitText = submitBtn.querySelector('span');
+            
+            submitBtn.disabled = false;
+            submitIcon.className = 'fas fa-rocket';
+            submitText.textContent = 'Start Analysis';
+        }
+    </script>
+</body>
+</html>
+    """
+    return HTMLResponse(content=html_content)
+
+@app.get("/api")
+async def api_info():
+    return {"message": "Google Index Checker API", "status": "running"}
+
+@app.get("/metrics")
+async def get_metrics():
+    body, content_type = metrics.render()
+    return Response(content=body, media_type=content_type)
+
+@app.post("/check-urls")
+async def check_urls(url_batch: URLBatch, request: Request):
+    job_id = str(uuid.uuid4())
+    priority = url_batch.priority
+    if priority is None:
+        priority = INTERACTIVE_PRIORITY if len(url_batch.urls) < INTERACTIVE_MAX_URLS else 0
+    
+    check_engine_name(url_batch.engine)
+    options = {
+        "batch_size": url_batch.batch_size,
+        "parallel_batches": url_batch.parallel_batches,
+        "max_age": url_batch.max_age,
+        "force_refresh": url_batch.force_refresh,
+        "profile": bool(url_batch.profile),
+        "engine": url_batch.engine
+    }
+    job = {
+        "status": "pending",
+        "progress": 0,
+        "total": len(url_batch.urls),
+        "results_file": None,
+        "row_count": None,
+        "error": None,
+        "unique_urls": None,
+        "cache_hits": 0,
+        "retries": 0,
+        "recovered": 0,
+        "unknown": 0,
+        "coalesced": 0,
+        "timings": {},
+        "profile": None,
+        "resumes": 0,
+        "input_complete": True,
+        "priority": priority,
+        "client": request_client(request),
+        "options": options,
+        "created_at": datetime.now().isoformat()
+    }
+    # The input is kept on disk, where whichever worker claims the job reads
+    # it and where it is resumed from after a restart
+    job_input = InputSpool(result_path(job_id, "urls.txt"))
+    await asyncio.to_thread(fill_spool, job_input, url_batch.urls)
+    job_store.create(job_id, job)
+    enqueue_job(job_id, priority)
+    
+    return {"job_id": job_id, "message": "URL checking started"}
+
+@app.post("/upload-urls")
+async def upload_urls(
+    request: Request,
+    background_tasks: BackgroundTasks,
+    file: UploadFile = File(...),
+    batch_size: int = Form(100),
+    parallel_batches: Optional[int] = Form(None),
+    max_age: Optional[int] = Form(None),
+    force_refresh: bool = Form(False),
+    profile: bool = Form(False),
+    priority: int = Form(0),
+    engine: Optional[str] = Form(None)
+):
+    """Start a job from an uploaded TXT, CSV, XLSX or sitemap file (optionally gzipped).
+
+    The file is parsed in chunks while the job runs, so crawling starts
+    with the first URLs instead of after the whole file has been read.
+    Its size isn't known up front, so it runs at ``priority`` 0 unless
+    given another.
+    """
+    head = await file.read(512)
+    await file.seek(0)
+    if not head:
+        raise HTTPException(status_code=400, detail="Uploaded file is empty")
+    check_engine_name(engine)
+    
+    job_id = str(uuid.uuid4())
+    options = {
+        "batch_size": batch_size,
+        "parallel_batches": parallel_batches,
+        "max_age": max_age,
+        "force_refresh": force_refresh,
+        "profile": profile,
+        "engine": engine
+    }
+    job = {
+        "status": "pending",
+        "progress": 0,
+        "total": 0,
+        "results_file": None,
+        "row_count": None,
+        "error": None,
+        "unique_urls": None,
+        "cache_hits": 0,
+        "retries": 0,
+        "recovered": 0,
+        "unknown": 0,
+        "coalesced": 0,
+        "timings": {},
+        "profile": None,
+        "resumes": 0,
+        "input_complete": False,
+        "priority": priority,
+        "client": request_client(request),
+        "source": file.filename,
+        "options": options,
+        "created_at": datetime.now().isoformat()
+    }
+    job_input = InputSpool(result_path(job_id, "urls.txt"))
+    job_store.create(job_id, job)
+    
+    # The job is queued right away and its worker follows the input spool
+    # while this background task, which keeps the upload open, parses it
+    enqueue_job(job_id, priority)
+    background_tasks.add_task(ingest_upload, file, job_input)
+    
+    return {"job_id": job_id, "message": f"URL checking started from {file.filename}"}
+
+async def ingest_upload(upload: UploadFile, job_input: InputSpool):
+    await asyncio.to_thread(fill_spool, job_input, iter_upload_urls(upload.file, upload.filename or ""))
+
+def check_engine_name(engine: Optional[str]):
+    if engine is not None and engine not in CRAWL_ENGINES:
+        raise HTTPException(status_code=400, detail=f"Unsupported engine, use one of: {', '.join(CRAWL_ENGINES)}")
+
+def request_client(request: Request) -> str:
+    """Who submitted a job, for sharing the crawl budget fairly between clients"""
+    return request.headers.get("x-client-id") or (request.client.host if request.client else "unknown")
+
+@app.get("/job-status/{job_id}")
+async def get_job_status(job_id: str):
+    job = get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    # A job running in another worker has that worker's snapshot, saved
+    # with the rest of its state
+    if job_id in active_jobs and job["status"] in ("pending", "running"):
+        job = {**job, "concurrency": concurrency_snapshot()}
+    return job
+
+@app.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    """Stop a job. Batches in flight are abandoned, and the results it has
+    so far stay downloadable."""
+    job = get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job["status"] in FINISHED_STATUSES:
+        raise HTTPException(status_code=409, detail=f"Job is already {job['status']}")
+    
+    if job_id in active_jobs:
+        cancel_running_job(job_id)
+        return {"job_id": job_id, "status": "cancelling"}
+    
+    if await asyncio.to_thread(job_queue.withdraw, job_id):
+        # No worker had it, so there is nothing to stop
+        job_store.update(job_id, status="cancelled", cancel_requested=True)
+        remove_job_artifacts(job_id)
+        logger.info(f"Job {job_id} cancelled before it started")
+        return {"job_id": job_id, "status": "cancelled"}
+    
+    # The worker running it sees the flag within JOB_CANCEL_POLL_INTERVAL
+    job_store.update(job_id, cancel_requested=True)
+    return {"job_id": job_id, "status": "cancelling"}
+
+@app.post("/job-profile/{job_id}")
+async def start_job_profile(job_id: str):
+    """Profile a running job from now until it finishes"""
+    if not PROFILING_ENABLED:
+        raise HTTPException(status_code=403, detail="Profiling is disabled")
+    job = active_jobs.get(job_id)
+    if job is None:
+        job = job_store.get(job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="Job not found")
+        if job["status"] in FINISHED_STATUSES:
+            raise HTTPException(status_code=409, detail=f"Job is already {job['status']}")
+        # The worker running it sees the flag within JOB_CANCEL_POLL_INTERVAL,
+        # or as it starts the job
+        job_store.update(job_id, profile_requested=True)
+        return {"status": "requested"}
+    if job_id in _job_profilers:
+        return job["profile"]
+    if not begin_job_profile(job_id):
+        raise HTTPException(status_code=409, detail="Another job is being profiled")
+    return job["profile"]
+
+@app.get("/job-profile/{job_id}")
+async def download_job_profile(job_id: str, format: str = "txt"):
+    """The profile of a finished profiling run: a text summary, or the raw pstats dump"""
+    job = get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if format not in ("txt", "pstats"):
+        raise HTTPException(status_code=400, detail="Unsupported format, use one of: txt, pstats")
+    
+    path = result_path(job_id, f"profile.{format}")
+    if not (job.get("profile") or {}).get("status") == "finished" or not os.path.exists(path):
+        raise HTTPException(status_code=400, detail="Profile not ready")
+    
+    return FileResponse(
+        path,
+        media_type="text/plain" if format == "txt" else "application/octet-stream",
+        filename=os.path.basename(path)
+    )
+
+def begin_job_profile(job_id: str) -> bool:
+    profiler = JobProfiler(
+        result_path(job_id, "profile.pstats"), result_path(job_id, "profile.txt"), top=PROFILE_TOP_ENTRIES
+    )
+    if not profiler.start():
+        active_jobs[job_id]["profile"] = {"status": "skipped", "reason": "another job was being profiled"}
+        return False
+    _job_profilers[job_id] = profiler
+    active_jobs[job_id]["profile"] = {"status": "running", "started_at": datetime.now().isoformat()}
+    save_job(job_id)
+    logger.info(f"Profiling job {job_id}")
+    return True
+
+async def end_job_profile(job_id: str, job: dict):
+    profiler = _job_profilers.pop(job_id, None)
+    if profiler is None:
+        return
+    summary = profiler.stop()
+    try:
+        await asyncio.to_thread(profiler.write)
+        job["profile"] = {**job["profile"], **summary, "status": "finished"}
+        logger.info(f"Profile of job {job_id} written to {profiler.report_path}")
+    except Exception as e:
+        logger.error(f"Could not write profile of job {job_id}: {str(e)}")
+        job["profile"] = {**job["profile"], **summary, "status": "failed", "error": str(e)}
+
+def get_job(job_id: str) -> Optional[dict]:
+    job = active_jobs.get(job_id)
+    if job is not None:
+        return job
+    return job_store.get(job_id)
+
+def save_job(job_id: str, force: bool = True):
+    """Flush a running job's live state to the job store"""
+    job = active_jobs.get(job_id)
+    if job is None or job_id in _lost_jobs:
+        return
+    now = time.monotonic()
+    if not force and now - _job_flushed.get(job_id, 0) < JOB_FLUSH_INTERVAL:
+        return
+    _job_flushed[job_id] = now
+    concurrency = concurrency_snapshot() if job["status"] == "running" else None
+    try:
+        job_store.update(job_id, **{**job, "concurrency": concurrency})
+    except Exception as e:
+        logger.error(f"Could not save job {job_id}: {str(e)}")
+
+def enqueue_job(job_id: str, priority: int = 0):
+    job_queue.enqueue(job_id, priority)
+    if _queue_wakeup is not None:
+        _queue_wakeup.set()
+
+async def run_job_worker():
+    """Claim queued jobs and run them, up to WORKER_MAX_JOBS at a time plus
+    WORKER_PRIORITY_JOBS jobs with a positive priority"""
+    global _queue_wakeup
+    _queue_wakeup = asyncio.Event()
+    logger.info(f"Worker {WORKER_ID} taking jobs from {JOB_QUEUE_URL}")
+    try:
+        requeue_unfinished_jobs()
+    except Exception as e:
+        logger.error(f"Could not requeue unfinished jobs: {str(e)}")
+    
+    while True:
+        _queue_wakeup.clear()
+        claimed = None
+        running = len(_worker_tasks)
+        if running < WORKER_MAX_JOBS + WORKER_PRIORITY_JOBS:
+            min_priority = None if running < WORKER_MAX_JOBS else 1
+            try:
+                claimed = await asyncio.to_thread(job_queue.claim, WORKER_ID, JOB_LEASE_TIMEOUT, min_priority)
+            except Exception as e:
+                logger.error(f"Could not claim a job: {str(e)}")
+        if claimed is not None:
+            try:
+                start_claimed_job(claimed)
+            except Exception as e:
+                logger.error(f"Could not start job {claimed.job_id}: {str(e)}")
+                job_queue.release(WORKER_ID, claimed.job_id)
+            continue
+        
+        try:
+            await asyncio.wait_for(_queue_wakeup.wait(), timeout=WORKER_POLL_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+
+def requeue_unfinished_jobs():
+    """Queue unfinished jobs that have no queue entry, e.g. jobs submitted
+    before the queue existed; jobs that are queued or running are left alone"""
+    for status in ("pending", "running"):
+        for record in job_store.list_jobs(status):
+            job_queue.enqueue(record["job_id"], record.get("priority", 0))
+
+def start_claimed_job(claimed: ClaimedJob):
+    job_id = claimed.job_id
+    record = job_store.get(job_id)
+    if record is None or record["status"] in FINISHED_STATUSES:
+        job_queue.finish(WORKER_ID, job_id)
+        return
+    
+    if record.get("cancel_requested") and record["status"] == "pending":
+        job_store.update(job_id, status="cancelled")
+        job_queue.finish(WORKER_ID, job_id)
+        return
+    
+    if claimed.attempts > JOB_MAX_ATTEMPTS:
+        logger.error(f"Job {job_id} was interrupted {claimed.attempts - 1} times, giving up")
+        job_store.update(job_id, status="failed", error=f"Job was interrupted {claimed.attempts - 1} times")
+        job_queue.finish(WORKER_ID, job_id)
+        return
+    
+    try:
+        job_input = InputSpool.open(result_path(job_id, "urls.txt"))
+    except OSError as e:
+        logger.error(f"Cannot run job {job_id}, its input is missing: {e}")
+        job_store.update(job_id, status="failed", error="Job input was lost")
+        job_queue.finish(WORKER_ID, job_id)
+        return
+    
+    # A job that got as far as running was interrupted; it picks up from
+    # its checkpoint
+    resume = record["status"] != "pending"
+    if resume:
+        logger.info(f"Resuming job {job_id} from its last checkpoint")
+        record["resumes"] = record.get("resumes", 0) + 1
+    options = dict(record.get("options", {}))
+    # Profiling requested through the store before the job started
+    if record.pop("profile_requested", False):
+        options["profile"] = True
+    # The snapshot the last worker saved; this one saves its own
+    record.pop("concurrency", None)
+    active_jobs[job_id] = record
+    _worker_tasks[job_id] = asyncio.create_task(
+        run_claimed_job(job_id, job_input, options, resume)
+    )
+
+async def run_claimed_job(job_id: str, job_input: InputSpool, options: dict, resume: bool):
+    try:
+        await process_urls_batch(job_id, job_input, **options, resume=resume)
+    except asyncio.CancelledError:
+        # The worker is shutting down: hand the job straight to another
+        # worker instead of making it wait for the lease to run out. A job
+        # whose lease was lost already belongs to another worker
+        if job_id not in _lost_jobs:
+            job_queue.release(WORKER_ID, job_id)
+        raise
+    else:
+        job_queue.finish(WORKER_ID, job_id)
+    finally:
+        _worker_tasks.pop(job_id, None)
+        _lost_jobs.discard(job_id)
+        if _queue_wakeup is not None:
+            _queue_wakeup.set()
+
+async def stop_job_worker():
+    if _worker_loop is not None:
+        _worker_loop.cancel()
+    tasks = list(_worker_tasks.values())
+    for task in tasks:
+        task.cancel()
+    if tasks:
+        logger.info(f"Handing {len(tasks)} running jobs back to the queue")
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+def cancel_running_job(job_id: str):
+    job = active_jobs[job_id]
+    if not job.get("cancel_requested"):
+        logger.info(f"Cancelling job {job_id}")
+    job["cancel_requested"] = True
+    crawl = _job_crawls.get(job_id)
+    if crawl is not None:
+        crawl.cancel()
+    save_job(job_id)
+
+async def watch_job_requests():
+    """Cancel or profile this worker's jobs when a request for it reaches the store"""
+    while True:
+        await asyncio.sleep(JOB_CANCEL_POLL_INTERVAL)
+        for job_id in list(_worker_tasks):
+            if job_id not in active_jobs:
+                continue
+            try:
+                record = await asyncio.to_thread(job_store.get, job_id)
+            except Exception as e:
+                logger.error(f"Could not check job {job_id} for requests: {str(e)}")
+                continue
+            job = active_jobs.get(job_id)
+            if record is None or job is None:
+                continue
+            if record.get("cancel_requested") and not job.get("cancel_requested"):
+                cancel_running_job(job_id)
+            if record.get("profile_requested"):
+                try:
+                    await asyncio.to_thread(job_store.update, job_id, profile_requested=False)
+                except Exception as e:
+                    logger.error(f"Could not take profiling request of job {job_id}: {str(e)}")
+                    continue
+                if PROFILING_ENABLED and job_id in active_jobs and job_id not in _job_profilers:
+                    begin_job_profile(job_id)
+
+async def renew_job_leases():
+    while True:
+        await asyncio.sleep(JOB_LEASE_TIMEOUT / 4)
+        if not _worker_tasks:
+            continue
+        try:
+            lost = await asyncio.to_thread(job_queue.renew, WORKER_ID, list(_worker_tasks), JOB_LEASE_TIMEOUT)
+        except Exception as e:
+            logger.error(f"Could not renew job leases: {str(e)}")
+            continue
+        # Another worker has claimed the job and is resuming it, so this
+        # one stops without finishing, releasing or saving it
+        for job_id in lost:
+            task = _worker_tasks.get(job_id)
+            if task is None or job_id in _lost_jobs:
+                continue
+            logger.warning(f"Lost the lease on job {job_id} to another worker, stopping it here")
+            _lost_jobs.add(job_id)
+            task.cancel()
+
+def remove_job_artifacts(job_id: str):
+    for path in glob.glob(os.path.join(RESULTS_DIR, f"google_index_results_{job_id}.*")):
+        try:
+            os.unlink(path)
+        except OSError as e:
+            logger.warning(f"Could not remove {path}: {e}")
+    _export_locks.pop(job_id, None)
+
+async def evict_finished_jobs():
+    while True:
+        try:
+            evicted = await asyncio.to_thread(job_store.evict_finished, JOB_TTL)
+            for job_id in evicted:
+                remove_job_artifacts(job_id)
+            
+            # Result files whose job record is already gone, e.g. from a
+            # store that was reset or jobs that predate it
+            cutoff = time.time() - JOB_TTL
+            orphans = 0
+            for path in glob.glob(os.path.join(RESULTS_DIR, "google_index_results_*")):
+                job_id = os.path.basename(path)[len("google_index_results_"):].split(".", 1)[0]
+                if os.path.getmtime(path) < cutoff and job_id not in active_jobs and job_store.get(job_id) is None:
+                    os.unlink(path)
+                    orphans += 1
+            
+            if evicted or orphans:
+                logger.info(f"Evicted {len(evicted)} finished jobs and {orphans} orphaned result files")
+        except Exception as e:
+            logger.error(f"Job eviction failed: {str(e)}")
+        
+        await asyncio.sleep(JOB_EVICT_INTERVAL)
+
+@app.get("/job-events/{job_id}")
+async def job_events(job_id: str):
+    """Server-Sent Events stream of a job's progress, per-URL results and completion"""
+    job = get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    if job_id not in active_jobs:
+        return StreamingResponse(
+            stream_stored_job_events(job_id, job),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
+    
+    queue = asyncio.Queue(maxsize=JOB_EVENT_QUEUE_SIZE)
+    job_subscribers.setdefault(job_id, set()).add(queue)
+    
+    async def stream():
+        try:
+            yield format_sse("status", job)
+            if job["status"] in TERMINAL_EVENTS:
+                return
+            
+            while True:
+                try:
+                    event, data = await asyncio.wait_for(queue.get(), timeout=15)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                
+                yield format_sse(event, data)
+                if event in TERMINAL_EVENTS:
+                    return
+        finally:
+            subscribers = job_subscribers.get(job_id)
+            if subscribers is not None:
+                subscribers.discard(queue)
+                if not subscribers:
+                    job_subscribers.pop(job_id, None)
+    
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+async def stream_stored_job_events(job_id: str, job: dict):
+    """Events for a job running in another worker, read from the job store,
+    with a result event for every row the worker adds to the job's spool"""
+    yield format_sse("status", job)
+    if job["status"] in TERMINAL_EVENTS:
+        return
+    last_progress = job["progress"]
+    idle = 0.0
+    spool = SpoolTail(result_path(job_id, "jsonl"))
+    try:
+        while True:
+            await asyncio.sleep(JOB_FLUSH_INTERVAL)
+            job = job_store.get(job_id)
+            if job is None:
+                return
+            rows = await asyncio.to_thread(spool.read)
+            for row in rows:
+                yield format_sse("result", result_event(row, 1))
+            if job["status"] in TERMINAL_EVENTS:
+                yield format_sse(job["status"], job)
+                return
+            if job["progress"] != last_progress:
+                last_progress = job["progress"]
+                idle = 0.0
+                yield format_sse("progress", job)
+            elif not rows:
+                idle += JOB_FLUSH_INTERVAL
+                if idle >= 15:
+                    idle = 0.0
+                    yield ": keep-alive\n\n"
+    finally:
+        spool.close()
+
+def format_sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def publish_job_event(job_id: str, event: str, data: dict):
+    for queue in job_subscribers.get(job_id, ()):
+        try:
+            queue.put_nowait((event, data))
+        except asyncio.QueueFull:
+            # A slow client only misses intermediate events, never the end
+            if event in TERMINAL_EVENTS:
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait((event, data))
+
+def publish_progress(job_id: str):
+    if job_id not in job_subscribers:
+        return
+    now = time.monotonic()
+    if now - _progress_published.get(job_id, 0) >= PROGRESS_EVENT_INTERVAL:
+        _progress_published[job_id] = now
+        publish_job_event(job_id, "progress", dict(active_jobs[job_id]))
+
+def publish_result(job_id: str, result: dict, rows: int):
+    if job_id not in job_subscribers:
+        return
+    publish_job_event(job_id, "result", result_event(result, rows))
+
+def result_event(result: dict, rows: int) -> dict:
+    """A result event: one checked URL and how many input rows it answers"""
+    return {
+        "url": result.get("url"),
+        "indexed": bool(result.get("indexed")),
+        "result_url": result.get("result_url"),
+        "error": result.get("error"),
+        "rows": rows
+    }
+
+DOWNLOAD_FORMATS = {
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "csv": "text/csv",
+    "jsonl": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+# XLSX and Parquet files are only built from the result spool on first
+# download; the lock keeps concurrent requests from building them twice
+_export_locks = {}
+
+def result_path(job_id: str, ext: str) -> str:
+    return os.path.join(RESULTS_DIR, f"google_index_results_{job_id}.{ext}")
+
+async def build_export(job_id: str, spool_path: str, fmt: str) -> str:
+    path = result_path(job_id, fmt)
+    lock = _export_locks.setdefault(job_id, asyncio.Lock())
+    async with lock:
+        if os.path.exists(path):
+            return path
+        
+        logger.info(f"Building {fmt} export for job {job_id}")
+        started = time.perf_counter()
+        with metrics.REPORT_SECONDS.labels(fmt).time():
+            if fmt == "xlsx":
+                path = await asyncio.to_thread(write_xlsx, spool_path, path)
+            else:
+                try:
+                    path = await asyncio.to_thread(write_parquet, spool_path, path)
+                except ImportError:
+                    raise HTTPException(status_code=501, detail="Parquet downloads require pyarrow")
+        record_report_time(job_id, fmt, time.perf_counter() - started)
+        return path
+
+def record_report_time(job_id: str, fmt: str, seconds: float):
+    job = job_store.get(job_id)
+    if job is None:
+        return
+    timings = job.get("timings") or {}
+    StageTimings(timings).add(f"report_{fmt}", seconds)
+    try:
+        job_store.update(job_id, timings=timings)
+    except Exception as e:
+        logger.error(f"Could not save report timing of job {job_id}: {str(e)}")
+
+@app.get("/download-results/{job_id}")
+async def download_results(job_id: str, format: str = "xlsx", gzip: bool = False):
+    job = get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    if format not in DOWNLOAD_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported format, use one of: {', '.join(DOWNLOAD_FORMATS)}")
+    
+    if job["status"] not in ("completed", "cancelled") or not job["results_file"]:
+        raise HTTPException(status_code=400, detail="Results not ready")
+    
+    if not os.path.exists(job["results_file"]):
+        raise HTTPException(status_code=404, detail="Results file not found")
+    
+    filename = f"google_index_results_{job_id}.{format}"
+    
+    if format in ("csv", "jsonl"):
+        # Converted and sent chunk by chunk straight from the spool
+        chunks = stream_csv(job["results_file"], gzip) if format == "csv" else stream_jsonl(job["results_file"], gzip)
+        media_type = "application/gzip" if gzip else DOWNLOAD_FORMATS[format]
+        if gzip:
+            filename += ".gz"
+        return StreamingResponse(
+            iterate_in_threadpool(chunks),
+            media_type=media_type,
+            headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+        )
+    
+    export_file = await build_export(job_id, job["results_file"], format)
+    return FileResponse(
+        export_file,
+        media_type=DOWNLOAD_FORMATS[format],
+        filename=filename
+    )
+
+def resolve_spider_path() -> str:
+    candidates = [SPIDER_PATH] if SPIDER_PATH else [
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), 'GoogleIndexSpider'),
+        os.path.join(os.getcwd(), 'GoogleIndexSpider'),
+    ]
+    for path in candidates:
+        if os.path.isfile(os.path.join(path, 'scrapy.cfg')):
+            return os.path.abspath(path)
+    raise RuntimeError(f"Spider project not found: no scrapy.cfg in {', '.join(candidates)}")
+
+def running_engines() -> list:
+    """The shared engines of this worker: the in-process crawler and the direct engine"""
+    return [engine for engine in (crawl_engine, direct_engine) if engine is not None and engine.running]
+
+def apply_concurrency_limit(limit: int):
+    # The shared in-process downloader and the direct engine enforce the
+    # limit themselves, so batches can keep queueing behind it;
+    # subprocesses each get REQUESTS_PER_BATCH, so there the number of
+    # batches crawling at once is what changes
+    for engine in running_engines():
+        engine.set_concurrency(limit)
+    if not any(engine is crawl_engine or CRAWL_ENGINE == "direct" for engine in running_engines()):
+        crawl_budget.resize(max(1, limit // REQUESTS_PER_BATCH))
+
+def crawl_saturated() -> bool:
+    """Whether crawl work is queued behind the current concurrency limit"""
+    if crawl_budget.waiting:
+        return True
+    return any(engine.backlog() > 0 for engine in running_engines())
+
+def sample_zyte_throttling():
+    # The Zyte client retries 429s itself, so they never reach the spider
+    # as errors; its running count in the engine stats still shows them
+    global _zyte_throttled_seen
+    engines = running_engines()
+    if not engines:
+        return
+    throttled = sum(engine.stat("scrapy-zyte-api/429") + engine.stat("zyte-api/429") for engine in engines)
+    concurrency_controller.record_throttled(throttled - _zyte_throttled_seen)
+    _zyte_throttled_seen = throttled
+
+def failed_result(url: str, error: str, error_type: str = "MissingResult") -> dict:
+    return {
+        "url": url,
+        "indexed": False,
+        "error": error,
+        "error_type": error_type,
+        "checked_at": datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    }
+
+def record_subprocess_stats(stats: dict):
+    for key, value in metrics.numeric_stats(stats).items():
+        _subprocess_scrapy_stats[key] = _subprocess_scrapy_stats.get(key, 0) + value
+    if concurrency_controller is not None:
+        concurrency_controller.record_throttled(stats.get("scrapy-zyte-api/429", 0))
+
+def record_crawl_outcome(result: dict):
+    error = result.get("error") or ""
+    latency = result.get("download_latency")
+    if error:
+        metrics.CRAWL_ERRORS.labels(result.get("error_type") or "Unknown").inc()
+    # Coalesced results all carry the latency of the one site: query
+    if latency is not None and not result.get("coalesced"):
+        metrics.ZYTE_REQUEST_SECONDS.observe(latency)
+    if concurrency_controller is None:
+        return
+    concurrency_controller.record(latency, error=bool(error), throttled="429" in error)
+
+def scrapy_stats_totals() -> Dict[str, float]:
+    """Scrapy stats of every subprocess crawl plus those of the in-process crawler"""
+    totals = dict(_subprocess_scrapy_stats)
+    if crawl_engine is not None:
+        for key, value in metrics.numeric_stats(crawl_engine.stats()).items():
+            totals[key] = totals.get(key, 0) + value
+    return totals
+
+def queued_urls() -> int:
+    return sum(max(0, (job.get("total") or 0) - (job.get("progress") or 0)) for job in active_jobs.values())
+
+def current_concurrency_limit() -> int:
+    if concurrency_controller is not None:
+        return concurrency_controller.limit
+    return crawl_budget.capacity * REQUESTS_PER_BATCH
+
+def concurrency_snapshot() -> dict:
+    snapshot = {"budget": crawl_budget.snapshot()}
+    if concurrency_controller is not None:
+        snapshot.update(concurrency_controller.snapshot())
+    return snapshot
+
+def subprocess_concurrency_settings() -> List[str]:
+    """Per-subprocess concurrency, so a single batch never exceeds the adaptive limit"""
+    if concurrency_controller is None:
+        return []
+    limit = min(REQUESTS_PER_BATCH, concurrency_controller.limit)
+    return ['-s', f'CONCURRENT_REQUESTS={limit}', '-s', f'CONCURRENT_REQUESTS_PER_DOMAIN={limit}']
+
+async def run_crawl(urls: List[str], on_item: Callable[[dict], None], timings: Optional[StageTimings] = None,
+                    priority: int = 0, engine: Optional[str] = None) -> int:
+    """Crawl ``urls`` with ``engine``, or the worker's CRAWL_ENGINE, handing
+    each result to ``on_item``. Returns the number of results produced."""
+    engine = engine or CRAWL_ENGINE
+    if engine == "direct" and await get_direct_engine() is not None and direct_engine.running:
+        try:
+            logger.info(f"Running direct crawl for {len(urls)} URLs...")
+            count = await direct_engine.crawl(urls, on_item, priority)
+            logger.info(f"Direct crawl completed with {count} results")
+            return count
+        except Exception as e:
+            logger.error(f"Error running direct crawl: {str(e)}")
+            return 0
+    if engine == "subprocess":
+        return await run_scrapy_subprocess(urls, on_item, timings)
+    return await run_scrapy_spider(urls, on_item, timings, priority)
+
+async def run_scrapy_spider(urls: List[str], on_item: Callable[[dict], None],
+                            timings: Optional[StageTimings] = None, priority: int = 0) -> int:
+    """Crawl ``urls``, handing each result to ``on_item`` as soon as it is
+    scraped. Returns the number of results produced. Subprocess startup and
+    item decoding time are added to ``timings``. In the shared in-process
+    crawler, requests of a higher ``priority`` are sent first."""
+    if crawl_engine is not None and crawl_engine.running:
+        try:
+            logger.info(f"Running in-process crawl for {len(urls)} URLs...")
+            count = await crawl_engine.crawl(urls, on_item, priority)
+            logger.info(f"In-process crawl completed with {count} results")
+            return count
+        except Exception as e:
+            logger.error(f"Error running in-process crawl: {str(e)}")
+            return 0
+    
+    return await run_scrapy_subprocess(urls, on_item, timings)
+
+async def feed_spider_urls(stdin: asyncio.StreamWriter, urls: List[str]):
+    """Write a batch to the spider's stdin, one URL per line, in chunks"""
+    try:
+        for i in range(0, len(urls), 1000):
+            chunk = urls[i:i + 1000]
+            stdin.write("".join(url.replace("\r", " ").replace("\n", " ") + "\n" for url in chunk).encode("utf-8"))
+            await stdin.drain()
+    except (BrokenPipeError, ConnectionResetError):
+        logger.warning("Spider exited before reading all of its URLs")
+    finally:
+        stdin.close()
+
+async def run_scrapy_subprocess(urls: List[str], on_item: Callable[[dict], None],
+                                timings: Optional[StageTimings] = None) -> int:
+    count = 0
+    timings = timings or StageTimings({})
+    process = None
+    try:
+        # URLs go in on stdin, one per line, so batch size isn't bounded by
+        # ARG_MAX and URLs containing commas survive. StreamItemsPipeline
+        # writes every item to stdout as a JSON line the moment it is
+        # scraped, so results are consumed while the crawl runs
+        cmd = [
+            sys.executable, '-m', 'scrapy', 'crawl', 'gr',
+            '-a', 'urls_file=-',
+            '-s', 'STREAM_ITEMS=1',
+            '-s', f'LOG_LEVEL={SCRAPY_LOG_LEVEL}',
+            *subprocess_concurrency_settings()
+        ]
+        
+        logger.info(f"Running Scrapy for {len(urls)} URLs...")
+        logger.info(f"Command: {' '.join(cmd)}")
+        
+        started = time.perf_counter()
+        process = await asyncio.create_subprocess_exec(
+            *cmd,
+            cwd=spider_path,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            limit=1024 * 1024
+        )
+        stderr_task = asyncio.create_task(process.stderr.read())
+        stdin_task = asyncio.create_task(feed_spider_urls(process.stdin, urls))
+        
+        async for line in process.stdout:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                with timings.stage("decode"):
+                    item = json.loads(line)
+            except json.JSONDecodeError as e:
+                logger.error(f"Error parsing streamed item: {e}")
+                continue
+            if "_opened" in item:
+                startup = time.perf_counter() - started
+                metrics.CRAWLER_STARTUP_SECONDS.labels("subprocess").observe(startup)
+                timings.add("crawler_startup", startup)
+                continue
+            if "_stats" in item:
+                record_subprocess_stats(item["_stats"])
+                continue
+            on_item(item)
+            count += 1
+        
+        await process.wait()
+        stderr = await stderr_task
+        await stdin_task
+        
+        logger.info(f"Scrapy return code: {process.returncode}")
+        if stderr:
+            logger.info(f"Scrapy stderr: {stderr.decode()[:500]}...")
+        
+        if process.returncode != 0:
+            logger.error(f"Scrapy process failed with return code {process.returncode}")
+            logger.error(f"Full stderr: {stderr.decode()}")
+        
+        logger.info(f"Scrapy completed with {count} results")
+        return count
+    
+    except Exception as e:
+        logger.error(f"Error running Scrapy spider: {str(e)}")
+        import traceback
+        logger.error(f"Full traceback: {traceback.format_exc()}")
+        return count
+    
+    finally:
+        # Whether the crawl failed, was cancelled or the worker is stopping,
+        # don't leave the spider running and spending API calls on its own
+        if process is not None and process.returncode is None:
+            logger.info(f"Killing Scrapy process {process.pid}")
+            process.kill()
+            await process.wait()
+
+async def lookup_cached_results(urls: List[str], max_age: Optional[int]) -> dict:
+    if result_cache is None:
+        return {}
+    try:
+        return await asyncio.to_thread(result_cache.get_many, urls, max_age)
+    except Exception as e:
+        logger.error(f"Result cache lookup failed: {str(e)}")
+        return {}
+
+async def store_cached_results(results: List[dict]):
+    if result_cache is None or not results:
+        return
+    try:
+        await asyncio.to_thread(result_cache.put_many, results)
+    except Exception as e:
+        logger.error(f"Result cache update failed: {str(e)}")
+
+async def process_urls_batch(job_id: str, job_input: InputSpool, batch_size: int, parallel_batches: Optional[int] = None,
+                             max_age: Optional[int] = None, force_refresh: bool = False, profile: bool = False,
+                             engine: Optional[str] = None, resume: bool = False):
+    job = active_jobs[job_id]
+    checkpoint = None
+    timings = StageTimings(job.setdefault("timings", {}))
+    priority = job.get("priority") or 0
+    share_owner = job.get("client") if FAIR_SHARE_BY == "client" else job_id
+    started = time.perf_counter()
+    try:
+        if profile and PROFILING_ENABLED and job_id not in _job_profilers:
+            begin_job_profile(job_id)
+        job["status"] = "running"
+        save_job(job_id)
+        logger.info(f"{'Resuming' if resume else 'Starting'} job {job_id}")
+        
+        # Results are checkpointed per batch, so a resumed job only crawls
+        # the URLs that had no result when it was interrupted
+        with timings.stage("checkpoint"):
+            checkpoint = await asyncio.to_thread(JobCheckpoint, result_path(job_id, "checkpoint.sqlite3"), resume)
+            results_by_key = ResultIndex(checkpoint, JOB_RESULTS_IN_MEMORY)
+        if results_by_key:
+            logger.info(f"Job {job_id}: {len(results_by_key)} URLs restored from checkpoint")
+        
+        # Each distinct normalized URL is checked once and its result is
+        # fanned back out to every input row that shares it. waiting_rows
+        # counts the rows read so far for keys that have no result yet, so
+        # a key missing from it has been resolved
+        waiting_rows = {}
+        pending_rows = collections.deque()
+        rows_written = asyncio.Event()
+        rows_read = 0
+        next_row = 0
+        job["progress"] = 0
+        job["retries"] = job["recovered"] = job["unknown"] = job["coalesced"] = 0
+        spool = ResultSpool(result_path(job_id, "jsonl"))
+        
+        def write_ready_rows(final: bool = False):
+            # Rows go out in input order as soon as every row before them
+            # has been resolved; rows still waiting at the end are left out
+            nonlocal next_row
+            written = next_row
+            with timings.stage("spool"):
+                while pending_rows:
+                    url, key = pending_rows[0]
+                    if key in waiting_rows and not final:
+                        break
+                    pending_rows.popleft()
+                    result = results_by_key.get(key)
+                    if result is not None:
+                        spool.add_row({**result, "index": next_row, "url": url})
+                    next_row += 1
+            if next_row != written:
+                rows_written.set()
+        
+        def resolve(key: str, result: dict) -> int:
+            results_by_key[key] = result
+            count = waiting_rows.pop(key, 0)
+            job["progress"] += count
+            return count
+        
+        def resolve_failed(key: str, result: dict):
+            job["unknown"] += 1
+            metrics.URLS_CHECKED.labels(result_status(result)).inc()
+            count = resolve(key, result)
+            publish_result(job_id, result, count)
+        
+        def retry_budget_left() -> int:
+            budget = max(RETRY_JOB_BUDGET_MIN, int(RETRY_JOB_BUDGET_RATIO * (job["unique_urls"] or 0)))
+            return budget - job["retries"]
+        
+        async def crawl_with_retries(batch_num: int, targets: list):
+            # Only the URLs whose check failed are sent again, with
+            # exponential backoff, until they succeed or run out of attempts
+            # or the job runs out of retries; what still fails is Unknown
+            retried = set()
+            attempt = 0
+            while targets:
+                crawled = []
+                failed = {}
+                can_retry = attempt < RETRY_MAX_ATTEMPTS
+                
+                def on_item(result, targets=targets):
+                    with timings.stage("results"):
+                        handle_item(result, targets)
+                
+                def handle_item(result, targets):
+                    # The spider numbers the URLs it was given in order
+                    key, url = targets[result["index"]]
+                    record_crawl_outcome(result)
+                    if result.get("error"):
+                        failed[key] = (url, result)
+                        return
+                    if key in retried:
+                        job["recovered"] += 1
+                    if result.get("coalesced"):
+                        job["coalesced"] += 1
+                    metrics.URLS_CHECKED.labels(result_status(result)).inc()
+                    count = resolve(key, result)
+                    crawled.append(result)
+                    publish_result(job_id, result, count)
+                    publish_progress(job_id)
+                    save_job(job_id, force=False)
+                
+                waiting = time.perf_counter()
+                async with crawl_budget.slot(priority, share_owner):
+                    timings.add("slot_wait", time.perf_counter() - waiting)
+                    with timings.stage("crawl"):
+                        await run_crawl([url for _, url in targets], on_item, timings, priority, engine)
+                with timings.stage("cache_store"):
+                    await store_cached_results(crawled)
+                
+                for key, url in targets:
+                    if key in waiting_rows and key not in failed:
+                        failed[key] = (url, failed_result(url, "No result returned"))
+                if not failed:
+                    return
+                
+                budget = retry_budget_left() if can_retry else 0
+                retry = list(failed.items())[:max(0, budget)]
+                for key, (url, result) in list(failed.items())[len(retry):]:
+                    resolve_failed(key, result)
+                if not retry:
+                    return
+                
+                attempt += 1
+                job["retries"] += len(retry)
+                metrics.RETRIES.inc(len(retry))
+                retried.update(key for key, _ in retry)
+                delay = min(RETRY_BACKOFF_MAX, RETRY_BACKOFF * 2 ** (attempt - 1)) * random.uniform(0.5, 1.0)
+                logger.info(f"Batch {batch_num}: retrying {len(retry)} failed URLs in {delay:.1f}s (attempt {attempt})")
+                with timings.stage("retry_wait"):
+                    await asyncio.sleep(delay)
+                targets = [(key, url) for key, (url, _) in retry]
+        
+        parallel_batches = max(1, min(parallel_batches or MAX_PARALLEL_BATCHES_PER_JOB, MAX_PARALLEL_BATCHES_PER_JOB))
+        batch_queue = asyncio.Queue(maxsize=parallel_batches)
+        batch_count = 0
+        
+        async def read_input():
+            # The input may still be growing (an upload being parsed), so
+            # batches are cut as soon as enough new URLs have been read
+            nonlocal rows_read
+            targets = []
+            try:
+                async for chunk in job_input.iter_chunks():
+                    # Rows repeating a URL that is already checked, by
+                    # whether it is indexed
+                    repeated = collections.Counter()
+                    for url in chunk:
+                        key = normalize_url(url)
+                        pending_rows.append((url, key))
+                        rows_read += 1
+                        if key in waiting_rows:
+                            waiting_rows[key] += 1
+                        elif key in results_by_key:
+                            job["progress"] += 1
+                            if job_id in job_subscribers:
+                                repeated[bool(results_by_key[key].get("indexed"))] += 1
+                        else:
+                            waiting_rows[key] = 1
+                            targets.append((key, url))
+                            if len(targets) >= batch_size:
+                                await batch_queue.put(targets)
+                                targets = []
+                        
+                        while len(pending_rows) >= JOB_PENDING_ROWS:
+                            # The first pending row's URL may be in the
+                            # batch being cut, so it goes out short
+                            if targets:
+                                await batch_queue.put(targets)
+                                targets = []
+                            rows_written.clear()
+                            write_ready_rows()
+                            if len(pending_rows) >= JOB_PENDING_ROWS:
+                                await rows_written.wait()
+                    
+                    # They go out as one result event per outcome, without a
+                    # URL, so the stream's counts include them without a
+                    # burst of events that would overflow slow subscribers
+                    for indexed, rows in repeated.items():
+                        publish_result(job_id, {"indexed": indexed}, rows)
+                    job["total"] = rows_read
+                    job["unique_urls"] = len(results_by_key) + len(waiting_rows)
+                    write_ready_rows()
+                    publish_progress(job_id)
+                    save_job(job_id, force=False)
+                
+                if targets:
+                    await batch_queue.put(targets)
+                job["input_complete"] = True
+                if job_input.seconds is not None:
+                    timings.seconds["ingest"] = job_input.seconds
+                logger.info(f"Job {job_id}: {job['unique_urls']} distinct URLs out of {rows_read}")
+            except BaseException:
+                # The job is failing or being cancelled: drop the batches no
+                # worker has taken yet, so the sentinels can't block
+                while not batch_queue.empty():
+                    batch_queue.get_nowait()
+                for _ in range(parallel_batches):
+                    batch_queue.put_nowait(None)
+                raise
+            for _ in range(parallel_batches):
+                await batch_queue.put(None)
+        
+        async def batch_worker():
+            # Workers pull batches from a shared queue, so at most
+            # parallel_batches batches of this job are in flight and each
+            # also needs a slot from the server-wide budget
+            nonlocal batch_count
+            while True:
+                targets = await batch_queue.get()
+                if targets is None:
+                    return
+                batch_count += 1
+                batch_num = batch_count
+                logger.info(f"Processing batch {batch_num} ({len(targets)} URLs)")
+                batch_started = time.perf_counter()
+                
+                try:
+                    with timings.stage("cache_lookup"):
+                        cached = {} if force_refresh else await lookup_cached_results([url for _, url in targets], max_age)
+                    misses = []
+                    for key, url in targets:
+                        if url in cached:
+                            count = resolve(key, cached[url])
+                            job["cache_hits"] += count
+                            metrics.CACHE_HITS.inc()
+                            publish_result(job_id, {**cached[url], "url": url}, count)
+                        else:
+                            misses.append((key, url))
+                    
+                    if misses:
+                        await crawl_with_retries(batch_num, misses)
+                    
+                except Exception as e:
+                    logger.error(f"Error processing batch {batch_num}: {str(e)}")
+                
+                for key, url in targets:
+                    if key in waiting_rows:
+                        resolve_failed(key, failed_result(url, "No result returned"))
+                
+                # Failed checks are left out so a resumed job tries them again
+                finished = {key: results_by_key[key] for key, _ in targets if not results_by_key[key].get("error")}
+                try:
+                    with timings.stage("checkpoint"):
+                        await asyncio.to_thread(checkpoint.save, finished)
+                except Exception as e:
+                    logger.error(f"Could not checkpoint batch {batch_num}: {str(e)}")
+                metrics.BATCH_SECONDS.observe(time.perf_counter() - batch_started)
+                
+                write_ready_rows()
+                publish_progress(job_id)
+                save_job(job_id, force=False)
+        
+        cancelled = False
+        try:
+            crawl = asyncio.gather(
+                read_input(), *(batch_worker() for _ in range(parallel_batches)), return_exceptions=True
+            )
+            _job_crawls[job_id] = crawl
+            if job.get("cancel_requested"):
+                crawl.cancel()
+            try:
+                outcomes = await crawl
+            except asyncio.CancelledError:
+                # A cancel request stops only the crawl; a worker shutting
+                # down cancels this whole task, and the job is resumed later
+                if not job.get("cancel_requested") or asyncio.current_task().cancelling():
+                    raise
+                cancelled = True
+                outcomes = []
+            finally:
+                _job_crawls.pop(job_id, None)
+            for outcome in outcomes:
+                if isinstance(outcome, BaseException):
+                    raise outcome
+            # Rows still without a result are left out of a cancelled job
+            write_ready_rows(final=True)
+            results_file = spool.close()
+        except BaseException:
+            spool.abort(remove=job_id not in _lost_jobs)
+            raise
+        
+        timings.add("total", time.perf_counter() - started)
+        if job_id in _job_profilers:
+            await end_job_profile(job_id, job)
+        status = "cancelled" if cancelled else "completed"
+        job.update({
+            "status": status,
+            "progress": job["progress"] if cancelled else rows_read,
+            "total": max(rows_read, job_input.rows) if cancelled else rows_read,
+            "results_file": results_file,
+            "row_count": spool.rows
+        })
+        save_job(job_id)
+        publish_job_event(job_id, status, dict(job))
+        
+        checkpoint.close(remove=True)
+        checkpoint = None
+        job_input.remove()
+        
+        logger.info(f"Job {job_id} {status} with {spool.rows} results")
+        
+    except Exception as e:
+        logger.error(f"Job {job_id} failed: {str(e)}")
+        if job_id in _job_profilers:
+            await end_job_profile(job_id, job)
+        job.update({
+            "status": "failed",
+            "error": str(e)
+        })
+        save_job(job_id)
+        publish_job_event(job_id, "failed", dict(job))
+    finally:
+        if checkpoint is not None:
+            checkpoint.close()
+        if job_id in _job_profilers:
+            await end_job_profile(job_id, job)
+            save_job(job_id)
+        active_jobs.pop(job_id, None)
+        _job_flushed.pop(job_id, None)
+        _progress_published.pop(job_id, None)
+
+if __name__ == "__main__":
+    import uvicorn
+    print(" Starting Google Index Checker API...")
+    print(" API will be available on port 8877")
+    print(" Frontend will be available at the root URL")
+    print("-" * 60)
+    
     uvicorn.run(app, host="0.0.0.0", port=8877)
\ No newline at end of file
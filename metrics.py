@@ -0,0 +1,103 @@
+from typing import Callable, Dict
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, REGISTRY, generate_latest
+from prometheus_client.core import GaugeMetricFamily
+
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 5, 10, 15, 30, 60, 120)
+DURATION_BUCKETS = (0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+
+ZYTE_REQUEST_SECONDS = Histogram(
+    "index_checker_zyte_request_seconds",
+    "Latency of Zyte API SERP requests behind per-URL checks",
+    buckets=LATENCY_BUCKETS
+)
+BATCH_SECONDS = Histogram(
+    "index_checker_batch_seconds",
+    "Wall time of a batch, from cache lookup to checkpoint, retries included",
+    buckets=DURATION_BUCKETS
+)
+CRAWLER_STARTUP_SECONDS = Histogram(
+    "index_checker_crawler_startup_seconds",
+    "Time for a crawler to open its spider: per batch for subprocesses, once for the in-process engine",
+    ["engine"],
+    buckets=DURATION_BUCKETS
+)
+REPORT_SECONDS = Histogram(
+    "index_checker_report_seconds",
+    "Time to build a report download from a job's results",
+    ["format"],
+    buckets=DURATION_BUCKETS
+)
+
+URLS_CHECKED = Counter(
+    "index_checker_urls_checked",
+    "Distinct URLs resolved by a crawl, by final status",
+    ["status"]
+)
+CACHE_HITS = Counter(
+    "index_checker_cache_hits",
+    "Distinct URLs answered from the result cache"
+)
+RETRIES = Counter(
+    "index_checker_retries",
+    "Failed checks sent to the crawler again"
+)
+CRAWL_ERRORS = Counter(
+    "index_checker_crawl_errors",
+    "Checks that failed, before any retry, by error type",
+    ["type"]
+)
+
+RUNNING_JOBS = Gauge(
+    "index_checker_running_jobs",
+    "Jobs this process is running"
+)
+QUEUED_URLS = Gauge(
+    "index_checker_queued_urls",
+    "Input rows of running jobs that have no result yet"
+)
+QUEUED_JOBS = Gauge(
+    "index_checker_queued_jobs",
+    "Jobs waiting in the shared queue for a worker"
+)
+CONCURRENCY_LIMIT = Gauge(
+    "index_checker_concurrency_limit",
+    "Zyte API requests allowed in flight"
+)
+
+
+class ScrapyStatsCollector:
+    """Exposes Scrapy stats collector values, summed over every crawl.
+
+    ``source`` returns the current totals; it is only called when /metrics
+    is scraped.
+    """
+
+    def __init__(self, source: Callable[[], Dict[str, float]]):
+        self.source = source
+
+    def collect(self):
+        family = GaugeMetricFamily(
+            "index_checker_scrapy_stat",
+            "Scrapy stats collector values summed over every crawl since startup",
+            labels=["stat"]
+        )
+        for key, value in sorted(self.source().items()):
+            family.add_metric([key], value)
+        yield family
+
+
+def register_scrapy_stats(source: Callable[[], Dict[str, float]]):
+    REGISTRY.register(ScrapyStatsCollector(source))
+
+
+def numeric_stats(stats: dict) -> Dict[str, float]:
+    """The numeric values of a Scrapy stats dict, leaving out timestamps"""
+    return {
+        key: value for key, value in stats.items()
+        if isinstance(value, (int, float)) and not isinstance(value, bool)
+    }
+
+
+def render():
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
@@ -0,0 +1,104 @@
+import cProfile
+import contextlib
+import io
+import logging
+import pstats
+import time
+import tracemalloc
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class StageTimings:
+    """Seconds a job has spent in each stage of its pipeline.
+
+    Batches run in parallel, so stages are summed over batches and can add
+    up to more than the job's wall time. ``seconds`` is the job record's own
+    dict, so the figures are saved along with the rest of the job.
+    """
+
+    def __init__(self, seconds: Dict[str, float]):
+        self.seconds = seconds
+
+    def add(self, stage: str, seconds: float):
+        self.seconds[stage] = round(self.seconds.get(stage, 0.0) + seconds, 4)
+
+    @contextlib.contextmanager
+    def stage(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - started)
+
+
+class JobProfiler:
+    """cProfile and tracemalloc capture for the rest of a job's run.
+
+    Both hook the interpreter rather than a task: the profile covers the
+    event loop thread, so it includes whatever else the loop runs meanwhile
+    and leaves out work handed to threads. That is also why only one job
+    can be profiled at a time.
+    """
+
+    _active: Optional["JobProfiler"] = None
+
+    def __init__(self, stats_path: str, report_path: str, frames: int = 1, top: int = 40):
+        self.stats_path = stats_path
+        self.report_path = report_path
+        self.frames = frames
+        self.top = top
+        self.profile = None
+        self.started_at = None
+        self._own_tracemalloc = False
+        self._baseline = None
+        self._snapshot = None
+        self._elapsed = None
+
+    @classmethod
+    def busy(cls) -> bool:
+        return cls._active is not None
+
+    def start(self) -> bool:
+        if JobProfiler._active is not None:
+            return False
+        JobProfiler._active = self
+
+        self._own_tracemalloc = not tracemalloc.is_tracing()
+        if self._own_tracemalloc:
+            tracemalloc.start(self.frames)
+        self._baseline = tracemalloc.take_snapshot()
+        self.started_at = time.time()
+        self.profile = cProfile.Profile()
+        self.profile.enable()
+        return True
+
+    def stop(self) -> dict:
+        """Stop capturing; ``write`` then turns the capture into files"""
+        self.profile.disable()
+        self._elapsed = time.time() - self.started_at
+        self._snapshot = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        if self._own_tracemalloc:
+            tracemalloc.stop()
+        JobProfiler._active = None
+        return {"seconds": round(self._elapsed, 3), "peak_traced_mb": round(peak / 1024 / 1024, 1)}
+
+    def write(self):
+        """Dump the profile for pstats/snakeviz and a readable summary next to it"""
+        self.profile.dump_stats(self.stats_path)
+
+        out = io.StringIO()
+        out.write(f"Profiled {self._elapsed:.1f}s of the event loop thread\n\n")
+        out.write(f"== Top {self.top} functions by cumulative time ==\n")
+        pstats.Stats(self.profile, stream=out).sort_stats("cumulative").print_stats(self.top)
+
+        out.write(f"\n== Top {self.top} allocation sites still held, compared to the start ==\n")
+        snapshot = self._snapshot.filter_traces((tracemalloc.Filter(False, tracemalloc.__file__),))
+        for stat in snapshot.compare_to(self._baseline, "lineno")[:self.top]:
+            out.write(f"{stat}\n")
+
+        with open(self.report_path, "w", encoding="utf-8") as f:
+            f.write(out.getvalue())
+        self.profile = self._baseline = self._snapshot = None
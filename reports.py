@@ -0,0 +1,387 @@
+import csv
+import io
+import json
+import logging
+import os
+import tempfile
+import zlib
+from datetime import datetime
+from typing import Iterable, Iterator, List
+
+logger = logging.getLogger(__name__)
+
+REPORT_COLUMNS = ['index', 'url', 'indexed', 'status', 'search_link', 'result_url', 'total_results', 'checked_at', 'error']
+MAX_COLUMN_WIDTH = 50
+# Excel's hard limit, including the header row
+MAX_SHEET_ROWS = 1_048_576
+
+
+def result_status(result: dict) -> str:
+    """Indexed or Not Indexed, or Unknown when the check itself failed"""
+    if result.get('error'):
+        return 'Unknown'
+    return 'Indexed' if result.get('indexed') else 'Not Indexed'
+
+
+def report_row(result: dict) -> dict:
+    """The report's view of a result: its columns, in order, with status filled in"""
+    row = {column: result.get(column) for column in REPORT_COLUMNS}
+    row['status'] = result_status(result)
+    if row['status'] == 'Unknown':
+        row['indexed'] = None
+    if not row['checked_at']:
+        row['checked_at'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    return row
+
+
+class ResultSpool:
+    """Append-only JSON lines file holding a job's report rows in input order.
+
+    Every download format is produced from the spool, so nothing but the
+    file itself has to be kept once a job finishes.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.rows = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._partial_path = f"{path}.partial"
+        # A worker that lost the job may still have the old partial file
+        # open, so it is replaced rather than truncated under that worker
+        try:
+            os.unlink(self._partial_path)
+        except OSError:
+            pass
+        self._file = open(self._partial_path, 'w', encoding='utf-8')
+
+    def add_row(self, result: dict):
+        self._file.write(json.dumps(report_row(result), ensure_ascii=False))
+        self._file.write('\n')
+        self.rows += 1
+
+    def close(self) -> str:
+        self._file.close()
+        os.replace(self._partial_path, self.path)
+        return self.path
+
+    def abort(self, remove: bool = True):
+        """Stop writing; ``remove=False`` leaves the partial file to whoever
+        took the job over"""
+        self._file.close()
+        if not remove:
+            return
+        try:
+            os.unlink(self._partial_path)
+        except OSError:
+            pass
+
+
+class SpoolTail:
+    """Follows the rows a running job adds to its spool, from another process.
+
+    A worker that resumes the job writes a new partial file from the first
+    row, so rows already read from the previous one are skipped.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.rows = 0
+        self._file = None
+        self._inode = None
+        self._file_rows = 0
+        self._buffer = ''
+
+    def read(self) -> List[dict]:
+        """The complete rows added since the last read"""
+        for candidate in (f"{self.path}.partial", self.path):
+            try:
+                inode = os.stat(candidate).st_ino
+            except OSError:
+                continue
+            if inode != self._inode:
+                self.close()
+                self._file = open(candidate, 'r', encoding='utf-8')
+                self._inode = inode
+            break
+        if self._file is None:
+            return []
+
+        self._buffer += self._file.read()
+        *lines, self._buffer = self._buffer.split('\n')
+        rows = []
+        for line in lines:
+            if not line.strip():
+                continue
+            self._file_rows += 1
+            if self._file_rows > self.rows:
+                rows.append(json.loads(line))
+                self.rows += 1
+        return rows
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+        self._file = None
+        self._file_rows = 0
+        self._buffer = ''
+
+
+def build_path(path: str) -> str:
+    """A new file next to ``path`` to build it in before it is moved into
+    place, so builds in different processes never write the same file"""
+    fd, partial_path = tempfile.mkstemp(
+        dir=os.path.dirname(path) or '.', prefix=f"{os.path.basename(path)}.", suffix='.partial'
+    )
+    os.close(fd)
+    return partial_path
+
+
+def iter_spool_rows(path: str) -> Iterator[dict]:
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def _gzip_chunks(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def _read_chunks(path: str, chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+
+def stream_jsonl(path: str, gzip: bool = False) -> Iterator[bytes]:
+    chunks = _read_chunks(path)
+    return _gzip_chunks(chunks) if gzip else chunks
+
+
+def stream_csv(path: str, gzip: bool = False, rows_per_chunk: int = 1000) -> Iterator[bytes]:
+    def chunks():
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=REPORT_COLUMNS, extrasaction='ignore')
+        writer.writeheader()
+        pending = 0
+        for row in iter_spool_rows(path):
+            writer.writerow(row)
+            pending += 1
+            if pending >= rows_per_chunk:
+                yield buffer.getvalue().encode('utf-8')
+                buffer.seek(0)
+                buffer.truncate()
+                pending = 0
+        yield buffer.getvalue().encode('utf-8')
+
+    return _gzip_chunks(chunks()) if gzip else chunks()
+
+
+def write_xlsx(spool_path: str, path: str) -> str:
+    report = StreamingExcelReport(path)
+    try:
+        report.add_rows(iter_spool_rows(spool_path))
+    except BaseException:
+        report.abort()
+        raise
+    return report.close()
+
+
+def write_parquet(spool_path: str, path: str, rows_per_group: int = 50_000) -> str:
+    """Convert the spool to Parquet in row groups, with native column types"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        ('index', pa.int64()),
+        ('url', pa.string()),
+        ('indexed', pa.bool_()),
+        ('status', pa.string()),
+        ('search_link', pa.string()),
+        ('result_url', pa.string()),
+        ('total_results', pa.int32()),
+        ('checked_at', pa.timestamp('s')),
+        ('error', pa.string()),
+    ])
+
+    def to_batch(rows):
+        columns = {name: [row.get(name) for row in rows] for name in schema.names}
+        columns['checked_at'] = [
+            datetime.strptime(value, '%Y-%m-%d %H:%M:%S') if value else None
+            for value in columns['checked_at']
+        ]
+        return pa.RecordBatch.from_pydict(columns, schema=schema)
+
+    partial_path = build_path(path)
+    try:
+        with pq.ParquetWriter(partial_path, schema) as writer:
+            rows = []
+            for row in iter_spool_rows(spool_path):
+                rows.append(row)
+                if len(rows) >= rows_per_group:
+                    writer.write_batch(to_batch(rows))
+                    rows = []
+            if rows:
+                writer.write_batch(to_batch(rows))
+    except BaseException:
+        try:
+            os.unlink(partial_path)
+        except OSError:
+            pass
+        raise
+
+    os.replace(partial_path, path)
+    return path
+
+
+class StreamingExcelReport:
+    """Writes the results workbook row by row as a job progresses.
+
+    The workbook is opened in xlsxwriter's constant_memory mode, so each row
+    is flushed to disk as soon as the next one is written and memory stays
+    flat however many rows there are. Column widths come from running
+    maximums instead of a scan of the finished data. Rows past Excel's
+    sheet limit continue on a new sheet. The file is written under a
+    temporary name and only appears at ``path`` once it is complete.
+    """
+
+    def __init__(self, path: str, columns: Iterable[str] = REPORT_COLUMNS):
+        # Imported here so processes that never build a workbook don't load it
+        import xlsxwriter
+
+        self.path = path
+        self.columns = list(columns)
+        self.rows = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._partial_path = build_path(path)
+
+        self.workbook = xlsxwriter.Workbook(self._partial_path, {'constant_memory': True})
+        self.header_format = self.workbook.add_format({
+            'bold': True,
+            'text_wrap': True,
+            'valign': 'top',
+            'fg_color': '#D7E4BC',
+            'border': 1
+        })
+        self.indexed_format = self.workbook.add_format({
+            'bg_color': '#C6EFCE',
+            'font_color': '#006100'
+        })
+        self.not_indexed_format = self.workbook.add_format({
+            'bg_color': '#FFC7CE',
+            'font_color': '#9C0006'
+        })
+        self.unknown_format = self.workbook.add_format({
+            'bg_color': '#FFEB9C',
+            'font_color': '#9C5700'
+        })
+
+        self._sheets = []
+        self._new_sheet()
+
+    def _new_sheet(self):
+        name = 'Index Results' if not self._sheets else f'Index Results {len(self._sheets) + 1}'
+        worksheet = self.workbook.add_worksheet(name)
+        for col_num, column in enumerate(self.columns):
+            worksheet.write_string(0, col_num, column, self.header_format)
+
+        self._sheets.append({
+            'worksheet': worksheet,
+            'rows': 0,
+            'widths': [len(column) for column in self.columns]
+        })
+
+    def add_row(self, result: dict):
+        sheet = self._sheets[-1]
+        if sheet['rows'] >= MAX_SHEET_ROWS - 1:
+            self._finish_sheet(sheet)
+            self._new_sheet()
+            sheet = self._sheets[-1]
+
+        worksheet = sheet['worksheet']
+        row = sheet['rows'] + 1
+        widths = sheet['widths']
+
+        values = report_row(result)
+
+        for col_num, column in enumerate(self.columns):
+            value = values.get(column)
+            if value is None or value == '':
+                continue
+            if isinstance(value, bool):
+                worksheet.write_boolean(row, col_num, value)
+            elif isinstance(value, (int, float)):
+                worksheet.write_number(row, col_num, value)
+            else:
+                value = str(value)
+                worksheet.write_string(row, col_num, value)
+            width = len(str(value))
+            if width > widths[col_num]:
+                widths[col_num] = width
+
+        sheet['rows'] = row
+        self.rows += 1
+
+    def add_rows(self, results: Iterable[dict]):
+        for result in results:
+            self.add_row(result)
+
+    def _finish_sheet(self, sheet):
+        worksheet = sheet['worksheet']
+        if 'status' in self.columns and sheet['rows'] > 0:
+            status_col = self.columns.index('status')
+
+            worksheet.conditional_format(1, status_col, sheet['rows'], status_col, {
+                'type': 'text',
+                'criteria': 'containing',
+                'value': 'Indexed',
+                'format': self.indexed_format
+            })
+
+            worksheet.conditional_format(1, status_col, sheet['rows'], status_col, {
+                'type': 'text',
+                'criteria': 'containing',
+                'value': 'Not Indexed',
+                'format': self.not_indexed_format
+            })
+
+            worksheet.conditional_format(1, status_col, sheet['rows'], status_col, {
+                'type': 'text',
+                'criteria': 'containing',
+                'value': 'Unknown',
+                'format': self.unknown_format
+            })
+
+        for col_num, width in enumerate(sheet['widths']):
+            worksheet.set_column(col_num, col_num, min(width + 2, MAX_COLUMN_WIDTH))
+
+    def close(self) -> str:
+        self._finish_sheet(self._sheets[-1])
+        self.workbook.close()
+        os.replace(self._partial_path, self.path)
+        logger.info(f"Excel report created successfully: {self.path} ({self.rows} rows)")
+        return self.path
+
+    def abort(self):
+        try:
+            self.workbook.close()
+        except Exception:
+            pass
+        try:
+            os.unlink(self._partial_path)
+        except OSError:
+            pass
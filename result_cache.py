@@ -0,0 +1,118 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, Optional
+
+from urlnorm import normalize_url
+
+logger = logging.getLogger(__name__)
+
+CACHED_FIELDS = ("indexed", "search_link", "result_url", "total_results", "checked_at")
+
+
+class ResultCache:
+    """On-disk cache of index-status results keyed by normalized URL.
+
+    Entries older than ``ttl`` seconds are never served, and the table is
+    trimmed back to ``max_entries`` rows (oldest first) as new results come
+    in. Error results are not cached so they get re-checked next time.
+    """
+
+    def __init__(self, path: str, ttl: int = 86400, max_entries: int = 1_000_000, evict_every: int = 1000):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.evict_every = evict_every
+        self._writes_since_evict = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS results (
+                key TEXT PRIMARY KEY,
+                indexed INTEGER NOT NULL,
+                search_link TEXT,
+                result_url TEXT,
+                total_results INTEGER,
+                checked_at TEXT,
+                stored_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS results_stored_at ON results (stored_at)")
+        self._conn.commit()
+
+    def get_many(self, urls: Iterable[str], max_age: Optional[int] = None) -> Dict[str, dict]:
+        """Return fresh cached results for ``urls``, keyed by the original URL"""
+        age = self.ttl if max_age is None else min(max_age, self.ttl)
+        min_stored_at = time.time() - age
+
+        keys = {}
+        for url in urls:
+            keys.setdefault(normalize_url(url), []).append(url)
+        if not keys:
+            return {}
+
+        found = {}
+        key_list = list(keys)
+        with self._lock:
+            # Stay well below SQLite's bound-parameter limit
+            for i in range(0, len(key_list), 500):
+                chunk = key_list[i:i + 500]
+                rows = self._conn.execute(
+                    f"SELECT key, {', '.join(CACHED_FIELDS)} FROM results "
+                    f"WHERE stored_at >= ? AND key IN ({', '.join('?' * len(chunk))})",
+                    [min_stored_at, *chunk]
+                ).fetchall()
+                for key, *values in rows:
+                    entry = dict(zip(CACHED_FIELDS, values))
+                    entry["indexed"] = bool(entry["indexed"])
+                    for url in keys[key]:
+                        found[url] = entry
+        return found
+
+    def put_many(self, results: Iterable[dict]):
+        now = time.time()
+        rows = [
+            (normalize_url(item["url"]), int(bool(item.get("indexed"))), item.get("search_link"),
+             item.get("result_url"), item.get("total_results"), item.get("checked_at"), now)
+            for item in results
+            if item.get("url") and not item.get("error")
+        ]
+        if not rows:
+            return
+
+        with self._lock:
+            self._conn.executemany(
+                f"INSERT OR REPLACE INTO results (key, {', '.join(CACHED_FIELDS)}, stored_at) "
+                f"VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            self._conn.commit()
+            self._writes_since_evict += len(rows)
+            if self._writes_since_evict >= self.evict_every:
+                self._writes_since_evict = 0
+                self._evict()
+
+    def _evict(self):
+        expired = self._conn.execute("DELETE FROM results WHERE stored_at < ?", (time.time() - self.ttl,)).rowcount
+        overflow = self._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0] - self.max_entries
+        if overflow > 0:
+            self._conn.execute(
+                "DELETE FROM results WHERE key IN (SELECT key FROM results ORDER BY stored_at LIMIT ?)",
+                (overflow,)
+            )
+        self._conn.commit()
+        if expired or overflow > 0:
+            logger.info(f"Result cache evicted {expired} expired and {max(overflow, 0)} overflow entries")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,112 @@
+import asyncio
+import collections
+import itertools
+from contextlib import asynccontextmanager
+from typing import Hashable, List, Optional
+
+
+class _Waiter:
+    def __init__(self, priority: int, seq: int, owner: Optional[Hashable], future: asyncio.Future):
+        self.priority = priority
+        self.seq = seq
+        self.owner = owner
+        self.future = future
+
+
+class CrawlBudget:
+    """Server-wide limit on the number of batches crawling at once.
+
+    Every job draws its batch slots from the same budget, so several large
+    jobs running side by side can't oversubscribe the Zyte API or the CPU.
+    Waiters are served highest priority first. Among waiters of the same
+    priority a freed slot goes to the owner (a job or an API client) that
+    holds the fewest slots, first come first served between equals, so one
+    big job can't crowd out the rest. Waiters with a positive priority may
+    also use up to ``headroom`` slots beyond the capacity, so an interactive
+    check doesn't have to wait for a bulk batch to finish.
+    """
+
+    def __init__(self, capacity: int, headroom: int = 0):
+        self.capacity = max(1, capacity)
+        self.headroom = max(0, headroom)
+        self.in_use = 0
+        self._held = collections.Counter()
+        self._waiters: List[_Waiter] = []
+        self._seq = itertools.count()
+
+    @property
+    def waiting(self) -> int:
+        return sum(1 for waiter in self._waiters if not waiter.future.done())
+
+    def _limit(self, priority: int) -> int:
+        return self.capacity + (self.headroom if priority > 0 else 0)
+
+    def _take(self, owner: Optional[Hashable]):
+        self.in_use += 1
+        self._held[owner] += 1
+
+    async def acquire(self, priority: int = 0, owner: Optional[Hashable] = None):
+        queued_ahead = any(waiter.priority >= priority for waiter in self._waiters if not waiter.future.done())
+        if self.in_use < self._limit(priority) and not queued_ahead:
+            self._take(owner)
+            return
+
+        waiter = _Waiter(priority, next(self._seq), owner, asyncio.get_running_loop().create_future())
+        self._waiters.append(waiter)
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # The slot was handed over just before we were cancelled
+                self.release(owner)
+            else:
+                try:
+                    self._waiters.remove(waiter)
+                except ValueError:
+                    pass
+            raise
+
+    def release(self, owner: Optional[Hashable] = None):
+        self.in_use -= 1
+        self._held[owner] -= 1
+        if self._held[owner] <= 0:
+            del self._held[owner]
+        self._wake()
+
+    def _wake(self):
+        while True:
+            self._waiters = [waiter for waiter in self._waiters if not waiter.future.done()]
+            if not self._waiters:
+                return
+            top = max(waiter.priority for waiter in self._waiters)
+            if self.in_use >= self._limit(top):
+                return
+            waiter = min(
+                (waiter for waiter in self._waiters if waiter.priority == top),
+                key=lambda waiter: (self._held[waiter.owner], waiter.seq)
+            )
+            self._waiters.remove(waiter)
+            self._take(waiter.owner)
+            waiter.future.set_result(None)
+
+    def resize(self, capacity: int):
+        """Change the number of slots; shrinking takes effect as slots are released"""
+        self.capacity = max(1, capacity)
+        self._wake()
+
+    @asynccontextmanager
+    async def slot(self, priority: int = 0, owner: Optional[Hashable] = None):
+        await self.acquire(priority, owner)
+        try:
+            yield
+        finally:
+            self.release(owner)
+
+    def snapshot(self) -> dict:
+        return {
+            "capacity": self.capacity,
+            "headroom": self.headroom,
+            "in_use": self.in_use,
+            "waiting": self.waiting,
+            "owners": len(self._held)
+        }
@@ -0,0 +1,35 @@
+from urllib.parse import urlsplit, urlunsplit
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+def normalize_url(url: str) -> str:
+    """Canonical form of a URL used as a lookup and deduplication key.
+
+    Variants that Google treats as the same page collapse onto one key:
+    http and https, letter case in the scheme and host, default ports,
+    fragments and trailing slashes. Bare hosts are treated as https.
+    """
+    url = url.strip()
+    if '://' not in url:
+        url = 'https://' + url
+
+    try:
+        parts = urlsplit(url)
+        port = parts.port
+    except ValueError:
+        return url
+
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').rstrip('.')
+    if ':' in host:
+        host = f"[{host}]"
+    if scheme in DEFAULT_PORTS:
+        if port is not None and port != DEFAULT_PORTS[scheme]:
+            host = f"{host}:{port}"
+        scheme = 'https'
+    elif port is not None:
+        host = f"{host}:{port}"
+
+    return urlunsplit((scheme, host, parts.path.rstrip('/'), parts.query, ''))
+
@@ -0,0 +1,45 @@
+"""Job worker: runs queued index checks outside the API process.
+
+Each worker claims jobs from the shared queue (JOB_QUEUE_URL), runs them
+with its own crawler, crawl budget and concurrency controller, and writes
+results to RESULTS_DIR for the API to serve. Run one per core, or spread
+them over several hosts that share RESULTS_DIR and the queue. On SIGTERM
+or SIGINT a worker hands its running jobs back to the queue, and another
+worker resumes them from their checkpoints.
+
+Set WORKER_METRICS_PORT to serve this worker's Prometheus metrics.
+
+Usage: python worker.py
+"""
+import asyncio
+import logging
+import os
+import signal
+
+import main
+
+logger = logging.getLogger("worker")
+
+WORKER_METRICS_PORT = int(os.getenv("WORKER_METRICS_PORT", "0"))
+
+
+async def run():
+    main.worker_enabled = True
+    await main.app.router.startup()
+    if WORKER_METRICS_PORT:
+        from prometheus_client import start_http_server
+        start_http_server(WORKER_METRICS_PORT)
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    logger.info(f"Worker {main.WORKER_ID} started")
+    await stop.wait()
+    logger.info(f"Worker {main.WORKER_ID} stopping")
+    await main.app.router.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(run())